@@ -114,7 +114,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'core.apps.AkiliStaticFilesConfig',  # django.contrib.staticfiles
 
     # Akili Apps
     'core',
@@ -133,6 +133,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.LiteModeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.RateLimitMiddleware',
@@ -153,6 +154,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.credits_processor',
+                'core.context_processors.lite_mode_processor',
             ],
         },
     },
@@ -188,6 +190,13 @@ else:
 # Custom User Model
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# StatsModelBackend loads users with their counters; ModelBackend stays listed
+# so sessions created before it was added remain valid
+AUTHENTICATION_BACKENDS = [
+    'users.backends.StatsModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -233,8 +242,22 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
-# Whitenoise settings for production static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Whitenoise settings for production static files. collectstatic writes
+# content-hashed copies with gzip and brotli (when Brotli is installed)
+# variants; Whitenoise serves hashed names with immutable, year-long caching.
+# Development serves the unprocessed files so no build step is needed.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+AKILI_RESPONSIVE_IMAGE_WIDTHS = (64, 128, 256, 512)  # Widths optimize_images generates
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -250,6 +273,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AKILI_DAILY_FREE_CREDITS = 10
 AKILI_MAX_REFERRAL_CREDITS = 30
 AKILI_CREDITS_PER_REFERRAL = 2
+AKILI_CREDIT_LEDGER_RETENTION_DAYS = 90  # Older credit ledger entries are folded by compact_credit_ledger
 
 # Akili Learning Settings
 AKILI_QUIZ_PASSING_PERCENTAGE = 60  # Minimum % to pass a quiz and unlock next module
@@ -257,6 +281,14 @@ AKILI_LESSON_REPORT_THRESHOLD = 3   # Number of reports before lesson is regener
 AKILI_CA_MAX_SCORE = 40  # Maximum continuous assessment score (40% of total grade)
 AKILI_EXAM_MAX_SCORE = 60  # Maximum exam score (60% of total grade)
 AKILI_EXAM_PASSING_PERCENTAGE = 50  # Minimum % to pass a mock exam
+AKILI_ANALYTICS_CACHE_TIMEOUT = 60 * 60  # Seconds a class analytics snapshot stays cached
+AKILI_REFERENCE_DATA_CHECK_SECONDS = 5  # How often a process checks its curriculum reference snapshot is current
+AKILI_LITE_MODE_ECT = ('slow-2g', '2g')  # Effective connection types served lite pages automatically
+AKILI_NOTIFICATION_STREAM_SECONDS = 55  # How long a live notification stream stays open before the browser reconnects
+AKILI_NOTIFICATION_MAX_STREAMS = 4  # Live notification streams per process; each holds a server thread
+AKILI_NOTIFICATION_POLL_SECONDS = 5  # How often streams check for changes on databases without LISTEN/NOTIFY
+AKILI_NOTIFICATION_RETRY_MS = 1000  # Reconnect delay after a stream ends normally
+AKILI_NOTIFICATION_BUSY_RETRY_MS = 60000  # Reconnect delay when every stream slot was taken
 AKILI_DOMAIN = os.getenv('AKILI_DOMAIN', 'akili.ng')  # Default domain for referral URLs
 
 # Credit Tiers (in kobo - 100 kobo = ₦1)
@@ -16,6 +16,7 @@ def health_check(request):
 
 urlpatterns = [
     path('health/', health_check, name='health_check'),
+    path('serviceworker.js', core_views.service_worker_view, name='service_worker'),
     path('', core_views.home_view, name='home'),
     path('admin/', admin.site.urls),
     path('dashboard/', core_views.dashboard_view, name='dashboard'),
@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     Assessment, AssessmentQuestion, AssessmentSubmission, Grade, ProgressReport,
     TeacherProfile, TeacherClass, Assignment, AssignmentSubmission,
-    ParentProfile, Notification,
+    ParentProfile, Notification, CourseProgress,
     ContentVersion, ContentModerationQueue, CurriculumUpdateRequest
 )
 
@@ -41,6 +41,14 @@ class ProgressReportAdmin(admin.ModelAdmin):
     search_fields = ['student__email']
 
 
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ['user', 'course', 'completed_modules', 'module_count', 'average_score', 'mock_exam_ready', 'updated_at']
+    list_filter = ['mock_exam_ready']
+    search_fields = ['user__email', 'course__subject']
+    raw_id_fields = ['user', 'course', 'grade', 'next_module']
+
+
 @admin.register(TeacherProfile)
 class TeacherProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'employee_id', 'qualification', 'is_verified', 'created_at']
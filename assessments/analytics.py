@@ -0,0 +1,77 @@
+"""
+Class analytics for teachers, computed with grouped aggregates and cached
+as per-class snapshots that are invalidated by bumping a version number.
+
+The version lives on the TeacherClass row rather than in the cache, so a
+cache cull cannot reset it to a number an older snapshot was stored under.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Q
+
+SNAPSHOT_KEY = 'class_analytics:{class_id}:v{version}'
+
+
+def bump_snapshot_version(class_id):
+    """Invalidate a class's cached analytics by moving to a new version"""
+    from assessments.models import TeacherClass
+    
+    TeacherClass.objects.filter(pk=class_id).update(analytics_version=F('analytics_version') + 1)
+
+
+def student_performance_rows(teacher_class):
+    """
+    Per-student average score and graded submission count for a class.
+    
+    Computed as a single grouped aggregate over the class roster, so the
+    query count does not grow with class size.
+    """
+    graded = Q(
+        assignment_submissions__assignment__teacher_class=teacher_class,
+        assignment_submissions__status='GRADED'
+    )
+    return teacher_class.students.annotate(
+        average_score=Avg('assignment_submissions__score', filter=graded),
+        submissions=Count('assignment_submissions', filter=graded),
+    ).values(
+        'id', 'first_name', 'last_name', 'email', 'average_score', 'submissions'
+    ).order_by('id')
+
+
+def build_class_analytics(teacher_class):
+    """Compute the analytics snapshot for a class"""
+    from assessments.models import AssignmentSubmission
+    
+    class_stats = AssignmentSubmission.objects.filter(
+        assignment__teacher_class=teacher_class,
+        status='GRADED'
+    ).aggregate(avg=Avg('score'), count=Count('id'))
+    
+    student_performance = []
+    for row in student_performance_rows(teacher_class):
+        student_performance.append({
+            'student_id': row['id'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'full_name': f"{row['first_name']} {row['last_name']}".strip(),
+            'email': row['email'],
+            'average_score': round(row['average_score'] or 0, 2),
+            'submissions': row['submissions'],
+        })
+    
+    return {
+        'average_score': round(class_stats['avg'] or 0, 2),
+        'total_submissions': class_stats['count'],
+        'student_performance': student_performance,
+    }
+
+
+def get_class_analytics(teacher_class):
+    """Return the cached analytics snapshot for a class, building it on a miss"""
+    key = SNAPSHOT_KEY.format(class_id=teacher_class.pk, version=teacher_class.analytics_version)
+    
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_class_analytics(teacher_class)
+        cache.set(key, snapshot, getattr(settings, 'AKILI_ANALYTICS_CACHE_TIMEOUT', 3600))
+    return snapshot
@@ -0,0 +1,249 @@
+"""
+Chunked, resumable grade backfill engine.
+
+Users with completed quiz attempts are walked in keyset-paginated chunks
+(ordered by user id). Each chunk computes continuous assessment scores for
+all of its users from set-based aggregates and writes them with
+bulk_create/bulk_update. Chunks can be fanned out over a process pool; a
+BackfillCheckpoint row records the highest contiguous user id processed so
+an interrupted run resumes where it stopped.
+"""
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import multiprocessing
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+CHECKPOINT_NAME = 'grades'
+DEFAULT_CHUNK_SIZE = 500
+BULK_BATCH_SIZE = 500
+
+
+def iter_user_id_chunks(after_id=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of ids of users with completed quizzes, using keyset pagination"""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+
+    while True:
+        user_ids = list(
+            User.objects.filter(
+                id__gt=after_id,
+                quiz_attempts__completed_at__isnull=False
+            ).order_by('id').values_list('id', flat=True).distinct()[:chunk_size]
+        )
+        if not user_ids:
+            return
+        yield user_ids
+        after_id = user_ids[-1]
+
+
+def compute_grades_for_users(user_ids, dry_run=False):
+    """
+    Recompute CA scores for every curriculum course of the given users.
+
+    Best quiz percentage per (user, module) comes from one grouped aggregate;
+    averages per course and the grade scale are applied in memory, and all
+    Grade rows for the chunk are written in bulk and linked to the users'
+    CourseProgress rows.
+
+    Returns:
+        Number of Grade rows created or updated (or that would be, on a dry run)
+    """
+    from assessments.models import Grade
+    from assessments.services import quiz_percentage_expression
+    from courses.models import Course
+    from quizzes.models import QuizAttempt
+
+    best_rows = QuizAttempt.objects.filter(
+        user_id__in=user_ids,
+        completed_at__isnull=False,
+        module__course__curriculum__isnull=False,
+        module__course__term__isnull=False
+    ).values('user_id', 'module__course_id', 'module_id').annotate(
+        best_percentage=Max(quiz_percentage_expression())
+    )
+
+    totals = defaultdict(lambda: [Decimal('0'), 0])
+    for row in best_rows:
+        entry = totals[(row['user_id'], row['module__course_id'])]
+        entry[0] += Decimal(str(round(row['best_percentage'], 2)))
+        entry[1] += 1
+
+    if not totals:
+        return 0
+
+    course_keys = dict(
+        (course_id, (curriculum_id, term_id))
+        for course_id, curriculum_id, term_id in Course.objects.filter(
+            id__in={course_id for _, course_id in totals}
+        ).values_list('id', 'curriculum_id', 'term_id')
+    )
+
+    ca_max = Decimal(str(getattr(settings, 'AKILI_CA_MAX_SCORE', 40)))
+    targets = {}
+    for (user_id, course_id), (total_percentage, modules) in sorted(totals.items(), key=lambda item: item[0][1]):
+        curriculum_id, term_id = course_keys[course_id]
+        average_percentage = total_percentage / modules
+        targets[(user_id, curriculum_id, term_id)] = round((average_percentage / 100) * ca_max, 2)
+
+    existing = {
+        (g.student_id, g.curriculum_id, g.term_id): g
+        for g in Grade.objects.filter(student_id__in=user_ids)
+    }
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for (user_id, curriculum_id, term_id), ca_score in targets.items():
+        grade = existing.get((user_id, curriculum_id, term_id))
+        if grade is None:
+            grade = Grade(
+                student_id=user_id,
+                curriculum_id=curriculum_id,
+                term_id=term_id,
+                continuous_assessment_score=ca_score,
+                exam_score=Decimal('0'),
+            )
+            grade.apply_scale()
+            to_create.append(grade)
+        else:
+            grade.continuous_assessment_score = ca_score
+            grade.apply_scale()
+            grade.updated_at = now
+            to_update.append(grade)
+
+    if not dry_run:
+        with transaction.atomic():
+            Grade.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+            Grade.objects.bulk_update(
+                to_update,
+                ['continuous_assessment_score', 'total_score', 'grade_letter',
+                 'grade_point', 'remarks', 'updated_at'],
+                batch_size=BULK_BATCH_SIZE
+            )
+            _link_course_progress(user_ids, targets)
+
+    return len(to_create) + len(to_update)
+
+
+def _link_course_progress(user_ids, targets):
+    """Point existing CourseProgress rows at the Grade rows just written"""
+    from assessments.models import CourseProgress, Grade
+
+    grade_ids = {
+        (student_id, curriculum_id, term_id): grade_id
+        for grade_id, student_id, curriculum_id, term_id in Grade.objects.filter(
+            student_id__in=user_ids
+        ).values_list('id', 'student_id', 'curriculum_id', 'term_id')
+        if (student_id, curriculum_id, term_id) in targets
+    }
+
+    to_link = []
+    for progress in CourseProgress.objects.filter(
+        user_id__in=user_ids,
+        course__curriculum__isnull=False,
+        course__term__isnull=False
+    ).select_related('course').only('id', 'user_id', 'grade_id', 'course__curriculum_id', 'course__term_id'):
+        grade_id = grade_ids.get((progress.user_id, progress.course.curriculum_id, progress.course.term_id))
+        if grade_id and progress.grade_id != grade_id:
+            progress.grade_id = grade_id
+            to_link.append(progress)
+
+    CourseProgress.objects.bulk_update(to_link, ['grade'], batch_size=BULK_BATCH_SIZE)
+
+
+def _init_worker():
+    """Process pool initializer: set up Django in the spawned interpreter"""
+    import django
+    django.setup()
+
+
+def _process_chunk(user_ids, dry_run):
+    """Process one chunk; returns (last_user_id, users_processed, grades_written)"""
+    grades_written = compute_grades_for_users(user_ids, dry_run=dry_run)
+    return user_ids[-1], len(user_ids), grades_written
+
+
+def run_grade_backfill(workers=1, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, restart=False, progress=None):
+    """
+    Backfill grades for all users with completed quizzes.
+
+    Args:
+        workers: Number of worker processes (1 runs in-process)
+        chunk_size: Users per chunk
+        dry_run: Compute grades without writing grades or the checkpoint
+        restart: Ignore any saved checkpoint and start from the first user
+        progress: Optional callback(stats) invoked after each chunk
+
+    Returns:
+        Dict with users, grades, resumed_from, elapsed and rows_per_second
+    """
+    from assessments.models import BackfillCheckpoint
+
+    checkpoint = None
+    after_id = 0
+    if not dry_run:
+        checkpoint, created = BackfillCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        if restart or checkpoint.completed_at:
+            checkpoint.last_processed_id = 0
+            checkpoint.rows_processed = 0
+            checkpoint.rows_written = 0
+            checkpoint.started_at = timezone.now()
+            checkpoint.completed_at = None
+            checkpoint.save()
+        after_id = checkpoint.last_processed_id
+
+    stats = {
+        'users': 0,
+        'grades': 0,
+        'resumed_from': after_id,
+        'elapsed': 0.0,
+        'rows_per_second': 0.0,
+    }
+    started = time.monotonic()
+
+    def record(result):
+        last_id, users, grades = result
+        stats['users'] += users
+        stats['grades'] += grades
+        stats['elapsed'] = time.monotonic() - started
+        stats['rows_per_second'] = stats['users'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        if checkpoint is not None:
+            checkpoint.last_processed_id = last_id
+            checkpoint.rows_processed += users
+            checkpoint.rows_written += grades
+            checkpoint.save(update_fields=['last_processed_id', 'rows_processed', 'rows_written', 'updated_at'])
+        if progress:
+            progress(stats)
+
+    chunks = iter_user_id_chunks(after_id, chunk_size)
+
+    if workers <= 1:
+        for user_ids in chunks:
+            record(_process_chunk(user_ids, dry_run))
+    else:
+        # Spawned workers open their own database connections; results are
+        # consumed in submission order so the checkpoint only ever advances
+        # past chunks that have fully completed.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            pending = deque()
+            for user_ids in chunks:
+                pending.append(pool.submit(_process_chunk, user_ids, dry_run))
+                if len(pending) >= workers * 2:
+                    record(pending.popleft().result())
+            while pending:
+                record(pending.popleft().result())
+
+    if checkpoint is not None:
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['completed_at', 'updated_at'])
+
+    return stats
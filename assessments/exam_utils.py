@@ -1,102 +1,195 @@
 """
 Utilities for generating course-wide mock exams using AI.
+
+An exam is generated as several small, topic-balanced chunks requested
+concurrently through the shared AI fallback engine. Each chunk asks for only
+a handful of questions, keeping responses well inside the tier token caps;
+valid questions from every chunk are merged and near-duplicates dropped, and
+only chunks that came back short are retried.
 """
 import logging
-import json
 import re
-from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utils.ai_fallback import call_ai_with_fallback
+from core.utils.structured_output import EXAM_QUESTION_SCHEMA, parse_items
 
 logger = logging.getLogger(__name__)
 
+QUESTIONS_PER_CHUNK = 5
+MAX_PARALLEL_CHUNKS = 4  # Concurrent AI requests per exam
+CHUNK_RETRIES = 1
+CHUNK_MAX_TOKENS = 2000
+DUPLICATE_SIMILARITY = 0.85  # Word overlap (Jaccard) at or above which questions are duplicates
+MAX_EXAM_TOPICS = 14
 
-def generate_exam_questions(course, num_questions=20):
+
+def split_topics(topics, num_questions, per_chunk=QUESTIONS_PER_CHUNK):
     """
-    Generate comprehensive exam questions covering all modules in a course.
-    
-    Args:
-        course: Course instance
-        num_questions: Number of questions to generate (default 20)
-    
+    Split topics into topic-balanced chunks with a question quota each.
+
+    Topics are dealt round-robin so every chunk spans the course, and
+    question quotas differ by at most one between chunks.
+
     Returns:
-        List of question dictionaries with question, options, correct_index, explanation
+        List of (topics, num_questions) tuples
     """
-    from core.utils.ai_service import get_ai_client
-    
-    modules = course.modules.all().order_by('order')
-    if not modules.exists():
+    if not topics or num_questions < 1:
         return []
-    
-    topics = [f"Module {m.order}: {m.syllabus_topic}" for m in modules[:14]]
+
+    num_chunks = -(-num_questions // per_chunk)
+    chunk_topics = [topics[i::num_chunks] or [topics[i % len(topics)]] for i in range(num_chunks)]
+    base, extra = divmod(num_questions, num_chunks)
+    return [
+        (chunk_topics[i], base + (1 if i < extra else 0))
+        for i in range(num_chunks)
+    ]
+
+
+def _build_prompt(context, topics, num_questions):
     topics_str = "\n".join(topics)
-    
-    level_name = course.school_level.name if course.school_level else "Secondary School"
-    term_name = course.term.name if course.term else "First Term"
-    
-    prompt = f"""Generate a comprehensive mock examination for Nigerian secondary school students.
+    return f"""Generate part of a mock examination for Nigerian secondary school students.
 
-Subject: {course.subject}
-Level: {level_name}
-Term: {term_name}
+Subject: {context['subject']}
+Level: {context['level']}
+Term: {context['term']}
 
-Topics to cover (spread questions across all topics):
+Topics to cover (spread questions across these topics):
 {topics_str}
 
 Generate exactly {num_questions} multiple choice questions. Each question should:
 1. Test understanding, not just memorization
-2. Be appropriate for {level_name} students
+2. Be appropriate for {context['level']} students
 3. Cover different topics evenly
 4. Follow Nigerian curriculum standards
 
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "Clear question text here?",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "correct_index": 0,
-    "explanation": "Brief explanation of why this answer is correct",
-    "topic": "Module number this relates to"
-  }}
-]
+Return ONLY a valid JSON object with this exact structure:
+{{
+  "questions": [
+    {{
+      "question": "Clear question text here?",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "correct_index": 0,
+      "explanation": "Brief explanation of why this answer is correct",
+      "topic": "Module number this relates to"
+    }}
+  ]
+}}
+
+Important: Return ONLY the JSON object, no additional text."""
 
-Important: Return ONLY the JSON array, no additional text."""
 
+def parse_exam_questions(response_text):
+    """
+    Extract valid exam questions from an AI response.
+
+    Malformed items are dropped rather than failing the whole response.
+
+    Returns:
+        List of normalised question dictionaries
+    """
     try:
-        client = get_ai_client()
-        if not client:
-            logger.error("No AI client available for exam generation")
-            return []
-        
-        response = client.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group()
-        
-        questions = json.loads(response_text)
-        
-        valid_questions = []
-        for q in questions:
-            if (isinstance(q, dict) and 
-                'question' in q and 
-                'options' in q and 
-                'correct_index' in q and
-                isinstance(q['options'], list) and
-                len(q['options']) >= 4):
-                
-                valid_questions.append({
-                    'question': q['question'],
-                    'options': q['options'][:4],
-                    'correct_index': int(q.get('correct_index', 0)) % 4,
-                    'explanation': q.get('explanation', ''),
-                    'topic': q.get('topic', '')
-                })
-        
-        return valid_questions[:num_questions]
-        
+        questions, rejected = parse_items(response_text, EXAM_QUESTION_SCHEMA, 'questions')
+    except ValueError as e:
+        logger.warning(f"Unparseable exam chunk response: {e}")
+        return []
+    return questions
+
+
+def _generate_chunk(context, topics, num_questions):
+    """Request one chunk of questions; returns a (possibly short) list"""
+    result = call_ai_with_fallback(
+        _build_prompt(context, topics, num_questions),
+        max_tokens=CHUNK_MAX_TOKENS,
+        is_json=True,
+        subject=context['subject']
+    )
+    if not result['success']:
+        logger.warning(f"Exam chunk generation failed. Tier: {result.get('tier')}")
+        return []
+    return parse_exam_questions(result['content'])[:num_questions]
+
+
+def _question_words(text):
+    return frozenset(re.findall(r'[a-z0-9]+', str(text).lower()))
+
+
+def dedupe_questions(questions, seen=None, threshold=DUPLICATE_SIMILARITY):
+    """
+    Drop questions whose wording is near-identical to an earlier one.
+
+    Word sets are compared rather than characters so questions that differ
+    only in their numbers or key term are kept apart.
+
+    Args:
+        questions: List of question dictionaries
+        seen: Optional list of word sets already accepted; extended in place
+        threshold: Jaccard overlap at or above which questions are duplicates
+    """
+    kept = []
+    seen = [] if seen is None else seen
+    for question in questions:
+        words = _question_words(question['question'])
+        if any(len(words & other) >= threshold * len(words | other) for other in seen):
+            continue
+        seen.append(words)
+        kept.append(question)
+    return kept
+
+
+def generate_exam_questions(course, num_questions=20):
+    """
+    Generate comprehensive exam questions covering all modules in a course.
+
+    Args:
+        course: Course instance
+        num_questions: Number of questions to generate (default 20)
+
+    Returns:
+        List of question dictionaries with question, options, correct_index, explanation
+    """
+    modules = list(course.modules.all().order_by('order')[:MAX_EXAM_TOPICS])
+    if not modules:
+        return []
+
+    topics = [f"Module {m.order}: {m.syllabus_topic}" for m in modules]
+    context = {
+        'subject': course.subject,
+        'level': course.school_level.name if course.school_level else "Secondary School",
+        'term': course.term.name if course.term else "First Term",
+    }
+
+    chunks = split_topics(topics, num_questions)
+    results = [[] for _ in chunks]
+    pending = list(range(len(chunks)))
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CHUNKS, len(chunks))) as pool:
+            for attempt in range(CHUNK_RETRIES + 1):
+                futures = {
+                    index: pool.submit(
+                        _generate_chunk, context, chunks[index][0],
+                        chunks[index][1] - len(results[index])
+                    )
+                    for index in pending
+                }
+                for index, future in futures.items():
+                    try:
+                        results[index].extend(future.result())
+                    except Exception as e:
+                        logger.error(f"Error generating exam chunk {index}: {e}")
+
+                # Duplicates across chunks count towards a chunk's shortfall
+                seen = []
+                results = [dedupe_questions(chunk, seen) for chunk in results]
+                pending = [i for i in pending if len(results[i]) < chunks[i][1]]
+                if not pending or attempt == CHUNK_RETRIES:
+                    break
+                logger.info(f"Retrying {len(pending)} short exam chunks for course {course.id}")
     except Exception as e:
         logger.error(f"Error generating exam questions: {e}")
-        return []
+
+    return [q for chunk in results for q in chunk][:num_questions]
 
 
 def generate_exam_and_save(course, user, num_questions=20):
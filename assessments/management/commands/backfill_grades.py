@@ -2,19 +2,62 @@
 Management command to backfill grades from existing quiz attempts.
 """
 from django.core.management.base import BaseCommand
-from assessments.services import backfill_all_grades
+from assessments.backfill import DEFAULT_CHUNK_SIZE, run_grade_backfill
 
 
 class Command(BaseCommand):
     help = 'Backfill grades from existing completed quiz attempts'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (default: 1, runs in-process)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Users per chunk (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compute grades without writing them or the checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the saved checkpoint and start from the first user',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Starting grade backfill...')
-        
-        total_grades, total_users = backfill_all_grades()
-        
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        def report(stats):
+            self.stdout.write(
+                f"  {stats['users']} users, {stats['grades']} grades "
+                f"({stats['rows_per_second']:.0f} rows/s)"
+            )
+
+        stats = run_grade_backfill(
+            workers=max(1, options['workers']),
+            chunk_size=max(1, options['chunk_size']),
+            dry_run=options['dry_run'],
+            restart=options['restart'],
+            progress=report,
+        )
+
+        if stats['resumed_from']:
+            self.stdout.write(f"Resumed after user id {stats['resumed_from']}")
+
+        prefix = 'Would backfill' if options['dry_run'] else 'Successfully backfilled'
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully backfilled {total_grades} grades for {total_users} users'
+                f"{prefix} {stats['grades']} grades for {stats['users']} users "
+                f"in {stats['elapsed']:.1f}s ({stats['rows_per_second']:.0f} rows/s)"
             )
         )
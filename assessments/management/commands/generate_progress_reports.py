@@ -0,0 +1,95 @@
+"""
+Management command to generate term-end progress reports with class positions.
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from curriculum.models import AcademicSession, SchoolLevel, Term
+from core.services.curriculum import CurriculumService
+from assessments.models import ProgressReport
+from assessments.reports import generate_cohort_reports, render_report_pdfs
+
+
+class Command(BaseCommand):
+    help = 'Generate ProgressReport rows (averages, GPA, position) for a session/term cohort'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--term',
+            required=True,
+            help='Term name (e.g. "First Term") or order (1, 2, 3)',
+        )
+        parser.add_argument(
+            '--session',
+            help='Academic session name (default: the active session)',
+        )
+        parser.add_argument(
+            '--level',
+            action='append',
+            help='School level name, e.g. JS1 (repeatable; default: all levels)',
+        )
+        parser.add_argument(
+            '--notify',
+            action='store_true',
+            help='Notify each student that their report is ready',
+        )
+        parser.add_argument(
+            '--pdf',
+            action='store_true',
+            help='Render printable PDFs for reports whose grades changed',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes for PDF rendering (default: 1)',
+        )
+        parser.add_argument(
+            '--force-pdf',
+            action='store_true',
+            help='Re-render every PDF, even if unchanged',
+        )
+
+    def handle(self, *args, **options):
+        if options['session']:
+            try:
+                session = AcademicSession.objects.get(name=options['session'])
+            except AcademicSession.DoesNotExist:
+                raise CommandError(f"Academic session '{options['session']}' not found")
+        else:
+            session = CurriculumService.get_active_session()
+            if session is None:
+                raise CommandError("No academic session found")
+
+        term_arg = options['term']
+        term_lookup = {'order': int(term_arg)} if term_arg.isdigit() else {'name__iexact': term_arg}
+        try:
+            term = Term.objects.get(**term_lookup)
+        except Term.DoesNotExist:
+            raise CommandError(f"Term '{term_arg}' not found")
+
+        levels = SchoolLevel.objects.order_by('level_order')
+        if options['level']:
+            levels = levels.filter(name__in=options['level'])
+            if not levels.exists():
+                raise CommandError(f"No school levels match {', '.join(options['level'])}")
+
+        total = 0
+        for level in levels:
+            started = time.monotonic()
+            written = generate_cohort_reports(session, term, level, notify=options['notify'])
+            total += written
+            line = f"  {level.name}: {written} reports"
+            if options['pdf'] or options['force_pdf']:
+                pdf_stats = render_report_pdfs(
+                    ProgressReport.objects.filter(academic_session=session, term=term, school_level=level),
+                    workers=options['workers'],
+                    force=options['force_pdf'],
+                )
+                line += f", {pdf_stats['rendered']} PDFs rendered ({pdf_stats['skipped']} unchanged)"
+            self.stdout.write(f"{line} in {time.monotonic() - started:.2f}s")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {total} progress reports for {session.name} {term.name}"
+            )
+        )
@@ -0,0 +1,38 @@
+"""
+Management command to rebuild denormalised CourseProgress rows.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from assessments.services import rebuild_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user course progress records from quiz attempts and grades'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only rebuild progress for the user with this email',
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only create progress rows for courses that have none yet',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            User = get_user_model()
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user found with email {options['user']}")
+
+        self.stdout.write('Rebuilding course progress...')
+
+        total = rebuild_course_progress(user=user, missing_only=options['missing_only'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {total} course progress records')
+        )
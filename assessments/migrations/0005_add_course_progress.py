@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0004_add_study_plan'),
+        ('courses', '0005_alter_course_unique_together_course_curriculum_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('module_count', models.IntegerField(default=0)),
+                ('completed_modules', models.IntegerField(default=0)),
+                ('average_score', models.DecimalField(decimal_places=2, default=0, help_text='Average of best quiz percentage per completed module', max_digits=5)),
+                ('progress_percentage', models.IntegerField(default=0)),
+                ('mock_exam_ready', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_records', to='courses.course')),
+                ('grade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='course_progress', to='assessments.grade')),
+                ('next_module', models.ForeignKey(blank=True, help_text='Module to continue with on the dashboard', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.module')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'course_progress',
+                'unique_together': {('user', 'course')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0005_add_course_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Job identifier, e.g. 'grades'", max_length=50, unique=True)),
+                ('last_processed_id', models.BigIntegerField(default=0, help_text='Highest id fully processed (keyset cursor)')),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'backfill_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0006_add_backfill_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progressreport',
+            name='pdf_file',
+            field=models.FileField(blank=True, help_text='Pre-rendered PDF, named by content fingerprint', upload_to='reports/'),
+        ),
+        migrations.AddField(
+            model_name='progressreport',
+            name='pdf_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
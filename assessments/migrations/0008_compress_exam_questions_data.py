@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:00
+
+import core.fields
+from django.db import migrations, models
+
+from core.fields import compress_existing_rows, set_external_storage
+
+
+def compress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'assessments', 'CourseExam', 'questions_data', 'questions_data_compressed')
+
+
+def decompress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'assessments', 'CourseExam', 'questions_data_compressed', 'questions_data')
+
+
+def use_external_storage(apps, schema_editor):
+    set_external_storage(schema_editor, 'course_exams', 'questions_data')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0007_add_progress_report_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseexam',
+            name='questions_data_compressed',
+            field=core.fields.CompressedJSONField(dictionary='questions', null=True),
+        ),
+        # Nullable so the column can be re-added empty when reversing
+        migrations.AlterField(
+            model_name='courseexam',
+            name='questions_data',
+            field=models.JSONField(default=list, help_text='AI-generated exam questions', null=True),
+        ),
+        migrations.RunPython(compress_rows, decompress_rows),
+        migrations.RemoveField(
+            model_name='courseexam',
+            name='questions_data',
+        ),
+        migrations.RenameField(
+            model_name='courseexam',
+            old_name='questions_data_compressed',
+            new_name='questions_data',
+        ),
+        migrations.AlterField(
+            model_name='courseexam',
+            name='questions_data',
+            field=core.fields.CompressedJSONField(default=list, dictionary='questions', help_text='AI-generated exam questions'),
+        ),
+        migrations.RunPython(use_external_storage, migrations.RunPython.noop),
+    ]
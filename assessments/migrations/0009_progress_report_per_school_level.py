@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:10
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0008_compress_exam_questions_data'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='progressreport',
+            unique_together={('student', 'academic_session', 'term', 'school_level')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0009_progress_report_per_school_level'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacherclass',
+            name='analytics_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped when grades or the roster change; keys the cached analytics snapshot'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from core.fields import CompressedJSONField
 
 
 class Assessment(models.Model):
@@ -103,6 +104,25 @@ class AssessmentSubmission(models.Model):
         return self.score is not None and self.score >= self.assessment.passing_marks
 
 
+# (minimum total score, grade letter, grade point, remarks), highest first
+GRADE_SCALE = [
+    (70, 'A', 4.0, 'Excellent'),
+    (60, 'B', 3.0, 'Very Good'),
+    (50, 'C', 2.0, 'Good'),
+    (45, 'D', 1.0, 'Fair'),
+    (40, 'E', 0.5, 'Pass'),
+    (0, 'F', 0.0, 'Fail'),
+]
+
+
+def grade_for_score(total_score):
+    """Return (grade_letter, grade_point, remarks) for a total score"""
+    for minimum, letter, point, remarks in GRADE_SCALE:
+        if total_score >= minimum:
+            return letter, point, remarks
+    return 'F', 0.0, 'Fail'
+
+
 class Grade(models.Model):
     """6.1: Grade computation - Term grades for students"""
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='grades')
@@ -127,35 +147,14 @@ class Grade(models.Model):
 
     def compute_grade(self):
         """Compute grade letter and points based on total score"""
-        self.total_score = self.continuous_assessment_score + self.exam_score
-        
-        if self.total_score >= 70:
-            self.grade_letter = 'A'
-            self.grade_point = 4.0
-            self.remarks = 'Excellent'
-        elif self.total_score >= 60:
-            self.grade_letter = 'B'
-            self.grade_point = 3.0
-            self.remarks = 'Very Good'
-        elif self.total_score >= 50:
-            self.grade_letter = 'C'
-            self.grade_point = 2.0
-            self.remarks = 'Good'
-        elif self.total_score >= 45:
-            self.grade_letter = 'D'
-            self.grade_point = 1.0
-            self.remarks = 'Fair'
-        elif self.total_score >= 40:
-            self.grade_letter = 'E'
-            self.grade_point = 0.5
-            self.remarks = 'Pass'
-        else:
-            self.grade_letter = 'F'
-            self.grade_point = 0.0
-            self.remarks = 'Fail'
-        
+        self.apply_scale()
         self.save()
 
+    def apply_scale(self):
+        """Set total score, grade letter, points and remarks without saving"""
+        self.total_score = self.continuous_assessment_score + self.exam_score
+        self.grade_letter, self.grade_point, self.remarks = grade_for_score(self.total_score)
+
 
 class ProgressReport(models.Model):
     """6.1: Progress reports per term"""
@@ -171,11 +170,13 @@ class ProgressReport(models.Model):
     total_students = models.IntegerField(null=True, blank=True)
     teacher_remarks = models.TextField(blank=True)
     principal_remarks = models.TextField(blank=True)
+    pdf_file = models.FileField(upload_to='reports/', blank=True, help_text="Pre-rendered PDF, named by content fingerprint")
+    pdf_fingerprint = models.CharField(max_length=64, blank=True)
     generated_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'progress_reports'
-        unique_together = ['student', 'academic_session', 'term']
+        unique_together = ['student', 'academic_session', 'term', 'school_level']
         ordering = ['-generated_at']
 
     def __str__(self):
@@ -210,6 +211,7 @@ class TeacherClass(models.Model):
     term = models.ForeignKey('curriculum.Term', on_delete=models.SET_NULL, null=True, blank=True, related_name='teacher_classes')
     current_week = models.ForeignKey('curriculum.Week', on_delete=models.SET_NULL, null=True, blank=True, related_name='teacher_classes')
     students = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='enrolled_classes', blank=True)
+    analytics_version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped when grades or the roster change; keys the cached analytics snapshot")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -381,7 +383,7 @@ class CourseExam(models.Model):
     course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='exams')
     score = models.IntegerField(default=0)
     total_questions = models.IntegerField(default=20)
-    questions_data = models.JSONField(default=list, help_text="AI-generated exam questions")
+    questions_data = CompressedJSONField(default=list, dictionary='questions', help_text="AI-generated exam questions")
     user_answers = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -404,6 +406,27 @@ class CourseExam(models.Model):
         return self.percentage >= getattr(settings, 'AKILI_EXAM_PASSING_PERCENTAGE', 50)
 
 
+class CourseProgress(models.Model):
+    """Denormalised per-user course progress, refreshed on quiz/exam submission"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='course_progress')
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='progress_records')
+    grade = models.ForeignKey(Grade, on_delete=models.SET_NULL, null=True, blank=True, related_name='course_progress')
+    next_module = models.ForeignKey('courses.Module', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text="Module to continue with on the dashboard")
+    module_count = models.IntegerField(default=0)
+    completed_modules = models.IntegerField(default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Average of best quiz percentage per completed module")
+    progress_percentage = models.IntegerField(default=0)
+    mock_exam_ready = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'course_progress'
+        unique_together = ['user', 'course']
+
+    def __str__(self):
+        return f"{self.user} - {self.course.subject} ({self.completed_modules}/{self.module_count})"
+
+
 class StudyPlan(models.Model):
     """Timetable - Personal study schedule for students"""
     DAY_CHOICES = [
@@ -471,3 +494,21 @@ class CurriculumUpdateRequest(models.Model):
 
     def __str__(self):
         return f"{self.curriculum} - {self.change_type}"
+
+
+class BackfillCheckpoint(models.Model):
+    """Resume point for long-running, chunked backfill jobs"""
+    name = models.CharField(max_length=50, unique=True, help_text="Job identifier, e.g. 'grades'")
+    last_processed_id = models.BigIntegerField(default=0, help_text="Highest id fully processed (keyset cursor)")
+    rows_processed = models.IntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'backfill_checkpoints'
+
+    def __str__(self):
+        status = 'complete' if self.completed_at else f'at id {self.last_processed_id}'
+        return f"{self.name} backfill ({status})"
@@ -0,0 +1,216 @@
+"""
+Creating notifications and pushing them to open tabs.
+
+notify() writes Notification rows, bumps the recipients' unread counters and
+announces the change on a feed; notification_events() feeds the server-sent
+events view, which forwards new notifications and unread counts to the
+header badge. Anything that changes a user's notifications (including
+marking them read) calls publish() so other tabs catch up.
+
+On PostgreSQL the feed is LISTEN/NOTIFY on one channel with the user id as
+payload: a waiting stream wakes when the writing transaction commits and
+queries nothing while idle. Other databases have no such feed, so streams
+poll the user's counters row every AKILI_NOTIFICATION_POLL_SECONDS instead.
+
+Each stream holds a server thread, so streams end after
+AKILI_NOTIFICATION_STREAM_SECONDS (the browser reconnects, resuming from the
+last event id) and at most AKILI_NOTIFICATION_MAX_STREAMS run per process;
+when they are all taken a tab gets the current count and is told to retry
+later, which degrades to slow polling instead of starving page requests.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+CHANNEL = 'akili_notifications'
+# Comment lines keep proxies from timing out an idle stream
+KEEPALIVE_SECONDS = 15
+# Most notifications sent per wake-up; older ones are left to the notifications page
+MAX_EVENTS = 20
+
+_stream_slots = threading.BoundedSemaphore(settings.AKILI_NOTIFICATION_MAX_STREAMS)
+
+
+def notify(user_ids, notification_type, title, message, link=''):
+    """
+    Create the same notification for each user, in the caller's transaction.
+
+    Args:
+        user_ids: Recipient user ids
+        notification_type: One of Notification.NOTIFICATION_TYPE_CHOICES
+        title: Short title shown in lists
+        message: Notification body
+        link: Optional URL the notification opens
+
+    Returns:
+        Number of notifications created
+    """
+    from users.stats import adjust_user_stats
+
+    from .models import Notification
+
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, notification_type=notification_type, title=title, message=message, link=link)
+        for user_id in user_ids
+    ], batch_size=1000)
+    adjust_user_stats(user_ids, 'unread_notifications', 1)
+    publish(user_ids)
+    return len(user_ids)
+
+
+def notify_parents(child, notification_type, title, message, link=''):
+    """Notify every parent linked to a student. Returns the number notified."""
+    from .models import ParentProfile
+
+    parent_ids = ParentProfile.objects.filter(children=child).values_list('user_id', flat=True)
+    return notify(parent_ids, notification_type, title, message, link)
+
+
+def publish(user_ids):
+    """
+    Wake the notification streams of these users once the current
+    transaction commits. A no-op on databases without LISTEN/NOTIFY.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    user_ids = [str(user_id) for user_id in dict.fromkeys(user_ids)]
+    if user_ids:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, id) FROM unnest(%s::text[]) AS id', [CHANNEL, user_ids])
+
+
+class _PollingFeed:
+    """Change feed for databases without LISTEN/NOTIFY: always check after a pause"""
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, settings.AKILI_NOTIFICATION_POLL_SECONDS))
+        return True
+
+    def close(self):
+        pass
+
+
+class _PostgresFeed:
+    """Change feed on LISTEN/NOTIFY, filtered to one user's payload"""
+
+    def __init__(self, user_id):
+        self.payload = str(user_id)
+        self.changed = False
+        connection.ensure_connection()
+        self.conn = connection.connection
+        # Notifications that arrive while a query runs go to handlers, not notifies()
+        self.conn.add_notify_handler(self._handle)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+    def _handle(self, notification):
+        if notification.payload == self.payload:
+            self.changed = True
+
+    def wait(self, timeout):
+        if not self.changed:
+            for notification in self.conn.notifies(timeout=timeout):
+                self._handle(notification)
+                if self.changed:
+                    break
+        changed, self.changed = self.changed, False
+        return changed
+
+    def close(self):
+        self.conn.remove_notify_handler(self._handle)
+        # The connection outlives the request (CONN_MAX_AGE), so stop listening
+        with connection.cursor() as cursor:
+            cursor.execute(f'UNLISTEN {CHANNEL}')
+
+
+def _event(name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {name}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def _notification_data(notification):
+    return {
+        'id': notification.pk,
+        'type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'link': notification.link,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def notification_events(user, last_event_id=None):
+    """
+    Server-sent events for one user's notifications.
+
+    Sends an 'unread' event with the unread count whenever it changes and a
+    'notification' event for each notification newer than last_event_id.
+    Every event carries the newest notification id seen, which the browser
+    sends back as Last-Event-ID when it reconnects.
+
+    Args:
+        user: The user whose notifications to stream
+        last_event_id: Last-Event-ID header from a reconnecting browser
+
+    Yields:
+        Chunks of the text/event-stream body
+    """
+    from django.db.models import Max
+    from users.models import UserStats
+    from users.stats import get_user_stats
+
+    from .models import Notification
+
+    try:
+        last_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_id = None
+
+    if not _stream_slots.acquire(blocking=False):
+        yield f'retry: {settings.AKILI_NOTIFICATION_BUSY_RETRY_MS}\n\n'
+        yield _event('unread', {'count': get_user_stats(user).unread_notifications}, last_id)
+        return
+
+    feed = None
+    try:
+        feed = _PostgresFeed(user.pk) if connection.vendor == 'postgresql' else _PollingFeed()
+        yield f'retry: {settings.AKILI_NOTIFICATION_RETRY_MS}\n\n'
+
+        deadline = time.monotonic() + settings.AKILI_NOTIFICATION_STREAM_SECONDS
+        unread = None
+        changed = True
+        while True:
+            if changed:
+                if last_id is None:
+                    # A fresh tab already rendered the current state; start from here
+                    last_id = Notification.objects.filter(user=user).aggregate(last=Max('pk'))['last'] or 0
+                else:
+                    new = Notification.objects.filter(user=user, pk__gt=last_id).order_by('-pk')[:MAX_EVENTS]
+                    for notification in reversed(list(new)):
+                        last_id = notification.pk
+                        yield _event('notification', _notification_data(notification), last_id)
+
+                count = UserStats.objects.filter(user=user).values_list('unread_notifications', flat=True).first()
+                if count is None:
+                    count = get_user_stats(user).unread_notifications
+                if count != unread:
+                    unread = count
+                    yield _event('unread', {'count': unread}, last_id)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            changed = feed.wait(min(remaining, KEEPALIVE_SECONDS))
+            if not changed:
+                yield ': keepalive\n\n'
+    finally:
+        if feed is not None:
+            feed.close()
+        _stream_slots.release()
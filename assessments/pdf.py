@@ -0,0 +1,74 @@
+"""
+Minimal PDF writer for printable progress reports.
+
+Reports are plain text laid out on A4 pages in the built-in Helvetica
+fonts, so no external PDF library (and none of its memory footprint) is
+needed on small VMs. Only what the report layout uses is supported:
+positioned text lines in regular or bold weight and horizontal rules.
+"""
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+
+
+def _escape(text):
+    """Encode text as a PDF literal string body"""
+    raw = str(text).encode('latin-1', 'replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class PDFDocument:
+    """Accumulates pages of drawing operations and serialises them to bytes"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.pages.append([])
+
+    def text(self, x, y, value, size=10, bold=False):
+        font = b'F2' if bold else b'F1'
+        self.pages[-1].append(
+            b'BT /%s %d Tf %d %d Td (%s) Tj ET' % (font, size, x, y, _escape(value))
+        )
+
+    def rule(self, y, x1=MARGIN, x2=PAGE_WIDTH - MARGIN):
+        self.pages[-1].append(b'0.5 w %d %d m %d %d l S' % (x1, y, x2, y))
+
+    def render(self):
+        """Return the complete PDF file as bytes"""
+        page_count = len(self.pages)
+        # Object numbers: 1 catalog, 2 page tree, 3-4 fonts, then a
+        # (page, content stream) pair per page.
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                b' '.join(b'%d 0 R' % (5 + i * 2) for i in range(page_count)), page_count
+            ),
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        ]
+        for i, operations in enumerate(self.pages):
+            stream = b'\n'.join(operations)
+            objects.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                % (PAGE_WIDTH, PAGE_HEIGHT, 6 + i * 2)
+            )
+            objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+
+        out = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+        xref_offset = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        for offset in offsets:
+            out += b'%010d 00000 n \n' % offset
+        out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objects) + 1, xref_offset
+        )
+        return bytes(out)
@@ -0,0 +1,351 @@
+"""
+Term-end progress report generation.
+
+A cohort is every student whose grade for one SchoolLevel and Term was last
+updated during an AcademicSession (a Grade row is updated in place, so its
+created_at says nothing about the session being reported). A student graded
+at two levels gets one report per level. Per-student averages, subjects passed and the dense class
+position are computed in a single grouped, windowed query, and the
+resulting ProgressReport rows are bulk upserted.
+
+Printable PDFs are rendered in batch over a process pool. Each file is named
+by a fingerprint of the data it shows, so a report is only re-rendered when
+its figures or grades change, and identical content is never written twice.
+"""
+import hashlib
+import json
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Avg, Count, F, Q, Window
+from django.db.models.functions import DenseRank
+
+UPSERT_BATCH_SIZE = 1000
+TWO_PLACES = Decimal('0.01')
+PDF_BATCH_SIZE = 200
+# Bump when the PDF layout changes so every report is re-rendered once
+PDF_LAYOUT_VERSION = 1
+
+
+def cohort_grades(academic_session, term, school_level):
+    """Grades belonging to a session/term/level cohort"""
+    from assessments.models import Grade
+
+    return Grade.objects.filter(
+        term=term,
+        curriculum__school_level=school_level,
+        updated_at__date__gte=academic_session.start_date,
+        updated_at__date__lte=academic_session.end_date,
+    )
+
+
+def cohort_rankings(academic_session, term, school_level):
+    """
+    One row per student with totals and dense rank by average score.
+
+    Returns:
+        Values queryset of dicts with student_id, total_subjects,
+        subjects_passed, average_score, average_grade_point, position
+        and total_students
+    """
+    return cohort_grades(academic_session, term, school_level).values('student_id').annotate(
+        total_subjects=Count('id'),
+        subjects_passed=Count('id', filter=~Q(grade_letter='F')),
+        average_score=Avg('total_score'),
+        average_grade_point=Avg('grade_point'),
+    ).annotate(
+        position=Window(DenseRank(), order_by=F('average_score').desc()),
+        total_students=Window(Count('student_id')),
+    ).order_by('position', 'student_id')
+
+
+def _quantize(value):
+    return Decimal(str(value or 0)).quantize(TWO_PLACES)
+
+
+def generate_cohort_reports(academic_session, term, school_level, notify=False):
+    """
+    Compute and bulk upsert ProgressReport rows for a whole cohort.
+
+    Args:
+        academic_session: AcademicSession instance
+        term: Term instance
+        school_level: SchoolLevel instance
+        notify: Create a REPORT notification for each student
+
+    Returns:
+        Number of ProgressReport rows written
+    """
+    from assessments.models import ProgressReport
+    from assessments import notifications
+
+    update_fields = [
+        'total_subjects', 'subjects_passed', 'average_score',
+        'average_grade_point', 'position', 'total_students', 'generated_at',
+    ]
+
+    def flush(batch):
+        ProgressReport.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['student', 'academic_session', 'term', 'school_level'],
+            update_fields=update_fields,
+        )
+        if notify:
+            notifications.notify(
+                [report.student_id for report in batch], 'REPORT', f'{term.name} Progress Report',
+                f'Your {school_level.name} {term.name} report for {academic_session.name} is ready.',
+            )
+
+    written = 0
+    batch = []
+    with transaction.atomic():
+        for row in cohort_rankings(academic_session, term, school_level).iterator(chunk_size=UPSERT_BATCH_SIZE):
+            batch.append(ProgressReport(
+                student_id=row['student_id'],
+                academic_session=academic_session,
+                term=term,
+                school_level=school_level,
+                total_subjects=row['total_subjects'],
+                subjects_passed=row['subjects_passed'],
+                average_score=_quantize(row['average_score']),
+                average_grade_point=_quantize(row['average_grade_point']),
+                position=row['position'],
+                total_students=row['total_students'],
+            ))
+            if len(batch) >= UPSERT_BATCH_SIZE:
+                flush(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            flush(batch)
+            written += len(batch)
+
+    return written
+
+
+def report_grades(report):
+    """Grades shown on a report, matching the HTML report page"""
+    from assessments.models import Grade
+
+    return Grade.objects.filter(
+        student_id=report.student_id,
+        term_id=report.term_id,
+        curriculum__school_level_id=report.school_level_id
+    ).select_related('curriculum__subject').order_by('curriculum__subject__name')
+
+
+def report_payload(report, grades):
+    """
+    Plain, picklable snapshot of everything printed on a report.
+
+    Args:
+        report: ProgressReport with student, academic_session, term and
+            school_level loaded
+        grades: Iterable of Grade rows with curriculum__subject loaded
+
+    Returns:
+        Dict of strings and lists, suitable for fingerprinting and rendering
+    """
+    return {
+        'layout': PDF_LAYOUT_VERSION,
+        'student': report.student.get_full_name() or report.student.email,
+        'session': report.academic_session.name,
+        'term': report.term.name,
+        'level': report.school_level.name,
+        'average_score': str(report.average_score),
+        'average_grade_point': str(report.average_grade_point),
+        'subjects_passed': report.subjects_passed,
+        'total_subjects': report.total_subjects,
+        'position': report.position,
+        'total_students': report.total_students,
+        'teacher_remarks': report.teacher_remarks,
+        'principal_remarks': report.principal_remarks,
+        'grades': [
+            [
+                grade.curriculum.subject.name,
+                str(grade.continuous_assessment_score),
+                str(grade.exam_score),
+                str(grade.total_score),
+                grade.grade_letter,
+                grade.remarks,
+            ]
+            for grade in grades
+        ],
+    }
+
+
+def report_fingerprint(payload):
+    """SHA-256 of the canonical JSON form of a report payload"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def report_pdf_name(fingerprint):
+    """Content-addressed storage path for a rendered report"""
+    return f'reports/{fingerprint[:2]}/{fingerprint}.pdf'
+
+
+def render_report_pdf(payload):
+    """Lay out a report payload and return the PDF bytes"""
+    from assessments.pdf import MARGIN, PAGE_HEIGHT, PDFDocument
+
+    doc = PDFDocument()
+    y = PAGE_HEIGHT - MARGIN
+
+    doc.text(MARGIN, y, 'Akili Progress Report', size=18, bold=True)
+    y -= 24
+    doc.text(MARGIN, y, payload['student'], size=12, bold=True)
+    y -= 16
+    doc.text(MARGIN, y, f"{payload['session']} - {payload['term']} - {payload['level']}", size=10)
+    y -= 12
+    doc.rule(y)
+    y -= 20
+
+    position = '-'
+    if payload['position']:
+        position = f"{payload['position']} of {payload['total_students']}"
+    for label, value in (
+        ('Average Score', f"{payload['average_score']}%"),
+        ('GPA', payload['average_grade_point']),
+        ('Subjects Passed', f"{payload['subjects_passed']}/{payload['total_subjects']}"),
+        ('Position', position),
+    ):
+        doc.text(MARGIN, y, label, bold=True)
+        doc.text(MARGIN + 120, y, value)
+        y -= 16
+
+    columns = (MARGIN, MARGIN + 200, MARGIN + 250, MARGIN + 305, MARGIN + 355, MARGIN + 400)
+    headings = ('Subject', 'CA', 'Exam', 'Total', 'Grade', 'Remarks')
+
+    def table_header(y):
+        for x, heading in zip(columns, headings):
+            doc.text(x, y, heading, bold=True)
+        doc.rule(y - 6)
+        return y - 20
+
+    y = table_header(y - 14)
+    for row in payload['grades']:
+        if y < MARGIN + 20:
+            doc.new_page()
+            y = table_header(PAGE_HEIGHT - MARGIN)
+        for x, value in zip(columns, row):
+            doc.text(x, y, value)
+        y -= 16
+
+    for label, remarks in (
+        ("Teacher's Remarks", payload['teacher_remarks']),
+        ("Principal's Remarks", payload['principal_remarks']),
+    ):
+        if not remarks:
+            continue
+        if y < MARGIN + 40:
+            doc.new_page()
+            y = PAGE_HEIGHT - MARGIN
+        y -= 10
+        doc.text(MARGIN, y, label, bold=True)
+        y -= 16
+        doc.text(MARGIN, y, remarks)
+        y -= 16
+
+    return doc.render()
+
+
+def _store_pdf(fingerprint, content):
+    """Write rendered bytes under their content address unless already present"""
+    name = report_pdf_name(fingerprint)
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(content))
+    return name
+
+
+def ensure_report_pdf(report):
+    """
+    Return the storage name of an up-to-date PDF for a report.
+
+    The pre-rendered file is used when its fingerprint still matches the
+    report's data; otherwise the report is rendered once in-process.
+    """
+    payload = report_payload(report, report_grades(report))
+    fingerprint = report_fingerprint(payload)
+    if report.pdf_fingerprint == fingerprint and report.pdf_file and default_storage.exists(report.pdf_file.name):
+        return report.pdf_file.name
+
+    report.pdf_file.name = _store_pdf(fingerprint, render_report_pdf(payload))
+    report.pdf_fingerprint = fingerprint
+    report.save(update_fields=['pdf_file', 'pdf_fingerprint'])
+    return report.pdf_file.name
+
+
+def _render_job(job):
+    """Process pool task: (report_id, fingerprint, payload) -> (report_id, fingerprint, bytes)"""
+    report_id, fingerprint, payload = job
+    return report_id, fingerprint, render_report_pdf(payload)
+
+
+def render_report_pdfs(reports, workers=1, force=False):
+    """
+    Render PDFs for many reports, skipping those that are already current.
+
+    Args:
+        reports: ProgressReport queryset
+        workers: Number of worker processes (1 renders in-process)
+        force: Re-render even when the stored fingerprint matches
+
+    Returns:
+        Dict with rendered and skipped counts
+    """
+    from assessments.models import Grade, ProgressReport
+
+    stats = {'rendered': 0, 'skipped': 0}
+    reports = reports.select_related('student', 'academic_session', 'term', 'school_level').order_by('id')
+
+    pool = None
+    if workers > 1:
+        # Workers only lay out bytes; all database and storage access stays here
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    try:
+        batch = list(reports[:PDF_BATCH_SIZE])
+        while batch:
+            grades = defaultdict(list)
+            for grade in Grade.objects.filter(
+                student_id__in={r.student_id for r in batch},
+                term_id__in={r.term_id for r in batch},
+                curriculum__school_level_id__in={r.school_level_id for r in batch},
+            ).select_related('curriculum__subject').order_by('curriculum__subject__name'):
+                grades[(grade.student_id, grade.term_id, grade.curriculum.school_level_id)].append(grade)
+
+            by_id = {r.id: r for r in batch}
+            jobs = []
+            for report in batch:
+                payload = report_payload(report, grades[(report.student_id, report.term_id, report.school_level_id)])
+                fingerprint = report_fingerprint(payload)
+                if (not force and report.pdf_fingerprint == fingerprint
+                        and report.pdf_file and default_storage.exists(report.pdf_file.name)):
+                    stats['skipped'] += 1
+                    continue
+                jobs.append((report.id, fingerprint, payload))
+
+            results = pool.map(_render_job, jobs, chunksize=8) if pool else map(_render_job, jobs)
+            changed = []
+            for report_id, fingerprint, content in results:
+                report = by_id[report_id]
+                report.pdf_file.name = _store_pdf(fingerprint, content)
+                report.pdf_fingerprint = fingerprint
+                changed.append(report)
+
+            ProgressReport.objects.bulk_update(changed, ['pdf_file', 'pdf_fingerprint'])
+            stats['rendered'] += len(changed)
+            batch = list(reports.filter(id__gt=batch[-1].id)[:PDF_BATCH_SIZE])
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return stats
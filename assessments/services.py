@@ -2,70 +2,178 @@
 Grade synchronization services for connecting quizzes to the assessment system.
 """
 from decimal import Decimal
-from django.db.models import Avg, Max
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Max, Value, When
 from django.conf import settings
 
 
-def update_grade_from_quiz(quiz_attempt):
+def quiz_percentage_expression():
+    """SQL expression matching QuizAttempt.percentage (0 when there are no questions)"""
+    return Case(
+        When(total_questions__gt=0, then=F('score') * 100.0 / F('total_questions')),
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+
+
+def _quiz_progress_stats(user, course):
     """
-    Update or create a Grade record based on completed quiz attempts.
+    Compute quiz progress for a user's course with a single grouped aggregate.
     
-    The continuous assessment (CA) score is calculated as the average of best quiz scores
-    for each module in the course, scaled to 40% of the total grade.
+    Returns:
+        Tuple of (module_count, completed_modules, average_best_percentage)
+    """
+    from quizzes.models import QuizAttempt
+    
+    module_count = course.modules.count()
+    
+    best_per_module = QuizAttempt.objects.filter(
+        user=user,
+        module__course=course,
+        completed_at__isnull=False
+    ).values('module_id').annotate(
+        best_percentage=Max(quiz_percentage_expression())
+    ).values_list('best_percentage', flat=True)
+    
+    best_percentages = [Decimal(str(round(p, 2))) for p in best_per_module]
+    completed_modules = len(best_percentages)
+    
+    if completed_modules == 0:
+        return module_count, 0, Decimal('0')
+    
+    return module_count, completed_modules, sum(best_percentages) / completed_modules
+
+
+def refresh_course_progress(user, course, grade=None, stats=None):
+    """
+    Recompute the CourseProgress row for a user's course.
     
     Args:
-        quiz_attempt: A QuizAttempt instance that has been completed
+        user: CustomUser instance
+        course: Course instance
+        grade: Grade for the course's curriculum/term, looked up when omitted
+        stats: Precomputed result of _quiz_progress_stats, computed when omitted
     
     Returns:
-        Grade instance or None if the course doesn't have curriculum/term
+        CourseProgress instance
     """
-    from assessments.models import Grade
+    from assessments.models import CourseProgress, Grade
     from quizzes.models import QuizAttempt
     
-    course = quiz_attempt.module.course
-    user = quiz_attempt.user
+    if stats is None:
+        stats = _quiz_progress_stats(user, course)
+    module_count, completed_modules, average_percentage = stats
     
-    if not course.curriculum or not course.term:
-        return None
+    if grade is None and course.curriculum_id and course.term_id:
+        grade = Grade.objects.filter(
+            student=user,
+            curriculum_id=course.curriculum_id,
+            term_id=course.term_id
+        ).first()
+    
+    last_order = QuizAttempt.objects.filter(
+        user=user,
+        module__course=course,
+        completed_at__isnull=False
+    ).order_by('-completed_at').values_list('module__order', flat=True).first()
+    
+    modules = course.modules.order_by('order')
+    if last_order is not None:
+        modules = modules.filter(order__gt=last_order)
+    
+    progress = (completed_modules / module_count * 100) if module_count > 0 else 0
     
-    grade, created = Grade.objects.get_or_create(
-        student=user,
-        curriculum=course.curriculum,
-        term=course.term,
+    course_progress, created = CourseProgress.objects.update_or_create(
+        user=user,
+        course=course,
         defaults={
-            'continuous_assessment_score': Decimal('0'),
-            'exam_score': Decimal('0'),
+            'grade': grade,
+            'next_module': modules.first(),
+            'module_count': module_count,
+            'completed_modules': completed_modules,
+            'average_score': round(average_percentage, 2),
+            'progress_percentage': round(progress),
+            'mock_exam_ready': completed_modules >= max(1, module_count // 2),
         }
     )
+    return course_progress
+
+
+def rebuild_course_progress(user=None, missing_only=False):
+    """
+    Rebuild CourseProgress rows, e.g. after a deploy or to repair drift.
     
-    all_modules = course.modules.all()
-    module_count = all_modules.count()
+    Args:
+        user: Restrict the rebuild to one user's courses
+        missing_only: Only create rows for courses that have none yet
     
-    if module_count == 0:
-        return grade
+    Returns:
+        Number of CourseProgress rows written
+    """
+    from courses.models import Course
     
-    total_best_percentage = Decimal('0')
-    modules_with_attempts = 0
+    courses = Course.objects.select_related('user').order_by('id')
+    if user is not None:
+        courses = courses.filter(user=user)
+    if missing_only:
+        courses = courses.exclude(progress_records__user=F('user'))
     
-    for module in all_modules:
-        attempts = QuizAttempt.objects.filter(
-            user=user,
-            module=module,
-            completed_at__isnull=False
-        )
-        
-        if attempts.exists():
-            best_attempt = max(attempts, key=lambda a: a.percentage)
-            modules_with_attempts += 1
-            total_best_percentage += Decimal(str(best_attempt.percentage))
+    total = 0
+    for course in courses.iterator():
+        with transaction.atomic():
+            refresh_course_progress(course.user, course)
+        total += 1
+    
+    return total
+
+
+def update_grade_from_quiz(quiz_attempt):
+    """
+    Update or create a Grade record based on completed quiz attempts.
+    
+    The continuous assessment (CA) score is calculated as the average of best quiz scores
+    for each module in the course, scaled to 40% of the total grade.
+    The user's CourseProgress row is refreshed in the same transaction.
     
-    if modules_with_attempts > 0:
-        average_percentage = total_best_percentage / modules_with_attempts
-        ca_max = Decimal(str(getattr(settings, 'AKILI_CA_MAX_SCORE', 40)))
-        ca_score = (average_percentage / 100) * ca_max
-        grade.continuous_assessment_score = round(ca_score, 2)
+    Args:
+        quiz_attempt: A QuizAttempt instance that has been completed
     
-    grade.compute_grade()
+    Returns:
+        Grade instance or None if the course doesn't have curriculum/term
+    """
+    from assessments.models import Grade
+    
+    course = quiz_attempt.module.course
+    user = quiz_attempt.user
+    
+    with transaction.atomic():
+        stats = _quiz_progress_stats(user, course)
+        
+        if not course.curriculum or not course.term:
+            refresh_course_progress(user, course, stats=stats)
+            return None
+        
+        grade, created = Grade.objects.get_or_create(
+            student=user,
+            curriculum=course.curriculum,
+            term=course.term,
+            defaults={
+                'continuous_assessment_score': Decimal('0'),
+                'exam_score': Decimal('0'),
+            }
+        )
+        
+        module_count, modules_with_attempts, average_percentage = stats
+        
+        if module_count > 0:
+            if modules_with_attempts > 0:
+                ca_max = Decimal(str(getattr(settings, 'AKILI_CA_MAX_SCORE', 40)))
+                ca_score = (average_percentage / 100) * ca_max
+                grade.continuous_assessment_score = round(ca_score, 2)
+            
+            grade.compute_grade()
+        
+        refresh_course_progress(user, course, grade=grade, stats=stats)
     
     return grade
 
@@ -75,6 +183,8 @@ def update_grade_from_exam(course_exam):
     Update or create a Grade record based on a completed mock exam.
     
     The exam score is scaled to 60% of the total grade (AKILI_EXAM_MAX_SCORE).
+    The user's CourseProgress row is refreshed and their parents are notified
+    of the new grade in the same transaction.
     
     Args:
         course_exam: A CourseExam instance that has been completed
@@ -82,7 +192,9 @@ def update_grade_from_exam(course_exam):
     Returns:
         Grade instance or None if the course doesn't have curriculum/term
     """
+    from django.urls import reverse
     from assessments.models import Grade, CourseExam
+    from assessments.notifications import notify_parents
     
     course = course_exam.course
     user = course_exam.user
@@ -90,36 +202,44 @@ def update_grade_from_exam(course_exam):
     if not course.curriculum or not course.term:
         return None
     
-    grade, created = Grade.objects.get_or_create(
-        student=user,
-        curriculum=course.curriculum,
-        term=course.term,
-        defaults={
-            'continuous_assessment_score': Decimal('0'),
-            'exam_score': Decimal('0'),
-        }
-    )
-    
-    from django.db.models import F, ExpressionWrapper, FloatField
-    
-    best_exam = CourseExam.objects.filter(
-        user=user,
-        course=course,
-        completed_at__isnull=False,
-        total_questions__gt=0
-    ).annotate(
-        calc_percentage=ExpressionWrapper(
-            F('score') * 100.0 / F('total_questions'),
-            output_field=FloatField()
+    with transaction.atomic():
+        grade, created = Grade.objects.get_or_create(
+            student=user,
+            curriculum=course.curriculum,
+            term=course.term,
+            defaults={
+                'continuous_assessment_score': Decimal('0'),
+                'exam_score': Decimal('0'),
+            }
+        )
+        
+        best_exam = CourseExam.objects.filter(
+            user=user,
+            course=course,
+            completed_at__isnull=False,
+            total_questions__gt=0
+        ).annotate(
+            calc_percentage=ExpressionWrapper(
+                F('score') * 100.0 / F('total_questions'),
+                output_field=FloatField()
+            )
+        ).order_by('-calc_percentage').first()
+        
+        if best_exam:
+            exam_max = Decimal(str(getattr(settings, 'AKILI_EXAM_MAX_SCORE', 60)))
+            exam_score = (Decimal(str(best_exam.percentage)) / 100) * exam_max
+            grade.exam_score = round(exam_score, 2)
+        
+        grade.compute_grade()
+        
+        refresh_course_progress(user, course, grade=grade)
+        
+        notify_parents(
+            user, 'GRADE', f'{course.display_name} grade: {grade.grade_letter}',
+            f'{user.get_full_name() or user.email} scored {course_exam.percentage}% in the mock exam '
+            f'(term total {grade.total_score}).',
+            reverse('assessments:child_progress', args=[user.pk])
         )
-    ).order_by('-calc_percentage').first()
-    
-    if best_exam:
-        exam_max = Decimal(str(getattr(settings, 'AKILI_EXAM_MAX_SCORE', 60)))
-        exam_score = (Decimal(str(best_exam.percentage)) / 100) * exam_max
-        grade.exam_score = round(exam_score, 2)
-    
-    grade.compute_grade()
     
     return grade
 
@@ -160,29 +280,15 @@ def backfill_grades_for_user(user):
     return grades
 
 
-def backfill_all_grades():
+def backfill_all_grades(**options):
     """
     Backfill grades for all users with completed quizzes.
-    Used by management command.
+    Delegates to the chunked engine in assessments.backfill.
     
     Returns:
         Tuple of (total_grades_created, total_users_processed)
     """
-    from quizzes.models import QuizAttempt
-    from django.contrib.auth import get_user_model
-    
-    User = get_user_model()
-    
-    users_with_quizzes = User.objects.filter(
-        quiz_attempts__completed_at__isnull=False
-    ).distinct()
-    
-    total_grades = 0
-    total_users = 0
-    
-    for user in users_with_quizzes:
-        grades = backfill_grades_for_user(user)
-        total_grades += len(grades)
-        total_users += 1
+    from assessments.backfill import run_grade_backfill
     
-    return total_grades, total_users
+    stats = run_grade_backfill(**options)
+    return stats['grades'], stats['users']
@@ -0,0 +1,44 @@
+"""
+Signal handlers that keep cached class analytics snapshots fresh.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import bump_snapshot_version
+from .models import Assignment, AssignmentSubmission, TeacherClass
+
+
+def _bump_for_submission(submission):
+    class_id = Assignment.objects.filter(
+        pk=submission.assignment_id
+    ).values_list('teacher_class_id', flat=True).first()
+    if class_id:
+        bump_snapshot_version(class_id)
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+def submission_saved(sender, instance, **kwargs):
+    if instance.status == 'GRADED':
+        _bump_for_submission(instance)
+
+
+@receiver(post_delete, sender=AssignmentSubmission)
+def submission_deleted(sender, instance, **kwargs):
+    if instance.status == 'GRADED':
+        _bump_for_submission(instance)
+
+
+@receiver(m2m_changed, sender=TeacherClass.students.through)
+def class_roster_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # Changed from the student's side: instance is a user, pk_set holds class ids
+        if action == 'pre_clear':
+            class_ids = instance.enrolled_classes.values_list('pk', flat=True)
+        elif action in ('post_add', 'post_remove'):
+            class_ids = pk_set or []
+        else:
+            return
+        for class_id in class_ids:
+            bump_snapshot_version(class_id)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        bump_snapshot_version(instance.pk)
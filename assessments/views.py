@@ -1,14 +1,22 @@
+import csv
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Avg, Count
+from django.db import transaction
+from django.db.models import Count
 from .models import (
     Assessment, AssessmentSubmission, Grade, ProgressReport,
     TeacherProfile, TeacherClass, Assignment, AssignmentSubmission,
-    ParentProfile, Notification
+    ParentProfile, Notification, CourseProgress
 )
+from .analytics import get_class_analytics, student_performance_rows
+from .notifications import notification_events, notify_parents, publish
+from .reports import ensure_report_pdf, report_grades
+from users.stats import adjust_user_stats
 
 
 @login_required
@@ -62,7 +70,13 @@ def assessment_detail(request, pk):
         submission.score = total_score
         submission.status = 'GRADED'
         submission.graded_at = timezone.now()
-        submission.save()
+        with transaction.atomic():
+            submission.save()
+            notify_parents(
+                request.user, 'GRADE', f'{assessment.title} graded',
+                f'{request.user.get_full_name() or request.user.email} scored {total_score}/{assessment.total_marks}.',
+                reverse('assessments:child_progress', args=[request.user.pk])
+            )
         
         messages.success(request, f'Assessment submitted! Your score: {total_score}/{assessment.total_marks}')
         return redirect('assessments:assessment_result', pk=assessment.pk)
@@ -96,55 +110,15 @@ def assessment_result(request, pk):
 @login_required
 def my_grades(request):
     """6.1: View student grades with quiz performance breakdown"""
-    from courses.models import Course
-    from quizzes.models import QuizAttempt
-    
     grades = Grade.objects.filter(
         student=request.user
     ).select_related('curriculum__subject', 'curriculum__school_level', 'term')
     
-    courses = Course.objects.filter(
+    course_stats = CourseProgress.objects.filter(
         user=request.user,
-        curriculum__isnull=False,
-        term__isnull=False
-    ).select_related('curriculum__subject', 'school_level', 'term').prefetch_related('modules')
-    
-    course_stats = []
-    for course in courses:
-        modules = course.modules.all()
-        module_count = modules.count()
-        
-        completed_modules = 0
-        total_best_percentage = 0
-        
-        for module in modules:
-            attempts = QuizAttempt.objects.filter(
-                user=request.user,
-                module=module,
-                completed_at__isnull=False
-            )
-            if attempts.exists():
-                best = max(attempts, key=lambda a: a.percentage)
-                completed_modules += 1
-                total_best_percentage += best.percentage
-        
-        avg_score = total_best_percentage / completed_modules if completed_modules > 0 else 0
-        progress = (completed_modules / module_count * 100) if module_count > 0 else 0
-        
-        course_grade = grades.filter(
-            curriculum=course.curriculum,
-            term=course.term
-        ).first()
-        
-        course_stats.append({
-            'course': course,
-            'module_count': module_count,
-            'completed_modules': completed_modules,
-            'progress': round(progress),
-            'average_score': round(avg_score, 1),
-            'grade': course_grade,
-            'mock_exam_ready': completed_modules >= max(1, module_count // 2),
-        })
+        course__curriculum__isnull=False,
+        course__term__isnull=False
+    ).select_related('course__school_level', 'course__term', 'grade').order_by('course_id')
     
     context = {
         'grades': grades,
@@ -164,10 +138,7 @@ def progress_report_view(request, pk):
         student=request.user
     )
     
-    grades = Grade.objects.filter(
-        student=request.user,
-        term=report.term
-    ).select_related('curriculum__subject')
+    grades = report_grades(report)
     
     context = {
         'report': report,
@@ -176,6 +147,26 @@ def progress_report_view(request, pk):
     return render(request, 'assessments/progress_report.html', context)
 
 
+def _report_pdf_response(report):
+    """Serve a report's pre-rendered PDF, rendering it first if stale"""
+    name = ensure_report_pdf(report)
+    filename = f"{report.academic_session.name}_{report.term.name}_report.pdf".replace('/', '-').replace(' ', '_')
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+@login_required
+def progress_report_pdf(request, pk):
+    """6.1: Download progress report as PDF"""
+    report = get_object_or_404(
+        ProgressReport.objects.select_related(
+            'student', 'academic_session', 'term', 'school_level'
+        ),
+        pk=pk,
+        student=request.user
+    )
+    return _report_pdf_response(report)
+
+
 @login_required
 def teacher_dashboard(request):
     """6.2: Teacher dashboard"""
@@ -231,38 +222,55 @@ def class_detail(request, pk):
 def class_analytics(request, pk):
     """6.2: Class performance analytics"""
     teacher_class = get_object_or_404(
-        TeacherClass,
+        TeacherClass.objects.select_related('subject', 'school_level', 'academic_session'),
         pk=pk,
         teacher__user=request.user
     )
     
-    submissions = AssignmentSubmission.objects.filter(
-        assignment__teacher_class=teacher_class,
-        status='GRADED'
-    )
-    
-    avg_score = submissions.aggregate(avg=Avg('score'))['avg'] or 0
-    submission_count = submissions.count()
-    
-    student_performance = []
-    for student in teacher_class.students.all():
-        student_subs = submissions.filter(student=student)
-        student_avg = student_subs.aggregate(avg=Avg('score'))['avg'] or 0
-        student_performance.append({
-            'student': student,
-            'average_score': round(student_avg, 2),
-            'submissions': student_subs.count(),
-        })
+    snapshot = get_class_analytics(teacher_class)
     
     context = {
         'teacher_class': teacher_class,
-        'average_score': round(avg_score, 2),
-        'total_submissions': submission_count,
-        'student_performance': student_performance,
+        'average_score': snapshot['average_score'],
+        'total_submissions': snapshot['total_submissions'],
+        'student_performance': snapshot['student_performance'],
     }
     return render(request, 'assessments/class_analytics.html', context)
 
 
+class _Echo:
+    """Pseudo-buffer that hands each written CSV row straight back"""
+    def write(self, value):
+        return value
+
+
+@login_required
+def class_analytics_export(request, pk):
+    """6.2: Stream per-student class analytics as CSV"""
+    teacher_class = get_object_or_404(
+        TeacherClass.objects.select_related('subject', 'school_level'),
+        pk=pk,
+        teacher__user=request.user
+    )
+    
+    writer = csv.writer(_Echo())
+    
+    def rows():
+        yield writer.writerow(['Student', 'Email', 'Average Score', 'Submissions'])
+        for row in student_performance_rows(teacher_class).iterator():
+            yield writer.writerow([
+                f"{row['first_name']} {row['last_name']}".strip(),
+                row['email'],
+                round(row['average_score'] or 0, 2),
+                row['submissions'],
+            ])
+    
+    filename = f"{teacher_class.school_level.name}_{teacher_class.subject.code}_analytics.csv"
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def parent_dashboard(request):
     """6.3: Parent dashboard"""
@@ -343,6 +351,26 @@ def child_progress(request, child_id):
     return render(request, 'assessments/child_progress.html', context)
 
 
+@login_required
+def child_report_pdf(request, child_id, pk):
+    """6.3: Download a child's progress report as PDF"""
+    try:
+        parent = request.user.parent_profile
+    except ParentProfile.DoesNotExist:
+        messages.error(request, 'You are not registered as a parent.')
+        return redirect('dashboard')
+    
+    child = get_object_or_404(parent.children, pk=child_id)
+    report = get_object_or_404(
+        ProgressReport.objects.select_related(
+            'student', 'academic_session', 'term', 'school_level'
+        ),
+        pk=pk,
+        student=child
+    )
+    return _report_pdf_response(report)
+
+
 @login_required
 def notifications_list(request):
     """6.3: View all notifications"""
@@ -360,8 +388,10 @@ def notifications_list(request):
 def mark_notification_read(request, pk):
     """6.3: Mark notification as read"""
     notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.is_read = True
-    notification.save()
+    with transaction.atomic():
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            adjust_user_stats([request.user.pk], 'unread_notifications', -1)
+            publish([request.user.pk])
     
     if notification.link:
         return redirect(notification.link)
@@ -371,11 +401,28 @@ def mark_notification_read(request, pk):
 @login_required
 def mark_all_notifications_read(request):
     """6.3: Mark all notifications as read"""
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    with transaction.atomic():
+        marked = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        adjust_user_stats([request.user.pk], 'unread_notifications', -marked)
+        if marked:
+            publish([request.user.pk])
     messages.success(request, 'All notifications marked as read.')
     return redirect('assessments:notifications')
 
 
+@login_required
+def notification_stream(request):
+    """Server-sent events that keep open tabs' notification badges current"""
+    response = StreamingHttpResponse(
+        notification_events(request.user, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def parent_payments(request):
     """6.3: Parent Portal - Payment management for children"""
@@ -683,7 +730,12 @@ def course_exam_detail(request, exam_id):
         exam.completed_at = timezone.now()
         exam.user_answers = user_answers
         exam.passed = exam.is_passing
-        exam.save()
+        with transaction.atomic():
+            # A concurrent submission of the same exam may have completed it first
+            if not CourseExam.objects.filter(pk=exam.pk, completed_at__isnull=True).update(completed_at=exam.completed_at):
+                return redirect('assessments:course_exam_detail', exam_id=exam.id)
+            exam.save()
+            adjust_user_stats([request.user.pk], 'completed_exams', 1)
         
         try:
             update_grade_from_exam(exam)
@@ -6,17 +6,26 @@ set -o errexit  # Exit on error
 # Install dependencies
 pip install -r requirements.txt
 
-# Collect static files
+# Generate WebP/AVIF image variants, collect and pre-compress static files
+python manage.py optimize_images
 python manage.py collectstatic --no-input
+python manage.py static_report
 
 # Apply database migrations
 python manage.py migrate
 
+# Create course progress rows for any courses that predate them
+python manage.py rebuild_course_progress --missing-only
+
+# Create per-user counter rows for any users that predate them
+python manage.py reconcile_user_stats --missing-only
+
 # Create cache table
 # "|| true" ensures the build doesn't fail if the table already exists
 python manage.py createcachetable || true
 
-# Seed curriculum data if not already present
+# Seed curriculum data if not already present, restoring the bundled
+# snapshot (curriculum/fixtures/curriculum_snapshot.json.gz)
 # Check if school_levels table has data before seeding
 python manage.py shell -c "
 from curriculum.models import SchoolLevel
@@ -26,4 +35,4 @@ if SchoolLevel.objects.count() == 0:
 else:
     print('Curriculum data already exists. Skipping seed.')
     exit(0)
-" && echo "Skipping seed_curriculum" || python manage.py seed_curriculum
+" && echo "Skipping seed_curriculum" || python manage.py seed_curriculum --from-snapshot
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.contrib.staticfiles.apps import StaticFilesConfig
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+
+class AkiliStaticFilesConfig(StaticFilesConfig):
+    """Keeps build inputs (the Tailwind source stylesheet) out of collectstatic"""
+    ignore_patterns = StaticFilesConfig.ignore_patterns + ['src']
@@ -0,0 +1,140 @@
+"""
+Compression codecs for large stored payloads.
+
+Blobs start with a one-byte codec marker so the format can evolve without
+rewriting old rows:
+
+    0x00 <utf-8 bytes>                     stored as-is (small values)
+    0x01 <raw deflate>                     zlib, no dictionary
+    0x02 <dictionary id> <raw deflate>     zlib with a preset dictionary
+
+Preset dictionaries hold substrings common to our content (lesson HTML,
+question JSON), which greatly improves compression of short documents.
+Dictionaries are identified by id and must never change once rows use
+them: ids 1-15 are the built-in seeds below, ids 16+ are dictionaries
+trained on the live corpus with ``train_compression_dictionary`` and stored
+as ``core/zdicts/<id>.zdict``.
+"""
+import functools
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZLIB_DICT = 2
+
+COMPRESSION_LEVEL = 6
+MIN_COMPRESS_BYTES = 64  # Smaller values are stored raw
+MAX_DICTIONARY_BYTES = 32 * 1024  # zlib only uses the last 32 KB of a dictionary
+DICTIONARY_DIR = Path(__file__).resolve().parent / 'zdicts'
+
+# Seed dictionaries: least common fragments first, most common last
+LESSON_HTML_SEED = ''.join([
+    '<table>\n<thead>\n<tr>\n<th>', '</th>\n<th>', '</th>\n</tr>\n</thead>\n<tbody>\n<tr>\n<td>',
+    '</td>\n</tr>\n</tbody>\n</table>', '</td>\n<td>', '<blockquote>\n<p>', '</p>\n</blockquote>',
+    '<pre><code>', '</code></pre>', '<code>', '</code>', '<h4>', '</h4>', '<ol>\n<li>', '</li>\n</ol>',
+    "<div class='mt-4 p-3 bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 "
+    "dark:border-yellow-800 rounded-lg text-sm text-yellow-800 dark:text-yellow-200'>"
+    "<strong>Note:</strong> This content is under review.</div>",
+    'Nigerian ', 'Nigeria', 'for example, ', 'For example, ', 'Solution:', 'Answer:', 'Step 1:',
+    'Step 2:', 'Step 3:', 'Example 1', 'Example 2', 'Example 3', 'Question ', 'students ',
+    'important ', 'because ', 'which ', 'that ', 'this ', 'with ', 'from ', 'are ', 'is ',
+    'of the ', 'in the ', 'to the ', 'and the ', ' the ', ' and ', ' of ',
+    '<h2>Practice Questions</h2>\n', '<h2>Worked Examples</h2>\n', '<h2>Explanation</h2>\n',
+    '<h3>', '</h3>\n', '<em>', '</em>', '<ul>\n<li>', '</li>\n</ul>\n', '</li>\n<li>',
+    '</strong> ', '<strong>', '</strong>', '<p>', '</p>\n<p>', '</p>\n',
+]).encode('utf-8')
+
+QUESTION_JSON_SEED = ''.join([
+    'Calculate ', 'Determine ', 'Identify ', 'Explain ', 'Which of these ', 'What is the ',
+    'Which of the following ', ' is correct because ', ' is the correct answer', 'is not ',
+    ' the ', ' of the ', ' and ', ' is ',
+    ',"topic":"Module ', '{"question":"', '","options":["', '"],"correct_index":',
+    ',"explanation":"', '"},{"question":"',
+    '[{"question_text":"', '","choices":["', '","', '"],"correct_index":',
+    ',"explanation":"', '"},{"question_text":"', '"}]',
+]).encode('utf-8')
+
+BUILTIN_DICTIONARIES = {
+    1: LESSON_HTML_SEED,
+    2: QUESTION_JSON_SEED,
+}
+DEFAULT_DICTIONARY_IDS = {'lesson': 1, 'questions': 2}
+
+
+@functools.lru_cache(maxsize=None)
+def get_dictionary(dictionary_id):
+    """Bytes of a preset dictionary by id"""
+    if dictionary_id in BUILTIN_DICTIONARIES:
+        return BUILTIN_DICTIONARIES[dictionary_id]
+    path = DICTIONARY_DIR / f'{dictionary_id}.zdict'
+    if not path.exists():
+        raise LookupError(f"Compression dictionary {dictionary_id} not found")
+    return path.read_bytes()
+
+
+def dictionary_id_for(kind):
+    """Dictionary id new values of a kind ('lesson', 'questions') are written with"""
+    configured = getattr(settings, 'AKILI_COMPRESSION_DICTIONARIES', {})
+    return configured.get(kind, DEFAULT_DICTIONARY_IDS.get(kind))
+
+
+def compress(data, dictionary_id=None):
+    """Encode bytes into a codec-tagged blob"""
+    if len(data) < MIN_COMPRESS_BYTES:
+        return bytes([CODEC_RAW]) + data
+    if dictionary_id:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=get_dictionary(dictionary_id))
+        header = bytes([CODEC_ZLIB_DICT, dictionary_id])
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+        header = bytes([CODEC_ZLIB])
+    return header + compressor.compress(data) + compressor.flush()
+
+
+def decompress(blob):
+    """Decode a codec-tagged blob back to bytes"""
+    blob = bytes(blob)
+    if not blob:
+        return b''
+    codec = blob[0]
+    if codec == CODEC_RAW:
+        return blob[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(blob[1:], -15)
+    if codec == CODEC_ZLIB_DICT:
+        decompressor = zlib.decompressobj(-15, zdict=get_dictionary(blob[1]))
+        return decompressor.decompress(blob[2:]) + decompressor.flush()
+    raise ValueError(f"Unknown compression codec {codec}")
+
+
+def train_dictionary(samples, size=16 * 1024):
+    """
+    Build a preset dictionary from sample documents.
+
+    Fragments (markup tags, JSON keys and punctuation, word runs) are scored
+    by how many bytes they would save across the samples; the best fit in
+    `size` bytes, ordered so the most valuable sit at the end where zlib
+    references them most cheaply.
+    """
+    fragment_re = re.compile(r'<[^<>]{1,60}>\n?|"[a-z_]{2,30}":\s*\[?"?|[^<>"{}\[\]]{4,40}')
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(fragment_re.findall(sample)))
+
+    size = min(size, MAX_DICTIONARY_BYTES)
+    chosen = []
+    total = 0
+    for fragment, count in sorted(counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if count < 2:
+            continue
+        encoded = fragment.encode('utf-8')
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(chosen))
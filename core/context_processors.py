@@ -1,22 +1,18 @@
-from django.utils import timezone
-
-
 def credits_processor(request):
     """
     Add user credits and notifications to template context.
-    Only calls reset_daily_credits() if the day has changed.
+    The nightly reset_daily_credits command tops up allowances; the check
+    here is an in-memory date comparison that only writes for users the
+    nightly run missed. The unread count comes from the user's stats row,
+    loaded with the user.
     """
     if request.user.is_authenticated:
-        from assessments.models import Notification
+        from users.stats import get_user_stats
         
-        today = timezone.now().date()
-        if request.user.last_daily_reset != today:
+        if request.user.needs_daily_reset():
             request.user.reset_daily_credits()
         
-        unread_notifications = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
+        unread_notifications = get_user_stats(request.user).unread_notifications
         
         has_parent_profile = hasattr(request.user, 'parent_profile')
         has_teacher_profile = hasattr(request.user, 'teacher_profile')
@@ -29,3 +25,12 @@ def credits_processor(request):
             'has_teacher_profile': has_teacher_profile,
         }
     return {}
+
+
+def lite_mode_processor(request):
+    """Pick the page skeleton: trimmed base_lite.html for low-bandwidth requests"""
+    lite_mode = getattr(request, 'lite_mode', False)
+    return {
+        'lite_mode': lite_mode,
+        'base_template': 'base_lite.html' if lite_mode else 'base.html',
+    }
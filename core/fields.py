@@ -0,0 +1,103 @@
+"""
+Model fields stored compressed in the database.
+
+Values are str (CompressedTextField) or JSON-serialisable objects
+(CompressedJSONField) in Python and codec-tagged compressed bytes in the
+database; see core.compression for the format. Compressed columns cannot be
+filtered or searched in SQL.
+"""
+import json
+
+from django import forms
+from django.db import models
+
+from core.compression import compress, decompress, dictionary_id_for
+
+
+class CompressedTextField(models.BinaryField):
+    """Text stored zlib-compressed with an optional preset dictionary"""
+
+    def __init__(self, *args, dictionary=None, **kwargs):
+        self.dictionary = dictionary
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dictionary:
+            kwargs['dictionary'] = self.dictionary
+        return name, path, args, kwargs
+
+    def get_default(self):
+        return models.Field.get_default(self)
+
+    def decode(self, data):
+        return data.decode('utf-8')
+
+    def encode(self, value):
+        return str(value).encode('utf-8')
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return self.decode(decompress(value))
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self.decode(decompress(value))
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        dictionary_id = dictionary_id_for(self.dictionary) if self.dictionary else None
+        return compress(self.encode(value), dictionary_id)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'form_class': forms.CharField, 'widget': forms.Textarea, **kwargs})
+
+
+class CompressedJSONField(CompressedTextField):
+    """JSON document stored zlib-compressed"""
+
+    def decode(self, data):
+        return json.loads(data.decode('utf-8'))
+
+    def encode(self, value):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'form_class': forms.JSONField, **kwargs})
+
+
+def compress_existing_rows(apps, app_label, model_name, source, target, chunk_size=500):
+    """
+    Copy a column into its compressed replacement in primary-key chunks.
+
+    For use from RunPython data migrations with historical models; the
+    target field's get_prep_value does the compression.
+    """
+    model = apps.get_model(app_label, model_name)
+    last_pk = 0
+    while True:
+        rows = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', source)[:chunk_size]
+        )
+        if not rows:
+            break
+        for row in rows:
+            setattr(row, target, getattr(row, source))
+        model.objects.bulk_update(rows, [target])
+        last_pk = rows[-1].pk
+
+
+def set_external_storage(schema_editor, table, column):
+    """Stop Postgres TOAST from re-compressing already compressed values"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'ALTER TABLE {schema_editor.quote_name(table)} '
+            f'ALTER COLUMN {schema_editor.quote_name(column)} SET STORAGE EXTERNAL'
+        )
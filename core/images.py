@@ -0,0 +1,104 @@
+"""
+Responsive, modern-format variants of the images in static/images.
+
+``optimize_images`` (run at build time, before collectstatic) writes WebP
+and AVIF copies of each source image at a few widths into
+static/images/optimized/, plus variants.json describing them. The
+``{% picture %}`` template tag reads that file to emit <picture> elements
+that let browsers pick the smallest format and size they support, falling
+back to the original image.
+"""
+import functools
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+SOURCE_DIR = 'images'
+OUTPUT_DIR = 'images/optimized'
+VARIANTS_FILE = f'{OUTPUT_DIR}/variants.json'
+SOURCE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+SKIP_DIRS = {'icons', 'optimized'}  # PWA icons must stay PNG
+
+# (MIME type, Pillow format, file extension, save options), preferred first
+FORMATS = (
+    ('image/avif', 'AVIF', 'avif', {'quality': 55}),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 6}),
+)
+
+
+def responsive_widths():
+    return getattr(settings, 'AKILI_RESPONSIVE_IMAGE_WIDTHS', (64, 128, 256, 512))
+
+
+def source_images(static_root):
+    """Static paths (relative to static_root) of the images to optimise"""
+    base = Path(static_root) / SOURCE_DIR
+    for path in sorted(base.rglob('*')):
+        relative = path.relative_to(base)
+        if path.suffix.lower() in SOURCE_EXTENSIONS and not SKIP_DIRS & set(relative.parts[:-1]):
+            yield f'{SOURCE_DIR}/{relative.as_posix()}'
+
+
+def build_variants(static_root, force=False):
+    """
+    Write WebP/AVIF variants of every source image and the variants file.
+
+    Args:
+        static_root: Source static directory (the one under version control)
+        force: Regenerate variants that are already newer than their source
+
+    Returns:
+        Tuple of (variants dict as written to variants.json, list of
+        (source, original_bytes, best_variant_bytes) for the report)
+    """
+    from PIL import Image, features
+
+    static_root = Path(static_root)
+    output_dir = static_root / OUTPUT_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    formats = [fmt for fmt in FORMATS if features.check(fmt[1].lower())]
+
+    variants = {}
+    report = []
+    for source in source_images(static_root):
+        source_path = static_root / source
+        with Image.open(source_path) as image:
+            image.load()
+            width, height = image.size
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if image.mode in ('LA', 'P', 'PA') else 'RGB')
+
+            stem = Path(source).with_suffix('').as_posix()[len(SOURCE_DIR) + 1:].replace('/', '-')
+            widths = [w for w in responsive_widths() if w < width] + [width]
+            entry = {'width': width, 'height': height, 'sources': {}}
+            full_size = []
+            for mime, pil_format, extension, options in formats:
+                srcset = []
+                for target in widths:
+                    name = f'{OUTPUT_DIR}/{stem}-{target}.{extension}'
+                    path = static_root / name
+                    if force or not path.exists() or path.stat().st_mtime < source_path.stat().st_mtime:
+                        resized = image if target == width else image.resize(
+                            (target, max(1, round(height * target / width))), Image.LANCZOS
+                        )
+                        resized.save(path, pil_format, **options)
+                    srcset.append([name, target])
+                entry['sources'][mime] = srcset
+                full_size.append((static_root / srcset[-1][0]).stat().st_size)
+        variants[source] = entry
+        report.append((source, source_path.stat().st_size, min(full_size) if full_size else source_path.stat().st_size))
+
+    (static_root / VARIANTS_FILE).write_text(json.dumps(variants, indent=2, sort_keys=True))
+    return variants, report
+
+
+@functools.lru_cache(maxsize=1)
+def load_variants():
+    """Variants described by variants.json, or {} before optimize_images has run"""
+    path = finders.find(VARIANTS_FILE)
+    if not path:
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
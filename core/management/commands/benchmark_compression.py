@@ -0,0 +1,87 @@
+"""
+Compare storage size and codec cost of raw, zlib and zlib+dictionary
+encodings for lesson HTML and question JSON.
+"""
+import json
+import time
+import zlib
+from django.core.management.base import BaseCommand
+from core.compression import compress, decompress, dictionary_id_for
+
+SAMPLE_LESSON = (
+    "<h2>Explanation</h2>\n<p>A <strong>quadratic equation</strong> has the form "
+    "<em>ax² + bx + c = 0</em> where a is not zero.</p>\n<ul>\n<li>Identify the coefficients</li>\n"
+    "<li>Compute the discriminant</li>\n<li>Apply the formula</li>\n</ul>\n"
+    "<h2>Worked Examples</h2>\n<p><strong>Example 1</strong>: Solve x² - 5x + 6 = 0.</p>\n"
+    "<p>Step 1: a = 1, b = -5, c = 6. Step 2: the discriminant is 1. Step 3: x = 2 or x = 3.</p>\n"
+    "<h2>Practice Questions</h2>\n<ol>\n<li>Solve x² - 7x + 12 = 0.</li>\n"
+    "<li>Find the discriminant of 2x² + 3x - 5 = 0.</li>\n</ol>\n"
+)
+SAMPLE_QUESTIONS = [
+    {
+        'question_text': f'What is the value of x in {n}x + 4 = {n * 3 + 4}?',
+        'choices': ['1', '2', '3', '4'],
+        'correct_index': 2,
+        'explanation': f'Subtract 4 from both sides and divide by {n}, so x = 3.',
+    }
+    for n in range(2, 12)
+]
+
+
+def _samples(kind, limit):
+    """Rows from the database, falling back to synthetic samples"""
+    if kind == 'lesson':
+        from courses.models import CachedLesson
+        rows = list(CachedLesson.objects.order_by('-id').values_list('content', flat=True)[:limit])
+        return [row.encode('utf-8') for row in rows] or [SAMPLE_LESSON.encode('utf-8')] * 10
+
+    from quizzes.models import QuizAttempt
+    rows = list(QuizAttempt.objects.order_by('-id').values_list('questions_data', flat=True)[:limit])
+    documents = rows or [SAMPLE_QUESTIONS] * 10
+    return [json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for doc in documents]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compressed storage of lesson HTML and question JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=['lesson', 'questions'],
+            default='lesson',
+            help='Payload kind to benchmark (default: lesson)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=200,
+            help='Most recent rows to sample (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        samples = _samples(kind, options['samples'])
+        raw_bytes = sum(len(sample) for sample in samples)
+        self.stdout.write(f"{len(samples)} {kind} samples, {raw_bytes:,} bytes raw")
+
+        codecs = (
+            ('zlib (stdlib defaults)', lambda data: zlib.compress(data), zlib.decompress),
+            ('zlib, raw deflate', lambda data: compress(data), decompress),
+            (f'zlib + dictionary {dictionary_id_for(kind)}',
+             lambda data: compress(data, dictionary_id_for(kind)), decompress),
+        )
+        for label, encode, decode in codecs:
+            started = time.perf_counter()
+            blobs = [encode(sample) for sample in samples]
+            encode_ms = (time.perf_counter() - started) / len(samples) * 1000
+            started = time.perf_counter()
+            for blob in blobs:
+                decode(blob)
+            decode_ms = (time.perf_counter() - started) / len(samples) * 1000
+            stored = sum(len(blob) for blob in blobs)
+            self.stdout.write(
+                f"  {label:<28} {stored:>10,} bytes  {raw_bytes / stored:5.2f}x  "
+                f"compress {encode_ms:.3f} ms  decompress {decode_ms:.3f} ms per row"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
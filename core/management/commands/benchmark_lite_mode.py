@@ -0,0 +1,140 @@
+"""
+Compare page weight and modelled time to interactive of full and lite pages.
+
+Renders the core student flows (dashboard, module listing, lesson, quiz) as
+a real user, once per mode, and adds up the HTML plus every stylesheet,
+script, image and font the page pulls in. Local static files are measured;
+third-party assets use their typical gzipped transfer sizes. Time to
+interactive is modelled for a 2G link from the bytes, the round trips and
+the measured server time - it is an estimate, not a browser measurement.
+
+The user's lite mode preference is switched during the run and restored.
+"""
+import gzip
+import re
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+# Typical gzipped transfer sizes of third-party assets
+EXTERNAL_ASSET_BYTES = {
+    'fonts.googleapis.com': 1_500 + 95_000,  # Inter CSS plus the font files it pulls in
+    'katex.min.css': 6_500 + 60_000,  # KaTeX CSS plus the fonts a typical lesson uses
+    'katex.min.js': 73_000,
+    'auto-render.min.js': 1_500,
+}
+KATEX_BYTES = EXTERNAL_ASSET_BYTES['katex.min.css'] + EXTERNAL_ASSET_BYTES['katex.min.js'] + EXTERNAL_ASSET_BYTES['auto-render.min.js']
+
+ASSET_RE = re.compile(
+    r'<link[^>]+rel="stylesheet"[^>]+href="([^"]+)"|<link[^>]+href="([^"]+)"[^>]+rel="stylesheet"'
+    r'|<script[^>]+src="([^"]+)"|<img[^>]+src="([^"]+)"'
+)
+MATH_RE = re.compile(r'\$|\\\(|\\\[')
+
+
+def _asset_bytes(url):
+    """Gzipped size of an asset, or None if it cannot be sized"""
+    for marker, size in EXTERNAL_ASSET_BYTES.items():
+        if marker in url:
+            return size
+    if url.startswith('/static/'):
+        path = finders.find(url[len('/static/'):].split('?')[0])
+        if path:
+            with open(path, 'rb') as f:
+                return len(gzip.compress(f.read()))
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Report page weight and modelled 2G time to interactive for full vs lite pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Render as this user (default: the first user with a course)')
+        parser.add_argument(
+            '--bandwidth-kbps',
+            type=int,
+            default=250,
+            help='Modelled downlink in kilobits per second (default: 250, typical 2G/EDGE)',
+        )
+        parser.add_argument(
+            '--rtt-ms',
+            type=int,
+            default=600,
+            help='Modelled round trip time in milliseconds (default: 600)',
+        )
+
+    def handle(self, *args, **options):
+        from courses.models import Course, Module
+        from quizzes.models import QuizAttempt
+
+        User = get_user_model()
+        if options['email']:
+            user = User.objects.filter(email=options['email']).first()
+        else:
+            user = User.objects.filter(courses__isnull=False).first()
+        if user is None:
+            raise CommandError('No user with a course found; pass --email')
+
+        course = Course.objects.filter(user=user).first()
+        lesson_module = Module.objects.filter(course__user=user, lesson_content__isnull=False).first()
+        quiz = QuizAttempt.objects.filter(user=user).order_by('completed_at').first()
+        pages = [('dashboard', reverse('dashboard'))]
+        if course:
+            pages.append(('module listing', reverse('courses:module_listing', args=[course.id])))
+        if lesson_module:
+            pages.append(('lesson', reverse('courses:lesson_detail', args=[lesson_module.id])))
+        if quiz:
+            pages.append(('quiz', reverse('quizzes:quiz_detail', args=[quiz.id])))
+
+        self.bytes_per_ms = options['bandwidth_kbps'] * 1000 / 8 / 1000
+        self.rtt = options['rtt_ms']
+        client = Client()
+        client.force_login(user)
+        original = user.lite_mode
+        try:
+            for label, url in pages:
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                for mode in ('off', 'on'):
+                    user.lite_mode = mode
+                    user.save(update_fields=['lite_mode'])
+                    self._measure(client, url, 'lite' if mode == 'on' else 'full')
+        finally:
+            user.lite_mode = original
+            user.save(update_fields=['lite_mode'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmarked {len(pages)} pages at {options['bandwidth_kbps']} kbps / {self.rtt} ms RTT"
+        ))
+
+    def _measure(self, client, url, mode):
+        started = time.perf_counter()
+        response = client.get(url)
+        server_ms = (time.perf_counter() - started) * 1000
+        html = response.content.decode('utf-8', 'replace')
+        html_bytes = len(gzip.compress(response.content))
+
+        assets = {next(group for group in match.groups() if group) for match in ASSET_RE.finditer(html)}
+        sizes = [_asset_bytes(asset) for asset in assets]
+        asset_bytes = sum(size for size in sizes if size)
+        unsized = sum(1 for size in sizes if size is None)
+        # HTML, then one wave of parallel subresource requests (plus connection setup to CDNs)
+        origins = {asset.split('/')[2] for asset in assets if asset.startswith('http')}
+        round_trips = 1 + (1 if assets else 0) + len(origins)
+
+        # Lite pages fetch KaTeX only when the page contains maths: CDN connection, script, auto-render
+        if 'renderMathInElement = function' in html and MATH_RE.search(re.sub(r'<script.*?</script>', '', html, flags=re.S)):
+            asset_bytes += KATEX_BYTES
+            round_trips += 3
+
+        total = html_bytes + asset_bytes
+        tti_ms = server_ms + round_trips * self.rtt + total / self.bytes_per_ms
+
+        self.stdout.write(
+            f"  {mode:<5} HTML {html_bytes / 1024:6.1f} KB  assets {asset_bytes / 1024:6.1f} KB "
+            f"({len(assets)} requests{f', {unsized} unsized' if unsized else ''})  "
+            f"total {total / 1024:6.1f} KB  TTI ~{tti_ms / 1000:5.1f} s"
+        )
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for the Markdown to sanitised HTML rendering pipeline.
+"""
+import time
+from django.core.management.base import BaseCommand
+from core.utils.rendering import (
+    CONTENT_TYPES, clear_render_cache, render_markdown, render_markdown_uncompiled
+)
+
+SAMPLE_LESSON = """## Explanation
+
+A **quadratic equation** has the form $ax^2 + bx + c = 0$ where *a* is not zero.
+
+1. Identify the coefficients
+2. Compute the discriminant $b^2 - 4ac$
+3. Apply the formula
+
+| Discriminant | Roots |
+|---|---|
+| positive | two real roots |
+| zero | one repeated root |
+| negative | no real roots |
+
+```
+x = (-b ± sqrt(b^2 - 4ac)) / 2a
+```
+
+> Tip: always check your answer by substitution.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-call vs pre-built vs cached Markdown rendering'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=500,
+            help='Renders per scenario (default: 500)',
+        )
+        parser.add_argument(
+            '--content-type',
+            choices=sorted(CONTENT_TYPES),
+            default='lesson',
+            help='Content type profile to benchmark (default: lesson)',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        content_type = options['content_type']
+        # Distinct documents so the cold scenarios never hit the cache
+        documents = [f"{SAMPLE_LESSON}\n\nVariant {i}." for i in range(iterations)]
+
+        scenarios = (
+            ('per-call (markdown.markdown + bleach.clean)',
+             lambda doc: render_markdown_uncompiled(doc, content_type)),
+            ('pre-built pipeline, cold',
+             lambda doc: render_markdown(doc, content_type, use_cache=False)),
+            ('pre-built pipeline, cached',
+             lambda doc: render_markdown(SAMPLE_LESSON, content_type)),
+        )
+
+        clear_render_cache()
+        render_markdown(SAMPLE_LESSON, content_type)
+
+        baseline = None
+        for label, render in scenarios:
+            started = time.perf_counter()
+            for doc in documents:
+                render(doc)
+            elapsed = time.perf_counter() - started
+            per_call = elapsed / iterations * 1000
+            baseline = baseline or per_call
+            self.stdout.write(
+                f"  {label:<45} {per_call:8.3f} ms/render  ({baseline / per_call:5.1f}x)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Benchmarked {iterations} '{content_type}' renders per scenario"))
@@ -0,0 +1,45 @@
+"""
+Generate responsive WebP/AVIF variants of static/images for {% picture %}.
+
+Run at build time before collectstatic so the variants are hashed,
+compressed and served immutable like every other static file.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/AVIF variants of static images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even if they are newer than their source',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import features
+        except ImportError:
+            raise CommandError('Pillow is required to optimise images (pip install Pillow)')
+        from core.images import FORMATS, build_variants
+
+        for _, pil_format, _, _ in FORMATS:
+            if not features.check(pil_format.lower()):
+                self.stdout.write(self.style.WARNING(f'{pil_format} is not supported by this Pillow build; skipping'))
+
+        static_root = settings.STATICFILES_DIRS[0]
+        variants, report = build_variants(static_root, force=options['force'])
+
+        original_total = best_total = 0
+        for source, original, best in report:
+            original_total += original
+            best_total += best
+            self.stdout.write(f"  {source:<40} {original / 1024:8.1f} KB -> {best / 1024:8.1f} KB")
+
+        saved = original_total - best_total
+        self.stdout.write(self.style.SUCCESS(
+            f"Optimised {len(variants)} images: {original_total / 1024:.1f} KB -> {best_total / 1024:.1f} KB "
+            f"at full size ({saved / 1024:.1f} KB saved, more at smaller widths)"
+        ))
@@ -0,0 +1,77 @@
+"""
+Report how many bytes the static build saves.
+
+Reads the collected STATIC_ROOT: for every hashed file in the manifest it
+compares the original size with the gzip and brotli variants WhiteNoise
+wrote next to it, which is what browsers actually download.
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def compression_report(static_root):
+    """
+    Sizes of each hashed static file and its pre-compressed variants.
+
+    Returns:
+        List of (name, original_bytes, gzip_bytes or None, brotli_bytes or None)
+    """
+    static_root = Path(static_root)
+    manifest_path = static_root / 'staticfiles.json'
+    if not manifest_path.exists():
+        raise FileNotFoundError(f'{manifest_path} not found; run collectstatic first')
+    manifest = json.loads(manifest_path.read_text())
+
+    rows = []
+    for hashed in sorted(set(manifest['paths'].values())):
+        path = static_root / hashed
+        if not path.exists():
+            continue
+        gz = path.with_name(path.name + '.gz')
+        br = path.with_name(path.name + '.br')
+        rows.append((
+            hashed,
+            path.stat().st_size,
+            gz.stat().st_size if gz.exists() else None,
+            br.stat().st_size if br.exists() else None,
+        ))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Report bytes saved by pre-compressed static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='List the N largest files (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = compression_report(settings.STATIC_ROOT)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        original = sum(size for _, size, _, _ in rows)
+        # Browsers download the smallest variant they accept
+        served = sum(min(s for s in (size, gz, br) if s is not None) for _, size, gz, br in rows)
+        brotli_files = sum(1 for *_, br in rows if br is not None)
+
+        for name, size, gz, br in sorted(rows, key=lambda row: row[1], reverse=True)[:options['top']]:
+            variants = '  '.join(
+                f"{label} {value / 1024:7.1f} KB" for label, value in (('gzip', gz), ('br', br)) if value is not None
+            )
+            self.stdout.write(f"  {name:<50} {size / 1024:8.1f} KB  {variants}")
+
+        if not brotli_files:
+            self.stdout.write(self.style.WARNING('No brotli variants found; install Brotli before collectstatic'))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} static files: {original / 1024:.1f} KB raw, {served / 1024:.1f} KB over the wire "
+            f"({(original - served) / 1024:.1f} KB saved, {brotli_files} with brotli)"
+        ))
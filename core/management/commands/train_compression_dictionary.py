@@ -0,0 +1,68 @@
+"""
+Train a preset compression dictionary from stored lessons or questions.
+
+Writes core/zdicts/<id>.zdict. Deploy the file, then point new writes at it:
+
+    AKILI_COMPRESSION_DICTIONARIES = {'lesson': 16}
+
+Existing rows keep the dictionary id they were written with, so a
+dictionary file must never be changed or removed once it is in use.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.compression import DICTIONARY_DIR, compress, train_dictionary
+from core.management.commands.benchmark_compression import _samples
+
+
+class Command(BaseCommand):
+    help = 'Train a zlib preset dictionary on stored content'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=['lesson', 'questions'],
+            required=True,
+            help='Payload kind to train on',
+        )
+        parser.add_argument(
+            '--id',
+            type=int,
+            required=True,
+            help='Dictionary id to write (16-255; 1-15 are reserved for built-in seeds)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=1000,
+            help='Most recent rows to train on (default: 1000)',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=16 * 1024,
+            help='Dictionary size in bytes (default: 16384, max 32768)',
+        )
+
+    def handle(self, *args, **options):
+        dictionary_id = options['id']
+        if not 16 <= dictionary_id <= 255:
+            raise CommandError('Dictionary id must be between 16 and 255')
+        path = DICTIONARY_DIR / f'{dictionary_id}.zdict'
+        if path.exists():
+            raise CommandError(f'{path} already exists; dictionaries are immutable, pick a new id')
+
+        samples = _samples(options['kind'], options['samples'])
+        dictionary = train_dictionary([sample.decode('utf-8') for sample in samples], size=options['size'])
+        if not dictionary:
+            raise CommandError('Not enough repeated content to train a dictionary')
+
+        DICTIONARY_DIR.mkdir(exist_ok=True)
+        path.write_bytes(dictionary)
+
+        raw = sum(len(sample) for sample in samples)
+        plain = sum(len(compress(sample)) for sample in samples)
+        trained = sum(len(compress(sample, dictionary_id)) for sample in samples)
+        self.stdout.write(
+            f"{len(samples)} samples: {raw:,} bytes raw, {plain:,} without dictionary, {trained:,} with"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(dictionary):,} byte dictionary to {path}"))
+        self.stdout.write(f"Enable it with AKILI_COMPRESSION_DICTIONARIES = {{'{options['kind']}': {dictionary_id}}}")
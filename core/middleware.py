@@ -6,6 +6,7 @@ import logging
 from django.core.cache import caches
 from django.http import HttpResponse
 from django.conf import settings
+from django.utils.cache import patch_vary_headers
 
 logger = logging.getLogger(__name__)
 
@@ -125,3 +126,38 @@ class ErrorLoggingMiddleware:
             }
         )
         return None  # Let Django's default handler take over
+
+
+def wants_lite_mode(request):
+    """
+    Whether to serve low-bandwidth pages for a request.
+
+    A user's explicit 'on' / 'off' choice wins; otherwise lite pages are used
+    when the browser sends Save-Data or reports a 2G effective connection.
+    """
+    user = getattr(request, 'user', None)
+    preference = getattr(user, 'lite_mode', 'auto') if user and user.is_authenticated else 'auto'
+    if preference != 'auto':
+        return preference == 'on'
+    if request.headers.get('Save-Data', '').strip().lower() == 'on':
+        return True
+    return request.headers.get('ECT', '').strip().lower() in settings.AKILI_LITE_MODE_ECT
+
+
+class LiteModeMiddleware:
+    """
+    Flag requests that should get lite pages (request.lite_mode).
+
+    Asks browsers for the ECT client hint, and varies responses on the
+    headers the decision depends on.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        
+    def __call__(self, request):
+        request.lite_mode = wants_lite_mode(request)
+        response = self.get_response(request)
+        response.headers.setdefault('Accept-CH', 'ECT, Save-Data')
+        patch_vary_headers(response, ('Save-Data', 'ECT'))
+        return response
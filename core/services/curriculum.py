@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from django.db.models import QuerySet
 from django.db import transaction
 
@@ -7,57 +7,46 @@ from curriculum.models import (
     Topic, StudentProgramme, SubjectEnrolment, 
     AcademicSession, LegacyExamMapping
 )
+from curriculum.reference import get_reference_data
 
 
 class CurriculumService:
     
     @staticmethod
-    def get_school_levels() -> QuerySet[SchoolLevel]:
-        return SchoolLevel.objects.all().order_by('level_order')
+    def get_school_levels() -> Tuple[SchoolLevel, ...]:
+        return get_reference_data().levels
     
     @staticmethod
     def get_school_level_by_name(name: str) -> Optional[SchoolLevel]:
-        try:
-            return SchoolLevel.objects.get(name=name)
-        except SchoolLevel.DoesNotExist:
-            return None
+        return get_reference_data().levels_by_name.get(name)
     
     @staticmethod
     def get_school_level_by_id(level_id: int) -> Optional[SchoolLevel]:
-        try:
-            return SchoolLevel.objects.get(id=level_id)
-        except SchoolLevel.DoesNotExist:
-            return None
+        return get_reference_data().levels_by_id.get(level_id)
     
     @staticmethod
-    def get_subjects_for_level(school_level: SchoolLevel) -> QuerySet[Subject]:
-        return school_level.subjects.all().order_by('name')
+    def get_subjects_for_level(school_level: SchoolLevel) -> Tuple[Subject, ...]:
+        return CurriculumService.get_subjects_for_level_by_id(school_level.id)
     
     @staticmethod
-    def get_subjects_for_level_by_id(level_id: int) -> QuerySet[Subject]:
-        try:
-            school_level = SchoolLevel.objects.get(id=level_id)
-            return school_level.subjects.all().order_by('name')
-        except SchoolLevel.DoesNotExist:
-            return Subject.objects.none()
+    def get_subjects_for_level_by_id(level_id: int) -> Tuple[Subject, ...]:
+        return get_reference_data().subjects_by_level.get(level_id, ())
+    
+    @staticmethod
+    def is_subject_offered(level_id: int, subject_id: int) -> bool:
+        return subject_id in get_reference_data().subject_ids_by_level.get(level_id, ())
     
     @staticmethod
-    def get_terms() -> QuerySet[Term]:
-        return Term.objects.all().order_by('order')
+    def get_terms() -> Tuple[Term, ...]:
+        return get_reference_data().terms
     
     @staticmethod
     def get_term_by_id(term_id: int) -> Optional[Term]:
-        try:
-            return Term.objects.get(id=term_id)
-        except Term.DoesNotExist:
-            return None
+        return get_reference_data().terms_by_id.get(term_id)
     
     @staticmethod
     def get_subject_by_id(subject_id: int) -> Optional[Subject]:
-        try:
-            return Subject.objects.get(id=subject_id)
-        except Subject.DoesNotExist:
-            return None
+        return get_reference_data().subjects_by_id.get(subject_id)
     
     @staticmethod
     def get_curriculum(
@@ -66,15 +55,7 @@ class CurriculumService:
         term: Term,
         version: str = "2025"
     ) -> Optional[SubjectCurriculum]:
-        try:
-            return SubjectCurriculum.objects.get(
-                school_level=school_level,
-                subject=subject,
-                term=term,
-                version=version
-            )
-        except SubjectCurriculum.DoesNotExist:
-            return None
+        return CurriculumService.get_curriculum_by_ids(school_level.id, subject.id, term.id, version)
     
     @staticmethod
     def get_curriculum_by_ids(
@@ -83,40 +64,43 @@ class CurriculumService:
         term_id: int,
         version: str = "2025"
     ) -> Optional[SubjectCurriculum]:
-        try:
-            return SubjectCurriculum.objects.select_related(
-                'school_level', 'subject', 'term'
-            ).get(
-                school_level_id=school_level_id,
-                subject_id=subject_id,
-                term_id=term_id,
-                version=version
-            )
-        except SubjectCurriculum.DoesNotExist:
-            return None
+        return get_reference_data().curricula_by_key.get((school_level_id, subject_id, term_id, version))
+    
+    @staticmethod
+    def get_available_subjects(level_id: int, term_id: int) -> Tuple[Subject, ...]:
+        offered = get_reference_data().availability.get((level_id, term_id), {})
+        return tuple(curriculum.subject for curriculum in offered.values())
+    
+    @staticmethod
+    def get_available_curriculum(level_id: int, term_id: int, subject_id: int) -> Optional[SubjectCurriculum]:
+        return get_reference_data().availability.get((level_id, term_id), {}).get(subject_id)
+    
+    @staticmethod
+    def get_availability_document() -> Tuple[str, bytes]:
+        snapshot = get_reference_data()
+        return snapshot.availability_version, snapshot.availability_json
     
     @staticmethod
     def get_topics_for_curriculum(curriculum: SubjectCurriculum) -> QuerySet[Topic]:
         return curriculum.topics.select_related('week').order_by('week__week_number', 'order')
     
     @staticmethod
-    def get_weeks_for_term(term: Term) -> QuerySet[Week]:
-        return term.weeks.all().order_by('week_number')
+    def get_weeks_for_term(term: Term) -> Tuple[Week, ...]:
+        return get_reference_data().weeks_by_term.get(term.id, ())
     
     @staticmethod
     def get_legacy_mapping(
         exam_type: str, 
-        subject_name: str
+        subject_name: str,
+        fuzzy: bool = False
     ) -> Optional[LegacyExamMapping]:
-        try:
-            return LegacyExamMapping.objects.select_related(
-                'school_level', 'subject', 'curriculum'
-            ).get(
-                exam_type=exam_type,
-                subject_name=subject_name
-            )
-        except LegacyExamMapping.DoesNotExist:
-            return None
+        """
+        Mapping for a legacy subject name, ignoring case, spacing and
+        punctuation; with fuzzy=True near misses match too (see
+        curriculum.aliases). The mapping comes from the reference data
+        snapshot and must not be modified.
+        """
+        return get_reference_data().legacy_aliases.lookup(exam_type, subject_name, fuzzy=fuzzy)
     
     @staticmethod
     def get_active_session() -> Optional[AcademicSession]:
@@ -160,7 +144,8 @@ class CurriculumService:
         
         curriculum = CurriculumService.get_curriculum(school_level, subject, term)
         
-        first_week = term.weeks.order_by('week_number').first()
+        weeks = CurriculumService.get_weeks_for_term(term)
+        first_week = weeks[0] if weeks else None
         
         enrolment, created = SubjectEnrolment.objects.get_or_create(
             programme=programme,
@@ -233,9 +218,14 @@ class CurriculumService:
         current_week: Week,
         limit: int = 5
     ) -> List[Topic]:
-        return list(curriculum.topics.filter(
-            week__week_number__lt=current_week.week_number
-        ).select_related('week').order_by('-week__week_number', '-order')[:limit])
+        earlier = curriculum.topics_before_week(current_week.week_number)
+        if not earlier:
+            return []
+        # Newest first: the topics before this week are the last `earlier` in curriculum order
+        start = curriculum.total_topics - earlier
+        return list(curriculum.topics.select_related('week').order_by(
+            '-week__week_number', '-order'
+        )[start:start + min(limit, earlier)])
     
     @staticmethod
     def get_topic_by_id(topic_id: int) -> Optional[Topic]:
@@ -252,12 +242,19 @@ class CurriculumService:
         if not enrolment.curriculum or not enrolment.current_week:
             return 0.0
         
-        total_topics = enrolment.curriculum.topics.count()
+        total_topics = enrolment.curriculum.total_topics
         if total_topics == 0:
             return 0.0
         
-        completed_topics = enrolment.curriculum.topics.filter(
-            week__week_number__lt=enrolment.current_week.week_number
-        ).count()
+        completed_topics = enrolment.curriculum.topics_before_week(enrolment.current_week.week_number)
         
         return round((completed_topics / total_topics) * 100, 2)
+    
+    @staticmethod
+    def calculate_weeks_remaining(enrolment: SubjectEnrolment) -> int:
+        """Weeks of curriculum topics left, counting the current week"""
+        if not enrolment.curriculum or not enrolment.current_week:
+            return 0
+        
+        last_week = enrolment.curriculum.last_topic_week
+        return max(0, last_week - enrolment.current_week.week_number + 1)
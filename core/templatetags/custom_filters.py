@@ -1,4 +1,5 @@
 from django import template
+from django.utils.safestring import mark_safe
 
 register = template.Library()
 
@@ -11,4 +12,11 @@ def get_item(dictionary, key):
             key = str(key)
         return dictionary.get(key)
     except AttributeError:
-        return None
\ No newline at end of file
+        return None
+
+
+@register.filter
+def render_content(text, content_type='lesson'):
+    """Renders Markdown to sanitised HTML through the shared rendering pipeline."""
+    from core.utils.rendering import render_markdown
+    return mark_safe(render_markdown(text, content_type))
@@ -0,0 +1,40 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import load_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(src, alt='', sizes='100vw', **attrs):
+    """
+    Renders a static image as a <picture> offering AVIF/WebP variants.
+
+    Usage: {% picture 'images/logo.png' alt='Akili' sizes='40px' class='h-10' %}
+    Extra keyword arguments become attributes of the fallback <img>; falls
+    back to a plain <img> for images without generated variants.
+    """
+    attrs.setdefault('decoding', 'async')
+    variant = load_variants().get(src)
+    if variant:
+        attrs.setdefault('width', variant['width'])
+        attrs.setdefault('height', variant['height'])
+
+    img = format_html(
+        '<img src="{}" alt="{}"{}>',
+        static(src), alt,
+        format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items())),
+    )
+    if not variant:
+        return img
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime, ', '.join(f'{static(name)} {width}w' for name, width in srcset), sizes)
+            for mime, srcset in variant['sources'].items()
+        ),
+    )
+    return format_html('<picture>{}{}</picture>', sources, img)
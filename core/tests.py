@@ -1,4 +1,5 @@
-from django.test import TestCase, Client
+from unittest.mock import patch
+from django.test import SimpleTestCase, TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from courses.models import Course
@@ -96,6 +97,30 @@ class DashboardViewTestCase(TestCase):
         response = self.client.get(reverse('dashboard'))
         self.assertEqual(response.context['courses_count'], 1)
     
+    def test_continue_learning_keeps_course_order_and_falls_back_to_first_module(self):
+        """Test courses without a progress row still appear, in course order"""
+        from courses.models import Module
+        from assessments.models import CourseProgress
+        
+        started = Course.objects.create(user=self.user, subject='Biology')
+        fresh = Course.objects.create(user=self.user, subject='Chemistry')
+        started_modules = [
+            Module.objects.create(course=started, title=f'Bio {i}', order=i, syllabus_topic='Cells')
+            for i in (1, 2)
+        ]
+        fresh_first = Module.objects.create(course=fresh, title='Chem 1', order=1, syllabus_topic='Atoms')
+        CourseProgress.objects.create(
+            user=self.user, course=started, next_module=started_modules[1],
+            module_count=2, completed_modules=1
+        )
+        
+        response = self.client.get(reverse('dashboard'))
+        
+        items = response.context['continue_learning']
+        self.assertEqual([item['course'] for item in items], [started, fresh])
+        self.assertEqual([item['module'] for item in items], [started_modules[1], fresh_first])
+        self.assertEqual([item['action'] for item in items], ['Continue', 'Start'])
+    
     def test_dashboard_shows_referral_url(self):
         """Test dashboard shows referral URL"""
         response = self.client.get(reverse('dashboard'))
@@ -155,3 +180,328 @@ class ContextProcessorsTestCase(TestCase):
         """Test dashboard context processor adds expected data"""
         response = self.client.get(reverse('dashboard'))
         self.assertIn('user_daily_limit', response.context)
+
+
+@override_settings(GEMINI_API_KEY='test-key', GROQ_API_KEY='')
+class AIFallbackTruncationTestCase(SimpleTestCase):
+    """Tests for truncation detection and continuation in the AI fallback layer"""
+    
+    def test_is_truncated_json(self):
+        from core.utils.ai_fallback import is_truncated_json
+        
+        self.assertFalse(is_truncated_json('{"questions": [{"q": "a [b] {c}"}]}'))
+        self.assertTrue(is_truncated_json('{"questions": [{"q": "a"}, {"q": "b'))
+        self.assertTrue(is_truncated_json('{"q": "escaped \\" quote", "r": ['))
+        self.assertFalse(is_truncated_json('Plain prose answer.'))
+    
+    @patch('core.utils.ai_fallback._try_gemini_paid')
+    @patch('core.utils.ai_fallback._try_gemini_flash')
+    def test_truncated_json_is_continued_on_same_tier(self, flash, paid):
+        from core.utils.ai_fallback import call_ai_with_fallback
+        
+        flash.side_effect = [
+            {'success': True, 'content': '{"questions": [{"q": "one"}, {"q": "tw', 'tier': 'Gemini Flash', 'truncated': True},
+            {'success': True, 'content': '```\no"}]}\n```', 'tier': 'Gemini Flash', 'truncated': False},
+        ]
+        
+        result = call_ai_with_fallback('prompt', is_json=True)
+        
+        self.assertEqual(result['content'], '{"questions": [{"q": "one"}, {"q": "two"}]}')
+        self.assertEqual(result['continuations'], 1)
+        self.assertEqual(flash.call_count, 2)
+        self.assertFalse(flash.call_args.args[3])
+        self.assertIn('{"q": "tw', flash.call_args.args[0])
+        paid.assert_not_called()
+    
+    @patch('core.utils.ai_fallback._try_gemini_flash')
+    def test_overlap_is_trimmed_and_continuations_capped(self, flash):
+        from core.utils.ai_fallback import MAX_CONTINUATIONS, call_ai_with_fallback
+        
+        flash.side_effect = [
+            {'success': True, 'content': '{"items": ["alpha beta gamma', 'tier': 'Gemini Flash', 'truncated': True},
+        ] + [
+            {'success': True, 'content': 'alpha beta gamma delta", ', 'tier': 'Gemini Flash', 'truncated': True},
+        ] * MAX_CONTINUATIONS
+        
+        result = call_ai_with_fallback('prompt', is_json=True)
+        
+        self.assertTrue(result['content'].startswith('{"items": ["alpha beta gamma delta", '))
+        self.assertEqual(result['continuations'], MAX_CONTINUATIONS)
+        self.assertEqual(flash.call_count, MAX_CONTINUATIONS + 1)
+
+
+class StructuredOutputTestCase(SimpleTestCase):
+    """Tests for the tolerant structured-output parser"""
+    
+    def test_repairs_trailing_commas_and_latex(self):
+        from core.utils.structured_output import extract_json
+        
+        raw = '```json\n{"questions": [{"q": "Find $\\frac{1}{2}$ of \\alpha, then \\text{x}\\n"},],}\n```'
+        data = extract_json(raw)
+        
+        self.assertEqual(data['questions'][0]['q'], 'Find $\\frac{1}{2}$ of \\alpha, then \\text{x}\n')
+    
+    def test_valid_json_escapes_round_trip_unchanged(self):
+        import json
+        from core.utils.structured_output import extract_json
+        
+        payload = {'lesson': '\tThe first line\nnot the last\nnext\r\nback\bspace\fform', 'items': ['\nnumber', 'col1\tTotal', '\ne = 5']}
+        self.assertEqual(extract_json(json.dumps(payload)), payload)
+        self.assertEqual(extract_json('Here it is:\n' + json.dumps(payload) + '\nDone.'), payload)
+    
+    def test_latex_in_valid_json_is_not_read_as_escapes(self):
+        from core.utils.structured_output import extract_json
+        
+        raw = '{"question": "Simplify $\\frac{1}{2} \\times 4$ and \\beta \\nabla \\right) \\text{m}"}'
+        data = extract_json(raw)
+        
+        self.assertEqual(data['question'], 'Simplify $\\frac{1}{2} \\times 4$ and \\beta \\nabla \\right) \\text{m}')
+    
+    def test_invalid_items_are_dropped_not_fatal(self):
+        from core.utils.structured_output import QUIZ_QUESTION_SCHEMA, parse_items
+        
+        raw = '''Here you go: {"questions": [
+            {"question_text": "Q1", "choices": ["a", "b", "c", "d"], "correct_index": "C"},
+            {"question": "Q2", "options": ["w", "x", "y", "z"], "correct_index": "x"},
+            {"question_text": "Q3", "choices": ["a", "b"], "correct_index": 0},
+            {"question_text": "Q4", "choices": ["a", "b", "c", "d"], "correct_index": 7}
+        ]}'''
+        items, rejected = parse_items(raw, QUIZ_QUESTION_SCHEMA, 'questions')
+        
+        self.assertEqual(rejected, 2)
+        self.assertEqual([q['correct_index'] for q in items], [2, 1])
+        self.assertEqual(items[1]['question_text'], 'Q2')
+        self.assertEqual(items[1]['choices'], ['w', 'x', 'y', 'z'])
+        self.assertEqual(items[0]['explanation'], '')
+    
+    def test_collect_items_requests_only_missing(self):
+        from core.utils.structured_output import MODULE_SCHEMA, collect_items
+        
+        requested = []
+        responses = iter([
+            '{"modules": [{"title": "One", "topic": "t"}, {"topic": "no title"}, {"title": "Two"}]}',
+            '{"modules": [{"title": "Three", "topic": "t"}, {"title": "Four", "topic": "t"}]}',
+        ])
+        
+        def request(missing, accepted):
+            requested.append((missing, len(accepted)))
+            return next(responses)
+        
+        items = collect_items(request, MODULE_SCHEMA, 'modules', 4)
+        
+        self.assertEqual([m['title'] for m in items], ['One', 'Two', 'Three', 'Four'])
+        self.assertEqual(items[1]['topic'], 'Unspecified Topic')
+        self.assertEqual(requested, [(4, 0), (2, 2)])
+    
+    def test_module_plan_is_ordered_by_week(self):
+        from core.utils.ai_module_generator import _order_by_week
+        
+        modules = [
+            {'title': 'Three', 'week': 3},
+            {'title': 'One', 'week': 1},
+            {'title': 'No week', 'week': None},
+            {'title': 'Also three', 'week': 3},
+            {'title': 'Too late', 'week': 9},
+        ]
+        
+        ordered = _order_by_week(modules, range(1, 5))
+        
+        self.assertEqual([m['title'] for m in ordered], ['One', 'No week', 'Three', 'Also three'])
+
+
+class RenderingPipelineTestCase(SimpleTestCase):
+    """Tests for the shared Markdown rendering pipeline"""
+    
+    def test_matches_per_call_rendering_and_sanitises(self):
+        from core.utils.rendering import render_markdown, render_markdown_uncompiled
+        
+        text = '# Title\n\n**Bold** <script>alert(1)</script> [x](javascript:alert(1))\n\n| a | b |\n|---|---|\n| 1 | 2 |'
+        html = render_markdown(text, 'lesson', use_cache=False)
+        
+        self.assertEqual(html, render_markdown_uncompiled(text, 'lesson'))
+        self.assertIn('<strong>Bold</strong>', html)
+        self.assertIn('<table>', html)
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('javascript:', html)
+    
+    def test_content_types_have_their_own_allow_lists(self):
+        from core.utils.rendering import render_markdown
+        
+        self.assertNotIn('<h1>', render_markdown('# Big', 'tutor'))
+        self.assertIn('<br', render_markdown('line one\nline two', 'tutor'))
+        self.assertNotIn('<table>', render_markdown('| a |\n|---|\n| 1 |', 'feedback'))
+        with self.assertRaises(ValueError):
+            render_markdown('x', 'unknown')
+    
+    def test_cached_and_thread_safe(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from core.utils.rendering import clear_render_cache, render_markdown
+        
+        clear_render_cache()
+        self.assertIs(render_markdown('*cached*'), render_markdown('*cached*'))
+        
+        documents = [f'## Doc {i}\n\n- item *{i}*\n\n```\ncode {i}\n```' for i in range(40)]
+        expected = [render_markdown(doc, use_cache=False) for doc in documents]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda doc: render_markdown(doc, use_cache=False), documents * 3))
+        self.assertEqual(results, expected * 3)
+
+
+class CompressedStorageTestCase(TestCase):
+    """Tests for codec-tagged compression and the compressed model fields"""
+    
+    def test_round_trip_and_codecs(self):
+        from core.compression import CODEC_RAW, CODEC_ZLIB, CODEC_ZLIB_DICT, compress, decompress
+        
+        html = ('<h2>Explanation</h2>\n<p>The <strong>Nigerian</strong> example is here.</p>\n' * 20).encode('utf-8')
+        self.assertEqual(compress(b'short')[0], CODEC_RAW)
+        self.assertEqual(compress(html)[0], CODEC_ZLIB)
+        self.assertEqual(compress(html, 1)[:2], bytes([CODEC_ZLIB_DICT, 1]))
+        self.assertEqual(decompress(compress(b'short')), b'short')
+        self.assertEqual(decompress(memoryview(compress(html))), html)
+        self.assertEqual(decompress(compress(html, 1)), html)
+        self.assertEqual(decompress(b''), b'')
+        with self.assertRaises(ValueError):
+            decompress(b'\x09abc')
+    
+    def test_dictionary_beats_plain_zlib_on_short_documents(self):
+        from core.compression import compress, train_dictionary
+        from core.management.commands.benchmark_compression import SAMPLE_LESSON
+        
+        data = SAMPLE_LESSON.encode('utf-8')
+        self.assertLess(len(compress(data, 1)), len(compress(data)))
+        
+        dictionary = train_dictionary([SAMPLE_LESSON, SAMPLE_LESSON.replace('Example 1', 'Example 2')])
+        self.assertTrue(0 < len(dictionary) <= 16 * 1024)
+        self.assertIn(b'Worked Examples', dictionary)
+        self.assertNotIn(b'Example 1', dictionary)
+    
+    def test_model_fields_round_trip(self):
+        from django.db import connection
+        from courses.models import CachedLesson, Module
+        
+        User = get_user_model()
+        user = User.objects.create_user(email='zip@example.com', password='testpass123')
+        course = Course.objects.create(user=user, subject='Mathematics')
+        module = Module.objects.create(course=course, title='Quadratics', order=1, syllabus_topic='Quadratics')
+        content = '<p>Quadratic equations ✓</p>\n' * 50
+        lesson = CachedLesson.objects.create(topic='Quadratics', content=content, syllabus_version='1')
+        questions = [{'question_text': 'Solve x² = 4', 'choices': ['1', '2', '3', '4'], 'correct_index': 1}] * 10
+        attempt = QuizAttempt.objects.create(user=user, module=module, questions_data=questions)
+        
+        self.assertEqual(CachedLesson.objects.get(pk=lesson.pk).content, content)
+        self.assertEqual(QuizAttempt.objects.get(pk=attempt.pk).questions_data, questions)
+        self.assertEqual(QuizAttempt.objects.create(user=user, module=module).questions_data, [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM cached_lessons WHERE id = %s', [lesson.pk])
+            stored = bytes(cursor.fetchone()[0])
+        self.assertLess(len(stored), len(content.encode('utf-8')) // 5)
+
+
+class ServiceWorkerTestCase(TestCase):
+    """Tests for serving the PWA service worker"""
+    
+    def test_served_from_root_without_caching(self):
+        response = self.client.get(reverse('service_worker'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/javascript')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertIn(b'syncCourse', response.content)
+
+
+class LiteModeTestCase(TestCase):
+    """Tests for low-bandwidth lite pages"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='lite@example.com', password='testpass123')
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.login(email='lite@example.com', password='testpass123')
+    
+    def assertLite(self, response, lite=True):
+        self.assertEqual(response.status_code, 200)
+        check = self.assertContains if lite else self.assertNotContains
+        check(response, 'class="lite-header"')
+        (self.assertNotContains if lite else self.assertContains)(response, 'fonts.googleapis.com')
+    
+    def test_auto_detects_save_data_and_slow_connections(self):
+        url = reverse('dashboard')
+        self.assertLite(self.client.get(url, HTTP_SAVE_DATA='on'))
+        self.assertLite(self.client.get(url, HTTP_ECT='2g'))
+        self.assertLite(self.client.get(url, HTTP_ECT='4g'), lite=False)
+        
+        response = self.client.get(url)
+        self.assertLite(response, lite=False)
+        self.assertIn('Save-Data', response['Vary'])
+        self.assertIn('ECT', response['Accept-CH'])
+    
+    def test_lite_page_loads_katex_lazily(self):
+        response = self.client.get(reverse('dashboard'), HTTP_SAVE_DATA='on')
+        
+        self.assertNotContains(response, 'katex.min.js"')
+        self.assertContains(response, 'window.renderMathInElement = function')
+    
+    def test_user_preference_overrides_headers(self):
+        response = self.client.post(reverse('profiles:my_profile'), {'lite_mode': 'off'})
+        self.assertRedirects(response, reverse('profiles:my_profile'))
+        self.assertLite(self.client.get(reverse('dashboard'), HTTP_SAVE_DATA='on'), lite=False)
+        
+        self.client.post(reverse('profiles:my_profile'), {'lite_mode': 'on'})
+        self.assertLite(self.client.get(reverse('dashboard')))
+        
+        self.client.post(reverse('profiles:my_profile'), {'lite_mode': 'bogus'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.lite_mode, 'on')
+
+
+class StaticAssetBuildTestCase(SimpleTestCase):
+    """Tests for responsive image markup and the static size report"""
+    
+    VARIANTS = {
+        'images/logo.png': {
+            'width': 300, 'height': 200,
+            'sources': {
+                'image/avif': [['images/optimized/logo-64.avif', 64], ['images/optimized/logo-300.avif', 300]],
+                'image/webp': [['images/optimized/logo-64.webp', 64], ['images/optimized/logo-300.webp', 300]],
+            },
+        },
+    }
+    
+    def render(self, source):
+        from django.template import Context, Template
+        return Template('{% load responsive_images %}' + source).render(Context())
+    
+    def test_picture_offers_modern_formats_with_fallback(self):
+        with patch('core.templatetags.responsive_images.load_variants', return_value=self.VARIANTS):
+            html = self.render("{% picture 'images/logo.png' alt='Akili' sizes='40px' id='header-logo' class='h-10' %}")
+        
+        self.assertTrue(html.startswith('<picture><source type="image/avif"'))
+        self.assertIn('srcset="/static/images/optimized/logo-64.webp 64w, /static/images/optimized/logo-300.webp 300w"', html)
+        self.assertIn('sizes="40px"', html)
+        self.assertIn('<img src="/static/images/logo.png" alt="Akili"', html)
+        self.assertIn('id="header-logo" class="h-10"', html)
+        self.assertIn('width="300" height="200"', html)
+    
+    def test_picture_without_variants_is_plain_img(self):
+        with patch('core.templatetags.responsive_images.load_variants', return_value={}):
+            html = self.render("{% picture 'images/other.png' alt='x' %}")
+        self.assertEqual(html, '<img src="/static/images/other.png" alt="x" decoding="async">')
+    
+    def test_compression_report_reads_hashed_files(self):
+        import json
+        import tempfile
+        from pathlib import Path
+        from core.management.commands.static_report import compression_report
+        
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            (root / 'css').mkdir()
+            (root / 'css/app.abc123.css').write_bytes(b'x' * 1000)
+            (root / 'css/app.abc123.css.gz').write_bytes(b'x' * 100)
+            (root / 'css/app.abc123.css.br').write_bytes(b'x' * 80)
+            (root / 'staticfiles.json').write_text(json.dumps({'paths': {'css/app.css': 'css/app.abc123.css'}}))
+            
+            self.assertEqual(compression_report(root), [('css/app.abc123.css', 1000, 100, 80)])
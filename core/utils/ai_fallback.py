@@ -15,7 +15,8 @@ logger = logging.getLogger(__name__)
 # - Lower token limits reduce memory usage per request
 # - Prevents large response buffering that could cause OOM
 # - 2000-3000 tokens sufficient for most lesson content and quiz generation
-# - For exam generation (20 questions), max_tokens=4000 is passed explicitly
+# - Exam generation requests small question chunks concurrently, each well under the cap
+# - Responses that still hit the cap are resumed with continuation requests (see MAX_CONTINUATIONS)
 # 
 # To adjust for higher-memory VMs, increase these values proportionally.
 # Consider making configurable via environment variables for production tuning.
@@ -31,6 +32,11 @@ REQUEST_TIMEOUT_FLASH = 45  # seconds - reduced for faster failover
 REQUEST_TIMEOUT_PAID = 55  # seconds
 REQUEST_TIMEOUT_GROQ = 35  # seconds
 
+# Responses cut off at the token cap are resumed with cheap continuation
+# requests instead of regenerating the whole answer.
+MAX_CONTINUATIONS = 2
+CONTINUATION_OVERLAP_CHARS = 200  # Max repeated text trimmed when stitching
+
 # --- Core Fallback Logic ---
 
 def call_ai_with_fallback(prompt, system_prompt=None, max_tokens=None, is_json=False, subject=None):
@@ -83,25 +89,19 @@ def call_ai_with_fallback(prompt, system_prompt=None, max_tokens=None, is_json=F
 
     # --- UPDATED TIER ORDER ---
     gemini_key = settings.GEMINI_API_KEY
-
-    # --- Tier 1: Gemini 2.5 Flash ---
-    if gemini_key:
-        result = _try_gemini_flash(full_prompt, gemini_key, max_tokens, is_json)
-        if result:
-            return result
-
-    # --- Tier 2: Gemini Paid (Was Tier 3) ---
-    if gemini_key:
-        result = _try_gemini_paid(full_prompt, gemini_key, max_tokens, is_json)
-        if result:
-            return result
-
-    # --- Tier 3: Groq API (Free - Fallback) ---
     groq_key = settings.GROQ_API_KEY
-    if groq_key:
-        result = _try_groq(full_prompt, groq_key, max_tokens, is_json)
+
+    tiers = [
+        (_try_gemini_flash, gemini_key),  # Tier 1: Gemini 2.5 Flash
+        (_try_gemini_paid, gemini_key),   # Tier 2: Gemini Paid
+        (_try_groq, groq_key),            # Tier 3: Groq API (Free - Fallback)
+    ]
+    for tier_call, api_key in tiers:
+        if not api_key:
+            continue
+        result = tier_call(full_prompt, api_key, max_tokens, is_json)
         if result:
-            return result
+            return _complete_truncated(result, tier_call, api_key, full_prompt, max_tokens, is_json)
 
     # --- Tier 4: Circuit Breaker ---
     return {
@@ -111,6 +111,93 @@ def call_ai_with_fallback(prompt, system_prompt=None, max_tokens=None, is_json=F
     }
 
 
+# --- Truncation Handling ---
+
+def is_truncated_json(text):
+    """
+    True if text holds an unfinished JSON document.
+
+    Brackets are matched outside string literals; an unterminated string or
+    an unclosed object/array means the output was cut off.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    started = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+            started = True
+        elif char in '}]' and stack:
+            stack.pop()
+    return started and (in_string or bool(stack))
+
+
+def _stitch(head, tail):
+    """Join a continuation onto a partial response, dropping any repeated overlap"""
+    tail = tail.lstrip('\n')
+    if tail.startswith('```'):
+        tail = tail.split('\n', 1)[1] if '\n' in tail else ''
+    if tail.rstrip().endswith('```'):
+        tail = tail.rstrip()[:-3].rstrip('\n')
+
+    for size in range(min(len(head), len(tail), CONTINUATION_OVERLAP_CHARS), 10, -1):
+        if head.endswith(tail[:size]):
+            return head + tail[size:]
+    return head + tail
+
+
+def _continuation_prompt(full_prompt, partial):
+    return (
+        f"{full_prompt}\n\n"
+        "Your previous response was cut off at the length limit. "
+        "This is what you wrote so far:\n"
+        f"{partial}\n\n"
+        "Continue EXACTLY from the point where it stopped. Output ONLY the remaining text, "
+        "without repeating anything already written and without any commentary or code fences."
+    )
+
+
+def _complete_truncated(result, tier_call, api_key, full_prompt, max_tokens, is_json):
+    """
+    Resume a truncated tier response with continuation requests to the same tier.
+
+    Truncation is signalled by the provider's finish reason or, for JSON
+    requests, by an unbalanced document. Continuations are plain text so the
+    provider does not force a fresh JSON object.
+    """
+    content = result['content']
+    continuations = 0
+    while continuations < MAX_CONTINUATIONS and (
+        result.get('truncated') or (is_json and is_truncated_json(content))
+    ):
+        follow_up = tier_call(_continuation_prompt(full_prompt, content), api_key, max_tokens, False)
+        if not follow_up or not follow_up['content'].strip():
+            break
+        continuations += 1
+        content = _stitch(content, follow_up['content'])
+        result = follow_up
+
+    if continuations:
+        logger.info(f"{result['tier']} response completed with {continuations} continuation(s)")
+
+    return {
+        'success': True,
+        'content': content,
+        'tier': result['tier'],
+        'continuations': continuations,
+    }
+
+
 # --- Tier Implementations ---
 
 def _try_gemini_flash(prompt, api_key, max_tokens, is_json):
@@ -141,9 +228,10 @@ def _try_gemini_flash(prompt, api_key, max_tokens, is_json):
             result = response.json()
             content = _extract_gemini_content(result)
             if content:
+                truncated = _gemini_hit_token_cap(result)
                 del result
                 gc.collect()
-                return {'success': True, 'content': content, 'tier': 'Gemini Flash'}
+                return {'success': True, 'content': content, 'tier': 'Gemini Flash', 'truncated': truncated}
     except requests.Timeout:
         logger.warning("Gemini Flash timeout")
     except Exception as e:
@@ -152,6 +240,14 @@ def _try_gemini_flash(prompt, api_key, max_tokens, is_json):
     return None
 
 
+def _gemini_hit_token_cap(result):
+    """True if Gemini stopped because it reached maxOutputTokens"""
+    try:
+        return result['candidates'][0].get('finishReason') == 'MAX_TOKENS'
+    except (KeyError, IndexError, AttributeError):
+        return False
+
+
 def _extract_gemini_content(result):
     """Memory-efficient content extraction from Gemini response"""
     try:
@@ -194,9 +290,10 @@ def _try_gemini_paid(prompt, api_key, max_tokens, is_json):
             result = response.json()
             content = _extract_gemini_content(result)
             if content:
+                truncated = _gemini_hit_token_cap(result)
                 del result
                 gc.collect()
-                return {'success': True, 'content': content, 'tier': 'Gemini Paid'}
+                return {'success': True, 'content': content, 'tier': 'Gemini Paid', 'truncated': truncated}
     except requests.Timeout:
         logger.warning("Gemini Paid timeout")
     except Exception as e:
@@ -236,9 +333,10 @@ def _try_groq(prompt, api_key, max_tokens, is_json):
             result = response.json()
             if 'choices' in result and len(result['choices']) > 0:
                 content = result['choices'][0]['message']['content']
+                truncated = result['choices'][0].get('finish_reason') == 'length'
                 del result
                 gc.collect()
-                return {'success': True, 'content': content, 'tier': 'Groq'}
+                return {'success': True, 'content': content, 'tier': 'Groq', 'truncated': truncated}
     except requests.Timeout:
         logger.warning("Groq timeout")
     except Exception as e:
@@ -0,0 +1,148 @@
+"""
+Sectioned lesson generation.
+
+Instead of one long, token-capped "comprehensive lesson" call, a short
+outline call fixes the key points and each lesson section is then requested
+concurrently, so total latency is roughly the slowest section and every
+response stays well inside the tier token caps. Sections are delivered to a
+callback as they land, allowing the lesson page to show them progressively.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+from core.utils.ai_fallback import call_ai_with_fallback
+from core.utils.structured_output import extract_json
+
+logger = logging.getLogger(__name__)
+
+# (key, heading, instruction, max_tokens) in display order
+LESSON_SECTIONS = (
+    ('explanation', 'Explanation',
+     'Explain the key concepts clearly and step by step, building from simple ideas to the full topic. '
+     'Use **bold** for key terms and bullet points for key facts.', 1500),
+    ('examples', 'Worked Examples',
+     'Give 2-3 worked examples that apply the key concepts, with clear step-by-step working. '
+     'Use familiar Nigerian contexts where it helps.', 1200),
+    ('practice', 'Practice Questions',
+     'Write 5 practice questions of increasing difficulty. Provide ONLY the questions, '
+     'with NO answers, hints or solutions.', 600),
+)
+OUTLINE_MAX_TOKENS = 400
+LESSON_DEADLINE_SECONDS = 75  # Overall budget, kept below the gunicorn worker timeout
+
+
+def generate_outline(brief, subject):
+    """
+    Ask for the lesson's key points so concurrent sections stay consistent.
+
+    Returns:
+        List of key point strings (empty if the call or parsing failed)
+    """
+    prompt = f"""{brief}
+
+Before the lesson is written, plan it. Return ONLY a JSON object of the form
+{{"key_points": ["...", "..."]}} listing the 4-6 key points the lesson must teach, in teaching order."""
+
+    result = call_ai_with_fallback(prompt, max_tokens=OUTLINE_MAX_TOKENS, is_json=True, subject=subject)
+    if not result['success']:
+        return []
+    try:
+        data = extract_json(result['content'])
+    except ValueError:
+        return []
+    points = data.get('key_points', []) if isinstance(data, dict) else data
+    return [str(point).strip() for point in points if str(point).strip()] if isinstance(points, list) else []
+
+
+def _section_prompt(brief, outline, heading, instruction):
+    outline_text = "\n".join(f"{i}. {point}" for i, point in enumerate(outline, 1)) or "Cover the topic fully."
+    return f"""{brief}
+
+Lesson outline (shared by all sections):
+{outline_text}
+
+Write ONLY the "{heading}" section of this lesson. {instruction}
+Format in Markdown. Do NOT add a top-level heading for the section or write any other section;
+the other sections are written separately."""
+
+
+def generate_sections(brief, outline, subject, on_section=None, deadline=None):
+    """
+    Generate all lesson sections concurrently.
+
+    Args:
+        brief: Lesson context and instructions shared by every section
+        outline: Key points from generate_outline()
+        subject: Course subject (enables LaTeX rules for STEM subjects)
+        on_section: Optional callback(key, markdown) called, in the calling
+            thread, as each section completes
+        deadline: time.monotonic() value after which unfinished sections are dropped
+
+    Returns:
+        Dict of section key to Markdown, containing only the sections that succeeded
+    """
+    deadline = deadline or time.monotonic() + LESSON_DEADLINE_SECONDS
+    sections = {}
+    pool = ThreadPoolExecutor(max_workers=len(LESSON_SECTIONS))
+    futures = {
+        pool.submit(
+            call_ai_with_fallback,
+            _section_prompt(brief, outline, heading, instruction),
+            max_tokens=max_tokens,
+            subject=subject,
+        ): key
+        for key, heading, instruction, max_tokens in LESSON_SECTIONS
+    }
+    try:
+        for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Lesson section '{key}' failed: {e}")
+                continue
+            if not result['success'] or not result['content'].strip():
+                logger.warning(f"Lesson section '{key}' unavailable. Tier: {result.get('tier')}")
+                continue
+            sections[key] = result['content'].strip()
+            if on_section:
+                on_section(key, sections[key])
+    except TimeoutError:
+        logger.warning(f"Lesson deadline reached with {len(sections)}/{len(LESSON_SECTIONS)} sections")
+    finally:
+        # Do not hold the request open for stragglers past the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+    return sections
+
+
+def assemble_lesson(sections):
+    """Join generated sections in display order under their headings"""
+    return "\n\n".join(
+        f"## {heading}\n\n{sections[key]}"
+        for key, heading, _, _ in LESSON_SECTIONS
+        if key in sections
+    )
+
+
+def generate_sectioned_lesson(brief, subject, on_section=None, on_outline=None):
+    """
+    Generate a lesson as an outline plus concurrently written sections.
+
+    Args:
+        brief: Lesson context and instructions
+        subject: Course subject
+        on_section: Optional callback(key, markdown) for progressive display
+        on_outline: Optional callback(key_points) once the outline is known
+
+    Returns:
+        Lesson Markdown, or None if no section could be generated
+    """
+    deadline = time.monotonic() + LESSON_DEADLINE_SECONDS
+    outline = generate_outline(brief, subject)
+    if on_outline:
+        on_outline(outline)
+    sections = generate_sections(brief, outline, subject, on_section=on_section, deadline=deadline)
+    if not sections:
+        return None
+    return assemble_lesson(sections)
@@ -1,7 +1,7 @@
 from django.db import transaction
-import json
 
 from core.utils.ai_fallback import call_ai_with_fallback
+from core.utils.structured_output import MODULE_SCHEMA, collect_items
 from core.services.curriculum import CurriculumService
 
 
@@ -62,10 +62,10 @@ Context:
 Generate a structured study plan consisting of modules for each week of the term.
 
 Return ONLY a valid JSON object with a single key "modules". 
-The "modules" key must contain an array of objects (one per week, up to {term.instructional_weeks} weeks). Each object must have:
+The "modules" key must contain an array of exactly {term.instructional_weeks} objects, one per instructional week. Each object must have:
 - "title": A concise module title (max 100 characters)
 - "topic": A specific curriculum topic covered (max 200 characters)
-- "week": The week number (1-{term.instructional_weeks})
+- "week": The week number (1-{term.instructional_weeks}), each week used once
 
 Do NOT include any text before or after the JSON object. Do NOT use markdown formatting.
 
@@ -78,6 +78,7 @@ Example format:
 }}"""
         max_tokens = 4000
         num_modules_expected = term.instructional_weeks
+        weeks = range(1, num_modules_expected + 1)
     else:
         prompt = f"""You are creating a study plan for Nigerian secondary school students.
 
@@ -102,56 +103,61 @@ Example format:
 }}"""
         max_tokens = 4000
         num_modules_expected = 12
-
-    result = call_ai_with_fallback(prompt, max_tokens=max_tokens, is_json=True, subject=course.subject)
-
-    if not result['success']:
-        print(f"AI Module Generation Failed for Course {course.id}. Tier: {result.get('tier')}")
-        return False
-
-    response_text = result['content']
-
-    try:
-        cleaned_text = response_text.strip()
-
-        if cleaned_text.startswith('```'):
-            cleaned_text = cleaned_text.split('\n', 1)[1] if '\n' in cleaned_text else cleaned_text[3:]
-            if cleaned_text.endswith('```'):
-                cleaned_text = cleaned_text.rsplit('```', 1)[0]
-            cleaned_text = cleaned_text.strip()
-
-        parsed_data = json.loads(cleaned_text)
-
-        if not isinstance(parsed_data, dict):
-            print(f"AI Module Generation Error for Course {course.id}: Response is not a dictionary.")
-            return False
-
-        if 'modules' not in parsed_data:
-            print(f"AI Module Generation Error for Course {course.id}: Response dictionary does not have a 'modules' key.")
-            return False
-
-        module_list = parsed_data['modules']
-
-        if not isinstance(module_list, list) or len(module_list) == 0:
-            print(f"AI Module Generation Error for Course {course.id}: Empty module list returned")
-            return False
-
-    except json.JSONDecodeError as e:
-        print(f"JSON Parsing Failed for Course {course.id}: {e}")
-        return False
-    except Exception as e:
-        print(f"Unexpected error parsing modules for Course {course.id}: {e}")
+        weeks = None
+
+    def request(missing, accepted):
+        request_prompt = prompt
+        if accepted:
+            covered = "\n".join(f"- {item['title']}" for item in accepted)
+            request_prompt += f"\n\nThe plan already contains these {len(accepted)} modules:\n{covered}\n"
+            if weeks:
+                taken = {item['week'] for item in accepted}
+                open_weeks = ", ".join(str(week) for week in weeks if week not in taken)
+                request_prompt += f"Return ONLY the modules for weeks {open_weeks}."
+            else:
+                request_prompt += f"Return ONLY the remaining {missing} modules, continuing from module {len(accepted) + 1}."
+        result = call_ai_with_fallback(request_prompt, max_tokens=max_tokens, is_json=True, subject=course.subject)
+        if not result['success']:
+            print(f"AI Module Generation Failed for Course {course.id}. Tier: {result.get('tier')}")
+            return None
+        return result['content']
+
+    module_list = collect_items(request, MODULE_SCHEMA, 'modules', num_modules_expected)
+    if weeks:
+        module_list = _order_by_week(module_list, weeks)
+
+    if not module_list:
+        print(f"AI Module Generation Error for Course {course.id}: No valid modules returned")
         return False
 
     with transaction.atomic():
         for index, item in enumerate(module_list):
             Module.objects.create(
                 course=course,
-                title=item.get('title', 'Untitled Module'),
+                title=item['title'],
                 order=index + 1,
-                syllabus_topic=item.get('topic', 'Unspecified Topic'),
+                syllabus_topic=item['topic'],
                 lesson_content=None,
                 topic=None
             )
 
     return True
+
+
+def _order_by_week(modules, weeks):
+    """
+    Order modules by their week number.
+    
+    Modules without a week, or whose week is out of range or already taken,
+    fill the earliest open weeks in the order they were generated.
+    """
+    by_week = {}
+    unplaced = []
+    for item in modules:
+        if item['week'] in weeks and item['week'] not in by_week:
+            by_week[item['week']] = item
+        else:
+            unplaced.append(item)
+    open_weeks = [week for week in weeks if week not in by_week]
+    by_week.update(zip(open_weeks, unplaced))
+    return [by_week[week] for week in sorted(by_week)]
@@ -0,0 +1,127 @@
+"""
+Markdown to sanitised HTML rendering pipeline.
+
+Each content type (lesson, tutor answer, assignment feedback) has a fixed
+Markdown extension set and bleach allow-list. Markdown converters and bleach
+Cleaners keep parser state and are not thread-safe, so each thread builds its
+own instances once and reuses them via reset(). Rendered HTML is memoised in
+a bounded LRU keyed by a hash of the content.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import bleach
+import markdown
+from bleach.sanitizer import Cleaner
+
+LESSON_TAGS = frozenset([
+    'p', 'br', 'strong', 'em', 'b', 'i', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'li', 'pre', 'code', 'blockquote', 'table', 'thead', 'tbody',
+    'tr', 'th', 'td', 'a', 'div', 'span', 'hr', 'sub', 'sup'
+])
+LESSON_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'code': ['class'],
+    'pre': ['class'],
+    'div': ['class'],
+    'span': ['class'],
+    'table': ['class'],
+    'th': ['colspan', 'rowspan'],
+    'td': ['colspan', 'rowspan'],
+}
+PROTOCOLS = frozenset(['http', 'https', 'mailto'])
+
+# content type -> (markdown extensions, allowed tags, allowed attributes)
+CONTENT_TYPES = {
+    'lesson': (
+        ('extra', 'codehilite', 'tables', 'fenced_code'),
+        LESSON_TAGS,
+        LESSON_ATTRIBUTES,
+    ),
+    'tutor': (
+        ('extra', 'tables', 'fenced_code', 'nl2br'),
+        LESSON_TAGS - {'h1', 'h2', 'div'},
+        {key: value for key, value in LESSON_ATTRIBUTES.items() if key != 'div'},
+    ),
+    'feedback': (
+        ('nl2br',),
+        frozenset(['p', 'br', 'strong', 'em', 'b', 'i', 'ul', 'ol', 'li', 'code', 'blockquote']),
+        {},
+    ),
+}
+
+RENDER_CACHE_SIZE = 256
+
+_local = threading.local()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _pipeline(content_type):
+    """This thread's (Markdown, Cleaner) pair for a content type"""
+    pipelines = getattr(_local, 'pipelines', None)
+    if pipelines is None:
+        pipelines = _local.pipelines = {}
+    pipeline = pipelines.get(content_type)
+    if pipeline is None:
+        extensions, tags, attributes = CONTENT_TYPES[content_type]
+        pipeline = pipelines[content_type] = (
+            markdown.Markdown(extensions=list(extensions)),
+            Cleaner(tags=tags, attributes=attributes, protocols=PROTOCOLS, strip=True),
+        )
+    return pipeline
+
+
+def _render(text, content_type):
+    converter, cleaner = _pipeline(content_type)
+    try:
+        raw_html = converter.convert(text)
+    finally:
+        converter.reset()
+    return cleaner.clean(raw_html)
+
+
+def render_markdown(text, content_type='lesson', use_cache=True):
+    """
+    Render Markdown to sanitised HTML for a content type.
+
+    Args:
+        text: Markdown source
+        content_type: 'lesson', 'tutor' or 'feedback'
+        use_cache: Look up and store the result in the in-process LRU
+
+    Returns:
+        Sanitised HTML string
+    """
+    if content_type not in CONTENT_TYPES:
+        raise ValueError(f"Unknown content type '{content_type}'")
+    text = text or ''
+    if not use_cache:
+        return _render(text, content_type)
+
+    key = (content_type, hashlib.sha256(text.encode('utf-8')).digest())
+    with _cache_lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            return html
+
+    html = _render(text, content_type)
+    with _cache_lock:
+        _cache[key] = html
+        if len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
+
+
+def clear_render_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def render_markdown_uncompiled(text, content_type='lesson'):
+    """Reference implementation that builds everything per call (benchmark baseline)"""
+    extensions, tags, attributes = CONTENT_TYPES[content_type]
+    raw_html = markdown.markdown(text, extensions=list(extensions))
+    return bleach.clean(raw_html, tags=list(tags), attributes=dict(attributes), protocols=list(PROTOCOLS), strip=True)
@@ -0,0 +1,338 @@
+"""
+Tolerant parsing of structured (JSON) AI output.
+
+Quiz, exam and module generation all ask the model for a JSON list of items.
+This module extracts the JSON payload from a response, repairs the defects
+models commonly produce (code fences, trailing commas, single-backslash
+LaTeX, letter answers) and validates every item against a schema, keeping
+the valid items instead of rejecting the whole response. collect_items()
+then asks only for the missing items.
+"""
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_HEX4_RE = re.compile(r'[0-9a-fA-F]{4}')
+# LaTeX commands whose backslash would otherwise read as a valid \n escape
+_LATEX_N_COMMANDS = ('neq', 'nabla', 'not', 'nu', 'ni', 'ne', 'newline')
+# LaTeX commands starting with b, f, n, r or t, whose backslash also forms a
+# valid JSON escape; short ones that read like ordinary words are left out
+_LATEX_COMMANDS = frozenset((
+    'bar', 'because', 'beta', 'bigcap', 'bigcup', 'binom', 'bmod', 'boxed',
+    'forall', 'frac',
+    'nabla', 'neq', 'newline', 'notin',
+    'rangle', 'rceil', 'rfloor', 'rho', 'right', 'rightarrow',
+    'text', 'textbf', 'therefore', 'theta', 'times', 'triangle',
+))
+_ESCAPE_LETTERS = {'\b': 'b', '\f': 'f', '\n': 'n', '\r': 'r', '\t': 't'}
+_DECODED_ESCAPE_RE = re.compile(r'([\b\f\n\r\t])([A-Za-z]+)')
+_LETTER_INDEX = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+
+
+class SchemaError(ValueError):
+    """Raised when an item does not match its schema"""
+
+
+def _repair_string(literal):
+    """Escape stray backslashes inside one JSON string literal (quotes included)"""
+    body = literal[1:-1]
+    out = []
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char != '\\' or i + 1 >= len(body):
+            out.append(char)
+            i += 1
+            continue
+        nxt = body[i + 1]
+        rest = body[i + 1:]
+        if nxt in '"\\/':
+            valid = True
+        elif nxt == 'u':
+            valid = bool(_HEX4_RE.match(body, i + 2))
+        elif nxt == 'n':
+            valid = not any(
+                rest.startswith(cmd) and not rest[len(cmd):len(cmd) + 1].isalpha()
+                for cmd in _LATEX_N_COMMANDS
+            )
+        elif nxt in 'bfrt':
+            # \frac, \beta, \right, \text: a letter run means a LaTeX command
+            valid = not body[i + 2:i + 3].isalpha()
+        else:
+            valid = False
+        out.append(body[i:i + 2] if valid else '\\\\' + nxt)
+        i += 2
+    return '"' + ''.join(out) + '"'
+
+
+def repair_json(text):
+    """
+    Fix common LLM JSON defects without touching valid content.
+
+    Trailing commas before a closing bracket are removed and backslashes
+    that do not form a JSON escape (typically LaTeX such as \\frac or
+    \\alpha) are doubled, inside string literals only.
+    """
+    parts = []
+    last = 0
+    for match in _STRING_RE.finditer(text):
+        parts.append(_TRAILING_COMMA_RE.sub(r'\1', text[last:match.start()]))
+        parts.append(_repair_string(match.group()))
+        last = match.end()
+    parts.append(_TRAILING_COMMA_RE.sub(r'\1', text[last:]))
+    return ''.join(parts)
+
+
+def _restore_command(match):
+    name = _ESCAPE_LETTERS[match.group(1)] + match.group(2)
+    return '\\' + name if name in _LATEX_COMMANDS else match.group()
+
+
+def restore_latex(data):
+    """
+    Undo single-backslash LaTeX that decoded as a JSON escape.
+
+    In valid JSON \\frac decodes to a form feed followed by "rac"; a control
+    character is turned back into a backslash only when it and the letters
+    after it spell a known command, so real tabs and newlines are kept.
+    """
+    if isinstance(data, str):
+        return _DECODED_ESCAPE_RE.sub(_restore_command, data)
+    if isinstance(data, list):
+        return [restore_latex(value) for value in data]
+    if isinstance(data, dict):
+        return {key: restore_latex(value) for key, value in data.items()}
+    return data
+
+
+def strip_code_fences(text):
+    """Remove a surrounding ``` or ```json fence"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else text[3:]
+        if text.rstrip().endswith('```'):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def extract_json(text):
+    """
+    Extract and decode the JSON payload from an AI response.
+
+    Returns:
+        Decoded object or list
+
+    Raises:
+        ValueError: If no JSON document can be recovered
+    """
+    text = strip_code_fences(text)
+    candidates = [text]
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if starts:
+        start = min(starts)
+        end = text.rfind('}' if text[start] == '{' else ']')
+        if end > start:
+            candidates.append(text[start:end + 1])
+
+    # Valid JSON is decoded as is (repairs could rewrite legitimate escapes);
+    # only known LaTeX commands read as escapes are restored afterwards
+    for candidate in candidates:
+        try:
+            return restore_latex(json.loads(candidate))
+        except json.JSONDecodeError:
+            continue
+    for candidate in candidates:
+        try:
+            return json.loads(repair_json(candidate), strict=False)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("No JSON document found in AI response")
+
+
+class Field:
+    """One schema field: accepted names, type, and an optional cleaner"""
+
+    def __init__(self, types=str, required=True, default=None, aliases=(), clean=None, max_length=None):
+        self.types = types
+        self.required = required
+        self.default = default
+        self.aliases = aliases
+        self.clean = clean
+        self.max_length = max_length
+
+
+class ItemSchema:
+    """
+    Validator for one kind of generated item.
+
+    Field lookups (name plus aliases) are resolved once when the schema is
+    built; clean() returns a normalised dict with canonical field names.
+    Cleaners run in declaration order and receive the item cleaned so far.
+    """
+
+    def __init__(self, **fields):
+        self.fields = [
+            (name, (name,) + tuple(field.aliases), field)
+            for name, field in fields.items()
+        ]
+
+    def clean(self, item):
+        if not isinstance(item, dict):
+            raise SchemaError("item is not an object")
+
+        cleaned = {}
+        for name, keys, field in self.fields:
+            value = next((item[key] for key in keys if item.get(key) not in (None, '')), None)
+            if value is None:
+                if field.required:
+                    raise SchemaError(f"missing '{name}'")
+                cleaned[name] = field.default
+                continue
+            if field.clean:
+                value = field.clean(value, cleaned)
+            elif field.types and not isinstance(value, field.types):
+                raise SchemaError(f"'{name}' has the wrong type")
+            if field.max_length and isinstance(value, str):
+                value = value[:field.max_length]
+            cleaned[name] = value
+        return cleaned
+
+
+def choices(count):
+    """Cleaner for a list of at least `count` non-empty options, truncated to `count`"""
+    def clean(value, item):
+        if not isinstance(value, list) or len(value) < count:
+            raise SchemaError(f"needs at least {count} options")
+        options = [str(option).strip() for option in value[:count]]
+        if not all(options):
+            raise SchemaError("empty option")
+        return options
+    return clean
+
+
+def correct_index(options_field, count=4):
+    """
+    Cleaner for an answer index given as an int, numeric string, letter
+    ("B", "b)", "Option C") or the text of the correct option.
+    """
+    def clean(value, item):
+        if isinstance(value, bool):
+            raise SchemaError("correct_index is a boolean")
+        if isinstance(value, (int, float)) and int(value) == value:
+            index = int(value)
+        else:
+            text = str(value).strip()
+            letter = re.fullmatch(r'(?:option\s*)?\(?([A-Da-d])[).:]?', text, re.IGNORECASE)
+            if text.lstrip('-').isdigit():
+                index = int(text)
+            elif letter:
+                index = _LETTER_INDEX[letter.group(1).upper()]
+            else:
+                options = [option.lower() for option in item.get(options_field) or []]
+                if text.lower() not in options:
+                    raise SchemaError(f"unrecognised correct_index {text!r}")
+                index = options.index(text.lower())
+        if not 0 <= index < count:
+            raise SchemaError(f"correct_index {index} out of range")
+        return index
+    return clean
+
+
+def positive_int(value, item):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise SchemaError(f"{value!r} is not an integer")
+    if number < 1:
+        raise SchemaError(f"{number} is not positive")
+    return number
+
+
+QUIZ_QUESTION_SCHEMA = ItemSchema(
+    question_text=Field(aliases=('question',)),
+    choices=Field(aliases=('options',), clean=choices(4)),
+    correct_index=Field(aliases=('answer_index', 'answer'), clean=correct_index('choices')),
+    explanation=Field(required=False, default=''),
+)
+
+EXAM_QUESTION_SCHEMA = ItemSchema(
+    question=Field(aliases=('question_text',)),
+    options=Field(aliases=('choices',), clean=choices(4)),
+    correct_index=Field(aliases=('answer_index', 'answer'), clean=correct_index('options')),
+    explanation=Field(required=False, default=''),
+    topic=Field(types=(str, int), required=False, default=''),
+)
+
+MODULE_SCHEMA = ItemSchema(
+    title=Field(max_length=100),
+    topic=Field(aliases=('syllabus_topic',), required=False, default='Unspecified Topic', max_length=200),
+    week=Field(required=False, clean=positive_int),
+)
+
+
+def parse_items(text, schema, key):
+    """
+    Parse an AI response into valid items, dropping invalid ones.
+
+    Args:
+        text: Raw AI response
+        schema: ItemSchema each item must satisfy
+        key: Name of the list inside a JSON object (a bare list is also accepted)
+
+    Returns:
+        Tuple of (valid_items, rejected_count)
+
+    Raises:
+        ValueError: If the response holds no usable JSON list
+    """
+    data = extract_json(text)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f"AI response has no '{key}' list")
+
+    valid = []
+    rejected = 0
+    for position, item in enumerate(data):
+        try:
+            valid.append(schema.clean(item))
+        except SchemaError as e:
+            rejected += 1
+            logger.info(f"Dropped generated {key} item {position}: {e}")
+    return valid, rejected
+
+
+def collect_items(request, schema, key, count, top_ups=1):
+    """
+    Gather `count` valid items, asking only for the shortfall on follow-ups.
+
+    Args:
+        request: Callable(missing_count, accepted_items) returning the raw
+            response text, or None if the AI call failed (which stops collection)
+        schema: ItemSchema for each item
+        key: List key in the JSON response
+        count: Number of items wanted
+        top_ups: Follow-up requests allowed after the first
+
+    Returns:
+        List of up to `count` valid items (possibly fewer, possibly empty)
+    """
+    items = []
+    for attempt in range(top_ups + 1):
+        missing = count - len(items)
+        if missing <= 0:
+            break
+        text = request(missing, items)
+        if text is None:
+            break
+        try:
+            valid, rejected = parse_items(text, schema, key)
+        except ValueError as e:
+            logger.warning(f"Unparseable {key} response (attempt {attempt + 1}): {e}")
+            continue
+        items.extend(valid[:missing])
+    return items[:count]
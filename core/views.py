@@ -1,5 +1,7 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.staticfiles import finders
+from django.http import Http404, HttpResponse
 
 
 def home_view(request):
@@ -12,9 +14,10 @@ def home_view(request):
 @login_required
 def dashboard_view(request):
     """Main dashboard view with comprehensive statistics and quick actions"""
-    from courses.models import Course, Module
+    from courses.models import Course
     from quizzes.models import QuizAttempt
-    from assessments.models import Grade, Notification, CourseExam, StudyPlan
+    from assessments.models import Grade, CourseExam, StudyPlan, CourseProgress
+    from users.stats import get_user_stats
     from django.db.models import Avg, Count, Max
     from datetime import datetime
     
@@ -23,8 +26,9 @@ def dashboard_view(request):
     today_weekday = datetime.now().weekday()
     today_schedule = StudyPlan.objects.filter(user=request.user, day_of_week=today_weekday).select_related('course').order_by('start_time')
     
+    stats = get_user_stats(request.user)
     courses_count = user_courses.count()
-    quizzes_count = QuizAttempt.objects.filter(user=request.user, completed_at__isnull=False).count()
+    quizzes_count = stats.completed_quizzes
     
     grades = Grade.objects.filter(student=request.user)
     grade_stats = grades.aggregate(
@@ -46,38 +50,31 @@ def dashboard_view(request):
         completed_at__isnull=False
     ).select_related('course').order_by('-completed_at')[:3]
     
-    unread_notifications = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    ).count()
+    recent_courses = list(user_courses[:3])
+    course_progress = {
+        progress.course_id: progress
+        for progress in CourseProgress.objects.filter(
+            user=request.user,
+            course__in=recent_courses
+        ).select_related('next_module')
+    }
     
     continue_learning = []
-    for course in user_courses[:3]:
-        last_attempt = QuizAttempt.objects.filter(
-            user=request.user,
-            module__course=course,
-            completed_at__isnull=False
-        ).order_by('-completed_at').first()
-        
-        if last_attempt:
-            next_module = Module.objects.filter(
-                course=course,
-                order__gt=last_attempt.module.order
-            ).order_by('order').first()
-            if next_module:
-                continue_learning.append({
-                    'course': course,
-                    'module': next_module,
-                    'action': 'Continue'
-                })
+    for course in recent_courses:
+        progress = course_progress.get(course.id)
+        if progress is None:
+            # No progress row yet (e.g. before a rebuild): start at the beginning
+            module = course.modules.order_by('order').first()
+            action = 'Start'
         else:
-            first_module = course.modules.order_by('order').first()
-            if first_module:
-                continue_learning.append({
-                    'course': course,
-                    'module': first_module,
-                    'action': 'Start'
-                })
+            module = progress.next_module
+            action = 'Continue' if progress.completed_modules else 'Start'
+        if module:
+            continue_learning.append({
+                'course': course,
+                'module': module,
+                'action': action
+            })
     
     has_parent_profile = hasattr(request.user, 'parent_profile')
     
@@ -92,7 +89,7 @@ def dashboard_view(request):
         'grade_stats': grade_stats,
         'recent_quizzes': recent_quizzes,
         'recent_exams': recent_exams,
-        'unread_notifications': unread_notifications,
+        'unread_notifications': stats.unread_notifications,
         'continue_learning': continue_learning[:3],
         'has_parent_profile': has_parent_profile,
         'today_schedule': today_schedule[:4],
@@ -114,6 +111,22 @@ def about_view(request):
     return render(request, 'legal/about.html')
 
 
+def service_worker_view(request):
+    """
+    Serve the PWA service worker from the site root.
+
+    A worker only controls pages under the path it is served from, so it
+    cannot be loaded from /static/ if it is to cache lessons and quizzes.
+    """
+    path = finders.find('pwa/serviceworker.js')
+    if not path:
+        raise Http404
+    with open(path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type='application/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 def error_404_view(request, exception):
     """Custom 404 error page"""
     return render(request, 'errors/404.html', status=404)
@@ -20,5 +20,5 @@ class ModuleAdmin(admin.ModelAdmin):
 class CachedLessonAdmin(admin.ModelAdmin):
     list_display = ['topic', 'syllabus_version', 'is_validated', 'report_count', 'created_at']
     list_filter = ['is_validated', 'syllabus_version']
-    search_fields = ['topic', 'content']
+    search_fields = ['topic']
     readonly_fields = ['created_at']
\ No newline at end of file
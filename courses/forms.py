@@ -42,7 +42,10 @@ class CourseCreationForm(forms.Form):
         if 'school_level' in self.data:
             try:
                 level_id = int(self.data.get('school_level'))
-                subjects = CurriculumService.get_subjects_for_level_by_id(level_id)
+                if self.data.get('term'):
+                    subjects = CurriculumService.get_available_subjects(level_id, int(self.data.get('term')))
+                else:
+                    subjects = CurriculumService.get_subjects_for_level_by_id(level_id)
                 self.fields['subject'].choices = [('', 'Select a subject')] + [
                     (str(s.id), s.name) for s in subjects
                 ]
@@ -68,12 +71,12 @@ class CourseCreationForm(forms.Form):
                 if not subject:
                     raise forms.ValidationError("Invalid subject selected.")
                 
-                if not subject.school_levels.filter(id=school_level.id).exists():
+                if not CurriculumService.is_subject_offered(school_level.id, subject.id):
                     raise forms.ValidationError(
                         f"{subject.name} is not available for {school_level.name}."
                     )
                 
-                curriculum = CurriculumService.get_curriculum(school_level, subject, term)
+                curriculum = CurriculumService.get_available_curriculum(school_level.id, term.id, subject.id)
                 if not curriculum:
                     raise forms.ValidationError(
                         f"No curriculum available for {subject.name} in {school_level.name} {term.name}. "
@@ -0,0 +1,70 @@
+"""
+Rebuild the full-text search documents, and optionally time searches
+against them.
+
+Search documents are kept up to date by signals; a rebuild is only needed
+after bulk loads (which send no signals) or to repair drift.
+"""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.search import DOCUMENT_BUILDERS, rebuild_index, search
+
+BENCHMARK_QUERIES = ['mathematics', 'chemistry ss2', 'first term revision', 'week 7', 'exam', 'phys']
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index over topics, modules and lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=sorted(DOCUMENT_BUILDERS),
+            help='Only rebuild this kind of document (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Time a set of sample searches after rebuilding',
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            help='Query to time when benchmarking (repeatable; default: a built-in sample)',
+        )
+        parser.add_argument('--email', help='Search as this user when benchmarking (default: the first user)')
+        parser.add_argument('--no-rebuild', action='store_true', help='Skip the rebuild (use with --benchmark)')
+
+    def handle(self, *args, **options):
+        if not options['no_rebuild']:
+            started = time.perf_counter()
+            counts = rebuild_index(options['kind'])
+            for kind, count in counts.items():
+                self.stdout.write(f'  - {kind}: {count} documents')
+            self.stdout.write(self.style.SUCCESS(
+                f'Indexed {sum(counts.values())} documents in {time.perf_counter() - started:.1f}s'
+            ))
+
+        if options['benchmark']:
+            self._benchmark(options['query'] or BENCHMARK_QUERIES, options['email'])
+
+    def _benchmark(self, queries, email):
+        User = get_user_model()
+        user = User.objects.filter(email=email).first() if email else User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to search as; pass --email')
+
+        for query in queries:
+            timings = []
+            for _ in range(20):
+                started = time.perf_counter()
+                results = search(query, user)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'  {query!r:<24} {len(results):>2} results  '
+                f'median {statistics.median(timings):6.2f} ms  max {max(timings):6.2f} ms'
+            )
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:00
+
+import core.fields
+from django.db import migrations, models
+
+from core.fields import compress_existing_rows, set_external_storage
+
+
+def compress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'courses', 'CachedLesson', 'content', 'content_compressed')
+
+
+def decompress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'courses', 'CachedLesson', 'content_compressed', 'content')
+
+
+def use_external_storage(apps, schema_editor):
+    set_external_storage(schema_editor, 'cached_lessons', 'content')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_alter_course_unique_together_course_curriculum_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachedlesson',
+            name='content_compressed',
+            field=core.fields.CompressedTextField(dictionary='lesson', null=True),
+        ),
+        # Nullable so the column can be re-added empty when reversing
+        migrations.AlterField(
+            model_name='cachedlesson',
+            name='content',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(compress_rows, decompress_rows),
+        migrations.RemoveField(
+            model_name='cachedlesson',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='cachedlesson',
+            old_name='content_compressed',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='cachedlesson',
+            name='content',
+            field=core.fields.CompressedTextField(dictionary='lesson'),
+        ),
+        migrations.RunPython(use_external_storage, migrations.RunPython.noop),
+    ]
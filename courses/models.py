@@ -3,6 +3,7 @@
 from django.db import models
 from django.conf import settings
 import uuid
+from core.fields import CompressedTextField
 from users.models import CustomUser 
 
 
@@ -98,7 +99,7 @@ class Module(models.Model):
 
 class CachedLesson(models.Model):
     topic = models.CharField(max_length=500)
-    content = models.TextField()
+    content = CompressedTextField(dictionary='lesson')
     syllabus_version = models.CharField(max_length=50)
     report_count = models.IntegerField(default=0)
     is_validated = models.BooleanField(default=False)
@@ -116,3 +117,37 @@ class CachedLesson(models.Model):
     
     def __str__(self):
         return f"{self.topic} (Validated: {self.is_validated})"
+
+
+class SearchDocument(models.Model):
+    """
+    Plain-text copy of a searchable object; see courses.search for the
+    full-text index built over this table.
+    """
+    KIND_CHOICES = [
+        ('topic', 'Curriculum topic'),
+        ('module', 'Course module'),
+        ('lesson', 'Lesson'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Owner, for documents only their owner may find"
+    )
+    title = models.CharField(max_length=500)
+    subtitle = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ['kind', 'object_id']
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
@@ -0,0 +1,97 @@
+"""
+Offline course bundles for the PWA service worker.
+
+A bundle manifest lists every page and asset a downloaded course needs
+offline (module list, generated lessons, unfinished quizzes, styles and
+KaTeX) with a content hash per resource. The service worker stores the
+manifest alongside the cached pages and, when the manifest version
+changes, re-downloads only the resources whose hash changed and drops the
+ones that disappeared.
+"""
+import hashlib
+import json
+
+from django.templatetags.static import static
+from django.urls import reverse
+
+from .models import CachedLesson
+
+OFFLINE_BUNDLE_FORMAT = 1
+
+KATEX_CDN = 'https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/'
+KATEX_ASSETS = [
+    KATEX_CDN + path for path in (
+        'katex.min.css',
+        'katex.min.js',
+        'contrib/auto-render.min.js',
+        'fonts/KaTeX_Main-Regular.woff2',
+        'fonts/KaTeX_Main-Bold.woff2',
+        'fonts/KaTeX_Main-Italic.woff2',
+        'fonts/KaTeX_Math-Italic.woff2',
+        'fonts/KaTeX_AMS-Regular.woff2',
+        'fonts/KaTeX_Size1-Regular.woff2',
+        'fonts/KaTeX_Size2-Regular.woff2',
+    )
+]
+STATIC_ASSETS = ['css/styles.css', 'js/main.js', 'js/dark-mode.js', 'js/offline.js', 'js/notifications.js', 'images/logo.png']
+
+
+def _digest(*parts):
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def course_bundle_manifest(course, user):
+    """
+    Build the offline manifest for one of a user's courses.
+
+    Args:
+        course: Course owned by `user`
+        user: The student downloading the course
+
+    Returns:
+        Dict with the bundle 'version', its 'resources' (url and hash of
+        each page) and static 'assets' (immutable, cached once)
+    """
+    from courses.views import LESSON_PAGE_VERSION
+    from quizzes.models import QuizAttempt
+
+    modules = list(course.modules.order_by('order').values_list('id', 'lesson_content_id'))
+    lesson_ids = [lesson_id for _, lesson_id in modules if lesson_id]
+    lesson_state = dict(CachedLesson.objects.filter(id__in=lesson_ids).values_list('id', 'is_validated'))
+
+    attempts = {}
+    for attempt_id, module_id, completed_at, score, passed in (
+        QuizAttempt.objects.filter(user=user, module__course=course)
+        .order_by('id')
+        .values_list('id', 'module_id', 'completed_at', 'score', 'passed')
+    ):
+        attempts.setdefault(module_id, []).append((attempt_id, completed_at is None, score, passed))
+
+    resources = [{
+        'url': reverse('courses:module_listing', args=[course.id]),
+        'hash': _digest('modules', modules, sorted(attempts.items())),
+    }]
+    for module_id, lesson_id in modules:
+        quiz_state = attempts.get(module_id, [])
+        if lesson_id in lesson_state:
+            resources.append({
+                'url': reverse('courses:lesson_detail', args=[module_id]),
+                'hash': _digest('lesson', LESSON_PAGE_VERSION, lesson_id, lesson_state[lesson_id], quiz_state),
+            })
+        # Unfinished quizzes can be answered offline; answers are queued
+        for attempt_id, incomplete, _, _ in quiz_state:
+            if incomplete:
+                resources.append({
+                    'url': reverse('quizzes:quiz_detail', args=[attempt_id]),
+                    'hash': _digest('quiz', attempt_id),
+                })
+
+    assets = [static(path) for path in STATIC_ASSETS] + KATEX_ASSETS
+    version = _digest(OFFLINE_BUNDLE_FORMAT, json.dumps(resources, sort_keys=True), assets)
+    return {
+        'format': OFFLINE_BUNDLE_FORMAT,
+        'course': course.id,
+        'version': version,
+        'resources': resources,
+        'assets': assets,
+    }
@@ -0,0 +1,296 @@
+"""
+Full-text search over curriculum topics, course modules and lessons.
+
+Every searchable object has a plain-text row in search_documents, kept up to
+date by signal handlers. The text index on top of it depends on the database:
+
+- PostgreSQL: a generated, weighted tsvector column with a GIN index,
+  queried with to_tsquery and ranked with ts_rank_cd.
+- SQLite (development): an FTS5 external-content table kept in sync by
+  triggers, queried with MATCH and ranked with bm25.
+
+Other backends fall back to unranked substring matching. Lesson HTML is
+stored compressed, so its text is extracted into the search document.
+"""
+import html
+import re
+
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+MAX_LESSON_CHARS = 20000
+MAX_QUERY_TERMS = 8
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# Weights for (title, subtitle, body)
+SQLITE_WEIGHTS = (10.0, 2.0, 1.0)
+
+POSTGRES_CREATE = [
+    """
+    ALTER TABLE search_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(subtitle, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX search_documents_vector_idx ON search_documents USING GIN (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS search_documents_vector_idx',
+    'ALTER TABLE search_documents DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE search_documents_fts USING fts5(
+        title, subtitle, body,
+        content='search_documents', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, subtitle, body)
+        VALUES (new.id, new.title, new.subtitle, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, subtitle, body)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, subtitle, body)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.body);
+        INSERT INTO search_documents_fts(rowid, title, subtitle, body)
+        VALUES (new.id, new.title, new.subtitle, new.body);
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS search_documents_au',
+    'DROP TRIGGER IF EXISTS search_documents_ad',
+    'DROP TRIGGER IF EXISTS search_documents_ai',
+    'DROP TABLE IF EXISTS search_documents_fts',
+]
+
+# Only lessons the user reaches through one of their own modules are searchable
+SCOPE_SQL = """
+    (d.user_id IS NULL OR d.user_id = %s)
+    AND (d.kind <> 'lesson' OR EXISTS (
+        SELECT 1 FROM modules m INNER JOIN courses c ON c.id = m.course_id
+        WHERE m.lesson_content_id = d.object_id AND c.user_id = %s
+    ))
+"""
+
+
+def create_search_index(schema_editor):
+    """Create the database-specific text index over search_documents"""
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_CREATE, 'sqlite': SQLITE_CREATE}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def lesson_text(content):
+    """Plain text of a lesson's HTML, capped for indexing"""
+    # Space out tags first so text from adjacent blocks does not run together
+    text = html.unescape(strip_tags((content or '').replace('<', ' <')))
+    return ' '.join(text.split())[:MAX_LESSON_CHARS]
+
+
+def topic_document(topic):
+    curriculum = topic.curriculum
+    concepts = ' '.join(str(concept) for concept in topic.key_concepts or [])
+    return {
+        'title': topic.title,
+        'subtitle': f'{curriculum.school_level.name} {curriculum.subject.name} - {curriculum.term.name}, week {topic.week.week_number}',
+        'body': f'{topic.description} {concepts}'.strip(),
+        'user_id': None,
+    }
+
+
+def module_document(module):
+    course = module.course
+    level = f'{course.school_level.name} ' if course.school_level_id else ''
+    return {
+        'title': module.syllabus_topic,
+        'subtitle': f'{level}{course.subject} - module {module.order}',
+        'body': module.title,
+        'user_id': course.user_id,
+    }
+
+
+def lesson_document(lesson):
+    return {
+        'title': lesson.topic,
+        'subtitle': 'Lesson',
+        'body': lesson_text(lesson.content),
+        'user_id': None,
+    }
+
+
+DOCUMENT_BUILDERS = {
+    'topic': ('curriculum', 'Topic', ('curriculum__school_level', 'curriculum__subject', 'curriculum__term', 'week'), topic_document),
+    'module': ('courses', 'Module', ('course__school_level',), module_document),
+    'lesson': ('courses', 'CachedLesson', (), lesson_document),
+}
+
+
+def index_object(kind, obj):
+    """Add or refresh the search document for one object"""
+    from .models import SearchDocument
+
+    document = DOCUMENT_BUILDERS[kind][3](obj)
+    SearchDocument.objects.update_or_create(kind=kind, object_id=obj.pk, defaults=document)
+
+
+def remove_object(kind, object_id):
+    from .models import SearchDocument
+
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index(kinds=None, apps=None, batch_size=500):
+    """
+    Rebuild search documents from scratch.
+
+    Args:
+        kinds: Document kinds to rebuild (default: all)
+        apps: App registry to take models from (migrations pass theirs)
+        batch_size: Rows read and written per batch
+
+    Returns:
+        Dict of kind to number of documents written
+    """
+    if apps is None:
+        from django.apps import apps
+    SearchDocument = apps.get_model('courses', 'SearchDocument')
+
+    counts = {}
+    for kind in kinds or DOCUMENT_BUILDERS:
+        app_label, model_name, related, build = DOCUMENT_BUILDERS[kind]
+        model = apps.get_model(app_label, model_name)
+        SearchDocument.objects.filter(kind=kind).delete()
+
+        counts[kind] = 0
+        batch = []
+        for obj in model.objects.select_related(*related).order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(SearchDocument(kind=kind, object_id=obj.pk, **build(obj)))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                counts[kind] += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        counts[kind] += len(batch)
+    return counts
+
+
+def query_terms(query):
+    return [term.lower() for term in TERM_RE.findall(query or '')][:MAX_QUERY_TERMS]
+
+
+def _postgres_ids(terms, user_id, limit):
+    # The last term is matched as a prefix so results appear while typing
+    tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    sql = f"""
+        SELECT d.id, ts_rank_cd(d.search_vector, q) AS rank
+        FROM search_documents d, to_tsquery('english', %s) q
+        WHERE d.search_vector @@ q AND {SCOPE_SQL}
+        ORDER BY rank DESC, d.id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, user_id, user_id, limit])
+        return cursor.fetchall()
+
+
+def _sqlite_ids(terms, user_id, limit):
+    match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    sql = f"""
+        SELECT d.id, -bm25(search_documents_fts, %s, %s, %s) AS rank
+        FROM search_documents_fts
+        INNER JOIN search_documents d ON d.id = search_documents_fts.rowid
+        WHERE search_documents_fts MATCH %s AND {SCOPE_SQL}
+        ORDER BY rank DESC, d.id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*SQLITE_WEIGHTS, match.strip(), user_id, user_id, limit])
+        return cursor.fetchall()
+
+
+def _fallback_ids(terms, user_id, limit):
+    from django.db.models import Exists, OuterRef, Q
+
+    from .models import Module, SearchDocument
+
+    own_lesson = Module.objects.filter(lesson_content_id=OuterRef('object_id'), course__user_id=user_id)
+    documents = SearchDocument.objects.filter(
+        Q(user_id__isnull=True) | Q(user_id=user_id)
+    ).filter(~Q(kind='lesson') | Q(Exists(own_lesson)))
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return [(pk, 0.0) for pk in documents.order_by('id').values_list('id', flat=True)[:limit]]
+
+
+def search(query, user, limit=10):
+    """
+    Ranked search results for a user.
+
+    Topics, the user's own modules and the lessons behind them are searched;
+    a result that leads to a module the user already has (through the topic
+    or lesson) links to that module's lesson page, and duplicates pointing
+    at the same module are dropped.
+
+    Returns:
+        List of dicts with kind, title, subtitle, module_id, url and rank
+    """
+    from .models import Module, SearchDocument
+
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    backend = {'postgresql': _postgres_ids, 'sqlite': _sqlite_ids}.get(connection.vendor, _fallback_ids)
+    ranked = backend(terms, user.pk, limit * 3)
+    documents = SearchDocument.objects.in_bulk([pk for pk, _ in ranked])
+
+    topic_ids = [doc.object_id for doc in documents.values() if doc.kind == 'topic']
+    lesson_ids = [doc.object_id for doc in documents.values() if doc.kind == 'lesson']
+    own_modules = Module.objects.filter(course__user=user)
+    module_for = {
+        'module': {},
+        'topic': dict(own_modules.filter(topic_id__in=topic_ids).values_list('topic_id', 'id')),
+        'lesson': dict(own_modules.filter(lesson_content_id__in=lesson_ids).values_list('lesson_content_id', 'id')),
+    }
+
+    results = []
+    seen_modules = set()
+    for pk, rank in ranked:
+        doc = documents[pk]
+        module_id = doc.object_id if doc.kind == 'module' else module_for[doc.kind].get(doc.object_id)
+        if module_id is not None:
+            if module_id in seen_modules:
+                continue
+            seen_modules.add(module_id)
+        results.append({
+            'kind': doc.kind,
+            'title': doc.title,
+            'subtitle': doc.subtitle,
+            'module_id': module_id,
+            'url': reverse('courses:lesson_detail', args=[module_id]) if module_id else None,
+            'rank': float(rank),
+        })
+        if len(results) >= limit:
+            break
+    return results
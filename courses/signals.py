@@ -0,0 +1,45 @@
+"""
+Signal handlers that keep search documents in step with the objects they
+describe.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from curriculum.models import Topic
+
+from .models import CachedLesson, Module
+from .search import index_object, remove_object
+
+
+@receiver(post_save, sender=Topic)
+def topic_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object('topic', instance)
+
+
+@receiver(post_delete, sender=Topic)
+def topic_deleted(sender, instance, **kwargs):
+    remove_object('topic', instance.pk)
+
+
+@receiver(post_save, sender=Module)
+def module_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object('module', instance)
+
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, **kwargs):
+    remove_object('module', instance.pk)
+
+
+@receiver(post_save, sender=CachedLesson)
+def lesson_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'topic', 'content'} & set(update_fields)):
+        return
+    index_object('lesson', instance)
+
+
+@receiver(post_delete, sender=CachedLesson)
+def lesson_deleted(sender, instance, **kwargs):
+    remove_object('lesson', instance.pk)
@@ -3,9 +3,11 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
 from curriculum.models import (
-    AcademicSession, SchoolLevel, Subject, Term, Week, SubjectCurriculum
+    AcademicSession, SchoolLevel, Subject, Term, Topic, Week, SubjectCurriculum
 )
-from courses.models import Course
+from courses.models import CachedLesson, Course, Module, SearchDocument
+from courses.search import rebuild_index, search
+from quizzes.models import QuizAttempt
 from datetime import date
 
 
@@ -85,6 +87,59 @@ class CourseCreationIntegrationTestCase(TestCase):
         self.assertEqual(len(data['subjects']), 1)
         self.assertEqual(data['subjects'][0]['name'], 'Mathematics')
     
+    def test_availability_matrix_is_versioned_and_long_cached(self):
+        page = self.client.get(reverse('courses:create_course'))
+        url = reverse('courses:availability', args=[page.context['availability_version']])
+        self.assertContains(page, f'data-availability-url="{url}"')
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        data = response.json()
+        self.assertEqual(data['subjects'], {str(self.math.id): 'Mathematics'})
+        self.assertEqual(
+            data['availability'][str(self.js1.id)][str(self.first_term.id)],
+            [[self.math.id, self.curriculum.id]]
+        )
+    
+    def test_availability_matrix_moves_to_new_version_on_change(self):
+        page = self.client.get(reverse('courses:create_course'))
+        old_version = page.context['availability_version']
+        
+        english = Subject.objects.create(name='English Language', code='ENG')
+        english.school_levels.add(self.js1)
+        SubjectCurriculum.objects.create(school_level=self.js1, subject=english, term=self.first_term)
+        
+        response = self.client.get(reverse('courses:availability', args=[old_version]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('no-store', response['Cache-Control'])
+        data = self.client.get(response.url).json()
+        self.assertNotEqual(data['version'], old_version)
+        self.assertEqual(len(data['availability'][str(self.js1.id)][str(self.first_term.id)]), 2)
+    
+    def test_form_validates_against_availability_matrix(self):
+        from courses.forms import CourseCreationForm
+        
+        chemistry = Subject.objects.create(name='Chemistry', code='CHM')
+        chemistry.school_levels.add(self.js1)
+        CourseCreationForm({'school_level': self.js1.id, 'term': self.first_term.id, 'subject': self.math.id}).is_valid()
+        
+        with self.assertNumQueries(0):
+            form = CourseCreationForm({
+                'school_level': str(self.js1.id),
+                'term': str(self.first_term.id),
+                'subject': str(self.math.id),
+            })
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.cleaned_data['curriculum_obj'], self.curriculum)
+            # Offered at the level but without a curriculum this term, so not a choice
+            form = CourseCreationForm({
+                'school_level': str(self.js1.id),
+                'term': str(self.first_term.id),
+                'subject': str(chemistry.id),
+            })
+            self.assertFalse(form.is_valid())
+    
     def test_course_dashboard_empty(self):
         response = self.client.get(reverse('courses:course_list'))
         self.assertEqual(response.status_code, 200)
@@ -347,3 +402,289 @@ class CourseCreationPOSTTestCase(TestCase):
         self.assertEqual(course.curriculum, self.math_curriculum)
         self.assertEqual(course.school_level, self.js1)
         self.assertEqual(course.term, self.first_term)
+
+
+class SectionedLessonTestCase(TestCase):
+    """Tests for sectioned lesson generation and progressive display"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='lesson@example.com', password='testpass123')
+        cls.course = Course.objects.create(user=cls.user, subject='Biology', exam_type='WAEC')
+        cls.module = Module.objects.create(course=cls.course, title='Cells', order=1, syllabus_topic='Cell structure')
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.login(email='lesson@example.com', password='testpass123')
+    
+    @staticmethod
+    def fake_ai(failing=()):
+        def call(prompt, **kwargs):
+            if kwargs.get('is_json'):
+                return {'success': True, 'tier': 'Groq', 'content': '{"key_points": ["Nucleus", "Membrane"]}'}
+            for heading in ('Explanation', 'Worked Examples', 'Practice Questions'):
+                if f'Write ONLY the "{heading}" section' in prompt:
+                    if heading in failing:
+                        return {'success': False, 'tier': 'Circuit Breaker', 'content': 'busy'}
+                    assert '1. Nucleus' in prompt
+                    return {'success': True, 'tier': 'Groq', 'content': f'{heading} body'}
+            raise AssertionError('unexpected prompt')
+        return call
+    
+    def test_lesson_page_renders_shell_without_calling_ai(self):
+        with patch('core.utils.ai_lesson_generator.call_ai_with_fallback') as mock_ai:
+            response = self.client.get(reverse('courses:lesson_detail', args=[self.module.id]))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-section="examples"')
+        self.assertContains(response, reverse('courses:lesson_generate', args=[self.module.id]))
+        mock_ai.assert_not_called()
+    
+    @patch('core.utils.ai_fallback.call_ai_with_fallback', return_value={'success': True, 'content': 'OK', 'tier': 'Groq'})
+    def test_generate_assembles_sections_in_order(self, mock_validate):
+        with patch('core.utils.ai_lesson_generator.call_ai_with_fallback', side_effect=self.fake_ai()) as mock_ai:
+            response = self.client.post(reverse('courses:lesson_generate', args=[self.module.id]))
+        
+        data = response.json()
+        self.assertTrue(data['complete'])
+        self.assertTrue(data['is_validated'])
+        self.assertEqual(mock_ai.call_count, 4)
+        html = data['html']
+        self.assertLess(html.index('Explanation body'), html.index('Worked Examples body'))
+        self.assertLess(html.index('Worked Examples body'), html.index('Practice Questions body'))
+        
+        self.module.refresh_from_db()
+        self.assertIsNotNone(self.module.lesson_content)
+        sections = self.client.get(reverse('courses:lesson_sections', args=[self.module.id])).json()
+        self.assertTrue(sections['complete'])
+    
+    @patch('core.utils.ai_fallback.call_ai_with_fallback', return_value={'success': True, 'content': 'OK', 'tier': 'Groq'})
+    def test_failed_section_is_skipped_and_total_failure_not_cached(self, mock_validate):
+        with patch('core.utils.ai_lesson_generator.call_ai_with_fallback', side_effect=self.fake_ai(failing=('Worked Examples',))):
+            data = self.client.post(reverse('courses:lesson_generate', args=[self.module.id])).json()
+        self.assertNotIn('Worked Examples', data['html'])
+        self.assertIn('Practice Questions body', data['html'])
+        
+        other = Module.objects.create(course=self.course, title='Tissues', order=2, syllabus_topic='Tissues')
+        everything = ('Explanation', 'Worked Examples', 'Practice Questions')
+        with patch('core.utils.ai_lesson_generator.call_ai_with_fallback', side_effect=self.fake_ai(failing=everything)):
+            response = self.client.post(reverse('courses:lesson_generate', args=[other.id]))
+        self.assertEqual(response.status_code, 503)
+        other.refresh_from_db()
+        self.assertIsNone(other.lesson_content)
+    
+    def test_sections_endpoint_reports_partial_progress(self):
+        from django.core.cache import cache
+        
+        cache.set(f'lesson_progress:{self.module.id}', {'outline': ['Nucleus'], 'sections': {'practice': '<p>Q1</p>'}})
+        data = self.client.get(reverse('courses:lesson_sections', args=[self.module.id])).json()
+        
+        self.assertFalse(data['complete'])
+        self.assertEqual(data['sections'], {'practice': '<p>Q1</p>'})
+        cache.delete(f'lesson_progress:{self.module.id}')
+
+    @patch('core.utils.ai_fallback.call_ai_with_fallback')
+    def test_tutor_hub_answer_is_rendered_markdown(self, mock_ai):
+        mock_ai.return_value = {'success': True, 'tier': 'Groq', 'content': '**Mitochondria** power the cell.<script>x</script>'}
+        
+        response = self.client.post(reverse('courses:tutor_hub'), {'module_id': self.module.id, 'question': 'What powers cells?'})
+        
+        self.assertContains(response, '<strong>Mitochondria</strong>')
+        self.assertNotContains(response, '<script>x</script>')
+
+
+class LessonConditionalGetTestCase(TestCase):
+    """Tests for ETag/Last-Modified revalidation of lesson pages"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='etag@example.com', password='testpass123')
+        course = Course.objects.create(user=cls.user, subject='Biology', exam_type='WAEC')
+        lesson = CachedLesson.objects.create(topic='Cells', content='<p>Cells body</p>', syllabus_version='2025')
+        cls.module = Module.objects.create(
+            course=course, title='Cells', order=1, syllabus_topic='Cells', lesson_content=lesson
+        )
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.login(email='etag@example.com', password='testpass123')
+        self.url = reverse('courses:lesson_detail', args=[self.module.id])
+        # The first render issues the CSRF cookie, which is part of the ETag
+        self.client.get(self.url)
+    
+    def test_repeat_view_returns_304_without_rendering(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, 'Cells body')
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertIn('private', first['Cache-Control'])
+        self.assertIn('Last-Modified', first)
+        
+        with patch('courses.views.render') as mock_render:
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(second['ETag'], first['ETag'])
+        mock_render.assert_not_called()
+    
+    def test_per_user_state_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        QuizAttempt.objects.create(user=self.user, module=self.module)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        
+        etag = response['ETag']
+        self.user.tutor_credits -= 1
+        self.user.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_pending_message_forces_render(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('courses:report_error', args=[self.module.id]))
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class OfflineBundleTestCase(TestCase):
+    """Tests for the offline course bundle manifest"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='offline@example.com', password='testpass123')
+        cls.course = Course.objects.create(user=cls.user, subject='Biology', exam_type='WAEC')
+        lesson = CachedLesson.objects.create(topic='Cells', content='<p>Cells</p>', syllabus_version='2025')
+        cls.lesson_module = Module.objects.create(
+            course=cls.course, title='Cells', order=1, syllabus_topic='Cells', lesson_content=lesson
+        )
+        cls.empty_module = Module.objects.create(course=cls.course, title='Tissues', order=2, syllabus_topic='Tissues')
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.login(email='offline@example.com', password='testpass123')
+        self.url = reverse('courses:offline_manifest', args=[self.course.id])
+    
+    def hashes(self):
+        return {resource['url']: resource['hash'] for resource in self.client.get(self.url).json()['resources']}
+    
+    def test_manifest_lists_pages_and_assets(self):
+        quiz = QuizAttempt.objects.create(user=self.user, module=self.lesson_module)
+        manifest = self.client.get(self.url).json()
+        urls = [resource['url'] for resource in manifest['resources']]
+        
+        self.assertEqual(urls, [
+            reverse('courses:module_listing', args=[self.course.id]),
+            reverse('courses:lesson_detail', args=[self.lesson_module.id]),
+            reverse('quizzes:quiz_detail', args=[quiz.id]),
+        ])
+        self.assertTrue(any('katex.min.js' in asset for asset in manifest['assets']))
+        self.assertTrue(any(asset.endswith('offline.js') for asset in manifest['assets']))
+    
+    def test_unchanged_manifest_revalidates_with_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], '"%s"' % response.json()['version'])
+        
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+    
+    def test_only_affected_resources_change(self):
+        before = self.hashes()
+        
+        CachedLesson.objects.filter(pk=self.lesson_module.lesson_content_id).update(is_validated=True)
+        after = self.hashes()
+        lesson_url = reverse('courses:lesson_detail', args=[self.lesson_module.id])
+        module_url = reverse('courses:module_listing', args=[self.course.id])
+        self.assertNotEqual(before[lesson_url], after[lesson_url])
+        self.assertEqual(before[module_url], after[module_url])
+    
+    def test_other_users_cannot_fetch_manifest(self):
+        get_user_model().objects.create_user(email='other@example.com', password='testpass123')
+        self.client.login(email='other@example.com', password='testpass123')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class SearchTestCase(TestCase):
+    """Tests for full-text search over topics, modules and lessons"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(email='search@example.com', password='testpass123')
+        cls.other = User.objects.create_user(email='nosy@example.com', password='testpass123')
+        
+        js1 = SchoolLevel.objects.create(name='JS1', level_order=1, level_type='JUNIOR')
+        science = Subject.objects.create(name='Basic Science', code='BSC')
+        term = Term.objects.create(name='First Term', order=1, total_weeks=2, instructional_weeks=2, exam_weeks=0)
+        week = Week.objects.create(term=term, week_number=1, week_type='INSTRUCTIONAL')
+        curriculum = SubjectCurriculum.objects.create(school_level=js1, subject=science, term=term)
+        cls.topic = Topic.objects.create(
+            curriculum=curriculum, week=week, title='Photosynthesis',
+            description='How green plants make food from sunlight', order=1
+        )
+        Topic.objects.create(
+            curriculum=curriculum, week=week, title='Respiration',
+            description='Plants and animals release energy; photosynthesis stores it', order=2
+        )
+        
+        cls.lesson = CachedLesson.objects.create(
+            topic='Chlorophyll', content='<h2>Chlorophyll</h2><p>The pigment that absorbs sunlight &amp; light energy.</p>',
+            syllabus_version='2025'
+        )
+        course = Course.objects.create(user=cls.user, subject='Basic Science', school_level=js1)
+        cls.module = Module.objects.create(
+            course=course, title='Plant nutrition', order=1, syllabus_topic='Photosynthesis',
+            topic=cls.topic, lesson_content=cls.lesson
+        )
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.login(email='search@example.com', password='testpass123')
+    
+    def test_signals_index_and_remove_documents(self):
+        self.assertEqual(SearchDocument.objects.filter(kind='topic').count(), 2)
+        document = SearchDocument.objects.get(kind='lesson', object_id=self.lesson.pk)
+        self.assertEqual(document.body, 'Chlorophyll The pigment that absorbs sunlight & light energy.')
+        
+        self.topic.title = 'Photosynthesis in green plants'
+        self.topic.save()
+        self.assertEqual(SearchDocument.objects.get(kind='topic', object_id=self.topic.pk).title, self.topic.title)
+        
+        self.lesson.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='lesson').exists())
+    
+    def test_title_matches_rank_first_and_link_to_own_module(self):
+        results = search('photosynthesis', self.user)
+        
+        # The topic and module both lead to the same module, so only one is kept
+        self.assertEqual(results[0]['module_id'], self.module.pk)
+        self.assertEqual(results[0]['url'], reverse('courses:lesson_detail', args=[self.module.pk]))
+        self.assertEqual([result['title'] for result in results], ['Photosynthesis', 'Respiration'])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+    
+    def test_last_term_matches_as_prefix(self):
+        self.assertEqual(search('chloroph', self.user)[0]['kind'], 'lesson')
+        self.assertEqual(search('green pla', self.user)[0]['title'], 'Photosynthesis')
+    
+    def test_other_users_modules_and_lessons_are_hidden(self):
+        results = search('photosynthesis', self.other)
+        self.assertEqual({result['kind'] for result in results}, {'topic'})
+        self.assertTrue(all(result['module_id'] is None for result in results))
+        self.assertEqual(search('chlorophyll', self.other), [])
+    
+    def test_rebuild_index_restores_documents(self):
+        SearchDocument.objects.all().delete()
+        
+        counts = rebuild_index()
+        self.assertEqual(counts, {'topic': 2, 'module': 1, 'lesson': 1})
+        self.assertEqual(search('sunlight', self.user)[0]['module_id'], self.module.pk)
+    
+    def test_search_endpoint(self):
+        response = self.client.get(reverse('courses:search'), {'q': 'photo', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        data = response.json()
+        self.assertEqual(data['query'], 'photo')
+        self.assertEqual(len(data['results']), 1)
+        
+        self.assertEqual(self.client.get(reverse('courses:search'), {'q': 'p'}).json()['results'], [])
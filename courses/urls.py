@@ -10,11 +10,17 @@ urlpatterns = [
     
     path('tutor/', views.TutorHubView.as_view(), name='tutor_hub'),
     
+    path('search/', views.SearchView.as_view(), name='search'),
+    
     path('api/subjects/', views.GetAvailableSubjectsView.as_view(), name='get_subjects'),
+    path('api/availability/<slug:version>/', views.CurriculumAvailabilityView.as_view(), name='availability'),
     
     path('<int:course_id>/modules/', views.ModuleListingView.as_view(), name='module_listing'),
+    path('<int:course_id>/offline/manifest/', views.OfflineManifestView.as_view(), name='offline_manifest'),
     
     path('module/<int:module_id>/lesson/', views.LessonDetailView.as_view(), name='lesson_detail'),
+    path('module/<int:module_id>/lesson/generate/', views.LessonGenerateView.as_view(), name='lesson_generate'),
+    path('module/<int:module_id>/lesson/sections/', views.LessonSectionsView.as_view(), name='lesson_sections'),
     
     path('module/<int:module_id>/ask/', views.AskTutorView.as_view(), name='ask_tutor'),
     
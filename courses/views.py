@@ -6,16 +6,29 @@ from django.contrib import messages
 from django.conf import settings
 from .models import Course, Module, CachedLesson
 from .forms import CourseCreationForm
+from .offline import course_bundle_manifest
+from .search import search
 from core.utils.ai_module_generator import generate_course_modules
 from core.services.curriculum import CurriculumService
+from assessments.services import refresh_course_progress
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from core.utils.ai_lesson_generator import LESSON_DEADLINE_SECONDS, LESSON_SECTIONS
+from core.utils.rendering import render_markdown
 from quizzes.models import QuizAttempt
-import bleach
+from users.stats import adjust_user_stats, get_user_stats
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump when lesson_detail.html changes so browsers drop revalidated copies
+LESSON_PAGE_VERSION = 1
+
 
 class CourseDashboardView(LoginRequiredMixin, View):
     def get(self, request):
@@ -31,14 +44,19 @@ class CourseDashboardView(LoginRequiredMixin, View):
         return render(request, 'courses/dashboard.html', context)
 
 
+def _course_form_context(form):
+    availability_version, _ = CurriculumService.get_availability_document()
+    return {
+        'form': form,
+        'title': 'Create New Course',
+        'availability_version': availability_version,
+    }
+
+
 class CourseCreationView(LoginRequiredMixin, View):
     def get(self, request):
         form = CourseCreationForm()
-        context = {
-            'form': form,
-            'title': 'Create New Course',
-        }
-        return render(request, 'courses/course_creation.html', context)
+        return render(request, 'courses/course_creation.html', _course_form_context(form))
 
     def post(self, request):
         form = CourseCreationForm(request.POST)
@@ -62,9 +80,9 @@ class CourseCreationView(LoginRequiredMixin, View):
 
             try:
                 with transaction.atomic():
-                    if not request.user.deduct_credits(5):
+                    if not request.user.deduct_credits(5, reason='course'):
                         messages.error(request, 'Insufficient credits. You need 5 credits to create a course.')
-                        return render(request, 'courses/course_creation.html', {'form': form, 'title': 'Create New Course'})
+                        return render(request, 'courses/course_creation.html', _course_form_context(form))
 
                     new_course = Course.objects.create(
                         user=request.user,
@@ -80,6 +98,8 @@ class CourseCreationView(LoginRequiredMixin, View):
                     if not success:
                         raise Exception("AI module generation failed.")
 
+                    refresh_course_progress(request.user, new_course)
+
                 messages.success(request, f'Course "{subject.name}" created successfully!')
                 return redirect('dashboard')
 
@@ -87,11 +107,7 @@ class CourseCreationView(LoginRequiredMixin, View):
                 logger.error(f"Course creation failed and rolled back: {e}")
                 messages.error(request, 'Sorry, the AI tutor is busy. Please try again.')
 
-        context = {
-            'form': form,
-            'title': 'Create New Course',
-        }
-        return render(request, 'courses/course_creation.html', context)
+        return render(request, 'courses/course_creation.html', _course_form_context(form))
 
 
 class ModuleListingView(LoginRequiredMixin, View):
@@ -153,64 +169,51 @@ class ModuleListingView(LoginRequiredMixin, View):
         return render(request, 'courses/module_listing.html', context)
 
 
-class LessonDetailView(LoginRequiredMixin, View):
-    def get(self, request, module_id):
-        module = get_object_or_404(Module, id=module_id, course__user=request.user)
+LESSON_PROGRESS_TIMEOUT = 10 * 60  # Seconds partially generated sections stay visible
 
-        if not module.lesson_content:
-            lesson = self._generate_lesson(module)
-        else:
-            lesson = module.lesson_content
-            if lesson.report_count > settings.AKILI_LESSON_REPORT_THRESHOLD:
-                lesson.delete()
-                lesson = self._generate_lesson(module)
 
-        incomplete_quiz = QuizAttempt.objects.filter(
-            user=request.user,
-            module=module,
-            completed_at__isnull=True
-        ).first()
+def _lesson_progress_key(module_id):
+    return f'lesson_progress:{module_id}'
 
-        best_attempt = QuizAttempt.objects.filter(
-            user=request.user,
-            module=module,
-            completed_at__isnull=False
-        ).order_by('-score').first()
 
-        context = {
-            'module': module,
-            'lesson': lesson,
-            'course': module.course,
-            'title': module.title,
-            'incomplete_quiz': incomplete_quiz,
-            'best_attempt': best_attempt,
-        }
-        return render(request, 'courses/lesson_detail.html', context)
+def _lesson_lock_key(module_id):
+    return f'lesson_generating:{module_id}'
 
-    def _generate_lesson(self, module):
-        from core.utils.ai_fallback import call_ai_with_fallback, validate_ai_content
-        import markdown
 
-        course = module.course
+def _generate_lesson(module):
+    """
+    Generate, validate and cache a lesson for a module.
+
+    The lesson is written as an outline plus concurrently generated sections;
+    each section is published to the cache as it lands so the lesson page can
+    display it before the whole lesson is ready.
+
+    Returns:
+        CachedLesson, or None if the AI service could not produce any section
+    """
+    from core.utils.ai_fallback import validate_ai_content
+    from core.utils.ai_lesson_generator import generate_sectioned_lesson
+
+    course = module.course
+    
+    if course.school_level and course.term and course.curriculum:
+        school_level = course.school_level
+        term = course.term
+        curriculum = course.curriculum
         
-        if course.school_level and course.term and course.curriculum:
-            school_level = course.school_level
-            term = course.term
-            curriculum = course.curriculum
-            
-            previous_topics = CurriculumService.get_previous_topics(curriculum, module.topic.week if module.topic else term.weeks.first(), limit=3)
-            previous_summary = ", ".join([t.title for t in previous_topics]) if previous_topics else "None"
-            
-            week_info = ""
-            difficulty = "INTERMEDIATE"
-            learning_objectives = ""
-            
-            if module.topic:
-                week_info = f"Week {module.topic.week.week_number} ({module.topic.week.week_type})"
-                difficulty = module.topic.difficulty_level
-                learning_objectives = "\n".join(module.topic.learning_objectives) if module.topic.learning_objectives else ""
-            
-            prompt = f"""You are creating lesson content for Nigerian secondary school students.
+        previous_topics = CurriculumService.get_previous_topics(curriculum, module.topic.week if module.topic else term.weeks.first(), limit=3)
+        previous_summary = ", ".join([t.title for t in previous_topics]) if previous_topics else "None"
+        
+        week_info = ""
+        difficulty = "INTERMEDIATE"
+        learning_objectives = ""
+        
+        if module.topic:
+            week_info = f"Week {module.topic.week.week_number} ({module.topic.week.week_type})"
+            difficulty = module.topic.difficulty_level
+            learning_objectives = "\n".join(module.topic.learning_objectives) if module.topic.learning_objectives else ""
+        
+        brief = f"""You are creating lesson content for Nigerian secondary school students.
 
 Context:
 - Class Level: {school_level.name} ({school_level.level_type})
@@ -233,10 +236,10 @@ INSTRUCTIONS:
 6. If you include practice questions, only provide the questions without answers
 7. Focus on explaining concepts clearly appropriate for {school_level.name} students
 
-Generate a comprehensive lesson for Week {module.topic.week.week_number if module.topic else 'this'} of {term.name}.
+This lesson is for Week {module.topic.week.week_number if module.topic else 'this'} of {term.name}.
 Build on concepts from previous weeks. The difficulty should match {difficulty} level."""
-        else:
-            prompt = f"""Create a comprehensive lesson on the following topic for {course.exam_type or 'secondary school'} {course.subject}:
+    else:
+        brief = f"""You are creating a lesson on the following topic for {course.exam_type or 'secondary school'} {course.subject}:
 
 Topic: {module.syllabus_topic}
 Module Title: {module.title}
@@ -250,59 +253,192 @@ IMPORTANT INSTRUCTIONS:
 6. If you include practice questions, only provide the questions without answers
 7. Focus on explaining concepts clearly for exam preparation
 
-Provide a detailed, well-structured lesson covering all key concepts."""
+The lesson should be detailed and well-structured, covering all key concepts."""
+
+    progress = {'outline': [], 'sections': {}}
+    progress_key = _lesson_progress_key(module.id)
+
+    def publish_outline(outline):
+        progress['outline'] = outline
+        cache.set(progress_key, progress, LESSON_PROGRESS_TIMEOUT)
+
+    def publish_section(key, markdown_text):
+        progress['sections'][key] = render_markdown(markdown_text, 'lesson')
+        cache.set(progress_key, progress, LESSON_PROGRESS_TIMEOUT)
+
+    content_markdown = generate_sectioned_lesson(
+        brief, course.subject, on_section=publish_section, on_outline=publish_outline
+    )
+    if content_markdown is None:
+        cache.delete(progress_key)
+        return None
+
+    content_html = render_markdown(content_markdown, 'lesson')
+    validation_result = validate_ai_content(content_markdown)
+    is_validated = validation_result.strip().upper() == 'OK'
+    if not is_validated:
+        content_html = f"{content_html}<div class='mt-4 p-3 bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 dark:border-yellow-800 rounded-lg text-sm text-yellow-800 dark:text-yellow-200'><strong>Note:</strong> This content is under review.</div>"
+
+    lesson = CachedLesson.objects.create(
+        topic=module.syllabus_topic,
+        content=content_html,
+        syllabus_version="2025",
+        is_validated=is_validated,
+        requested_by=module.course.user
+    )
+
+    module.lesson_content = lesson
+    module.save()
+    cache.delete(progress_key)
+
+    return lesson
+
+
+def _lesson_payload(lesson):
+    return {'complete': True, 'html': lesson.content, 'is_validated': lesson.is_validated}
+
+
+def _lesson_validators(request, lesson, incomplete_quiz, best_attempt):
+    """
+    ETag and Last-Modified for a generated lesson page.
+
+    The page is the immutable lesson plus a few per-user bits: quiz state,
+    the credit and notification counts in the layout, the CSRF secret
+    embedded in its forms and whether the lite layout was used. The ETag
+    covers all of them; Last-Modified only reflects the lesson and quiz
+    timestamps.
+    """
+    user = request.user
+    state = (
+        LESSON_PAGE_VERSION,
+        lesson.id, lesson.syllabus_version, lesson.is_validated,
+        incomplete_quiz.id if incomplete_quiz else None,
+        (best_attempt.id, best_attempt.score, best_attempt.passed) if best_attempt else None,
+        user.tutor_credits, user.daily_credit_limit, user.last_daily_reset, timezone.localdate(),
+        get_user_stats(user).unread_notifications,
+        hasattr(user, 'parent_profile'), hasattr(user, 'teacher_profile'),
+        request.META.get('CSRF_COOKIE'),
+        getattr(request, 'lite_mode', False),
+    )
+    etag = 'W/"%s"' % hashlib.sha256(repr(state).encode('utf-8')).hexdigest()[:32]
+
+    timestamps = [lesson.created_at]
+    if incomplete_quiz:
+        timestamps.append(incomplete_quiz.created_at)
+    if best_attempt and best_attempt.completed_at:
+        timestamps.append(best_attempt.completed_at)
+    return etag, max(timestamps)
 
-        result = call_ai_with_fallback(prompt, max_tokens=2000, subject=course.subject)
-        if not result['success']:
-            content_markdown = "AI tutors are at full capacity. Please try again in 2-3 minutes."
-            content_html = content_markdown
-            is_validated = False
-        else:
-            content_markdown = result['content']
-            raw_html = markdown.markdown(
-                content_markdown,
-                extensions=['extra', 'codehilite', 'tables', 'fenced_code']
+
+class LessonDetailView(LoginRequiredMixin, View):
+    def get(self, request, module_id):
+        module = get_object_or_404(Module, id=module_id, course__user=request.user)
+
+        # A missing lesson is generated by LessonGenerateView, which the page
+        # calls while polling LessonSectionsView to show sections as they land.
+        # The content column is only loaded if the page is actually rendered.
+        lesson = CachedLesson.objects.defer('content').filter(id=module.lesson_content_id).first()
+        if lesson and lesson.report_count > settings.AKILI_LESSON_REPORT_THRESHOLD:
+            lesson.delete()
+            lesson = None
+
+        incomplete_quiz = QuizAttempt.objects.filter(
+            user=request.user,
+            module=module,
+            completed_at__isnull=True
+        ).first()
+
+        best_attempt = QuizAttempt.objects.filter(
+            user=request.user,
+            module=module,
+            completed_at__isnull=False
+        ).order_by('-score').first()
+
+        # Generated lessons never change, so repeat views revalidate with a
+        # 304 instead of re-rendering. Pending flash messages force a render.
+        validators = None
+        if lesson and not len(messages.get_messages(request)):
+            etag, last_modified = _lesson_validators(request, lesson, incomplete_quiz, best_attempt)
+            validators = {'ETag': etag, 'Last-Modified': http_date(last_modified.timestamp())}
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=int(last_modified.timestamp())
             )
-            allowed_tags = [
-                'p', 'br', 'strong', 'em', 'b', 'i', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                'ul', 'ol', 'li', 'pre', 'code', 'blockquote', 'table', 'thead', 'tbody',
-                'tr', 'th', 'td', 'a', 'div', 'span', 'hr', 'sub', 'sup'
-            ]
-            allowed_attrs = {
-                'a': ['href', 'title'],
-                'code': ['class'],
-                'pre': ['class'],
-                'div': ['class'],
-                'span': ['class'],
-                'table': ['class'],
-                'th': ['colspan', 'rowspan'],
-                'td': ['colspan', 'rowspan'],
-            }
-            allowed_protocols = ['http', 'https', 'mailto']
-            content_html = bleach.clean(
-                raw_html, 
-                tags=allowed_tags, 
-                attributes=allowed_attrs,
-                protocols=allowed_protocols,
-                strip=True
+            if not_modified is not None:
+                return self._with_validators(not_modified, validators)
+
+        context = {
+            'module': module,
+            'lesson': lesson,
+            'lesson_sections': [(key, heading) for key, heading, _, _ in LESSON_SECTIONS],
+            'course': module.course,
+            'title': module.title,
+            'incomplete_quiz': incomplete_quiz,
+            'best_attempt': best_attempt,
+        }
+        response = render(request, 'courses/lesson_detail.html', context)
+        return self._with_validators(response, validators) if validators else response
+
+    @staticmethod
+    def _with_validators(response, validators):
+        for header, value in validators.items():
+            response.headers[header] = value
+        # Browsers keep the page but must revalidate; shared caches must not store it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class LessonGenerateView(LoginRequiredMixin, View):
+    def post(self, request, module_id):
+        module = get_object_or_404(Module, id=module_id, course__user=request.user)
+
+        if module.lesson_content:
+            return JsonResponse(_lesson_payload(module.lesson_content))
+
+        # Only one request generates a given lesson; others keep polling
+        if not cache.add(_lesson_lock_key(module.id), True, LESSON_DEADLINE_SECONDS + 30):
+            return JsonResponse({'complete': False, 'pending': True})
+
+        try:
+            lesson = _generate_lesson(module)
+        finally:
+            cache.delete(_lesson_lock_key(module.id))
+
+        if lesson is None:
+            return JsonResponse(
+                {'complete': False, 'error': "AI tutors are at full capacity. Please try again in 2-3 minutes."},
+                status=503
             )
-            validation_result = validate_ai_content(content_markdown)
-            is_validated = validation_result.strip().upper() == 'OK'
-            if not is_validated:
-                content_html = f"{content_html}<div class='mt-4 p-3 bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 dark:border-yellow-800 rounded-lg text-sm text-yellow-800 dark:text-yellow-200'><strong>Note:</strong> This content is under review.</div>"
+        return JsonResponse(_lesson_payload(lesson))
 
-        lesson = CachedLesson.objects.create(
-            topic=module.syllabus_topic,
-            content=content_html,
-            syllabus_version="2025",
-            is_validated=is_validated,
-            requested_by=module.course.user
-        )
 
-        module.lesson_content = lesson
-        module.save()
+class LessonSectionsView(LoginRequiredMixin, View):
+    def get(self, request, module_id):
+        module = get_object_or_404(Module, id=module_id, course__user=request.user)
 
-        return lesson
+        if module.lesson_content:
+            return JsonResponse(_lesson_payload(module.lesson_content))
+
+        progress = cache.get(_lesson_progress_key(module.id)) or {}
+        return JsonResponse({
+            'complete': False,
+            'outline': progress.get('outline', []),
+            'sections': progress.get('sections', {}),
+        })
+
+
+class OfflineManifestView(LoginRequiredMixin, View):
+    """Bundle manifest the service worker syncs a downloaded course against"""
+
+    def get(self, request, course_id):
+        course = get_object_or_404(Course, id=course_id, user=request.user)
+        manifest = course_bundle_manifest(course, request.user)
+
+        etag = '"%s"' % manifest['version']
+        not_modified = get_conditional_response(request, etag=etag)
+        response = not_modified if not_modified is not None else JsonResponse(manifest)
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
 
 class AskTutorView(LoginRequiredMixin, View):
@@ -314,7 +450,7 @@ class AskTutorView(LoginRequiredMixin, View):
             messages.error(request, 'Please enter a question.')
             return redirect('courses:lesson_detail', module_id=module_id)
 
-        if not request.user.deduct_credits(1):
+        if not request.user.deduct_credits(1, reference=str(module.id)):
             messages.error(request, 'Insufficient credits. You need 1 credit to ask a question.')
             return redirect('courses:lesson_detail', module_id=module_id)
 
@@ -340,7 +476,7 @@ Provide a clear, helpful answer appropriate for the student's level."""
         if result['success']:
             messages.success(request, f"AI Tutor: {result['content']}")
         else:
-            request.user.add_credits(1)
+            request.user.add_credits(1, reason='refund', reference=str(module.id))
             messages.error(request, 'AI tutors are at capacity. Please try again later. Your credit has been refunded.')
 
         return redirect('courses:lesson_detail', module_id=module_id)
@@ -372,7 +508,13 @@ class DeleteCourseView(LoginRequiredMixin, View):
             messages.error(request, "Incorrect password. Course deletion cancelled.")
             return redirect('dashboard')
 
-        course.delete()
+        with transaction.atomic():
+            # The cascade removes the course's completed quizzes and exams from the counters
+            completed_quizzes = QuizAttempt.objects.filter(module__course=course, completed_at__isnull=False).count()
+            completed_exams = course.exams.filter(completed_at__isnull=False).count()
+            course.delete()
+            adjust_user_stats([request.user.pk], 'completed_quizzes', -completed_quizzes)
+            adjust_user_stats([request.user.pk], 'completed_exams', -completed_exams)
         messages.success(request, f'Course "{course_name}" deleted successfully.')
         return redirect('dashboard')
 
@@ -392,6 +534,46 @@ class GetAvailableSubjectsView(LoginRequiredMixin, View):
         return JsonResponse({'subjects': []})
 
 
+class CurriculumAvailabilityView(LoginRequiredMixin, View):
+    """
+    Level x term x subject availability matrix for the course form.
+
+    The URL carries the content version, so a matching request is cached
+    for good; a stale version redirects to the current document.
+    """
+
+    def get(self, request, version):
+        current_version, document = CurriculumService.get_availability_document()
+        if version != current_version:
+            response = redirect('courses:availability', version=current_version)
+            patch_cache_control(response, no_store=True)
+            return response
+
+        response = HttpResponse(document, content_type='application/json')
+        response.headers['ETag'] = '"%s"' % current_version
+        patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60, immutable=True)
+        return response
+
+
+class SearchView(LoginRequiredMixin, View):
+    """Ranked autocomplete over curriculum topics and the user's modules and lessons"""
+    
+    MIN_QUERY_LENGTH = 2
+    MAX_LIMIT = 20
+    
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), self.MAX_LIMIT)
+        except ValueError:
+            limit = 10
+        
+        results = search(query, request.user, limit) if len(query) >= self.MIN_QUERY_LENGTH else []
+        response = JsonResponse({'query': query, 'results': results})
+        patch_cache_control(response, private=True, max_age=60)
+        return response
+
+
 class TutorHubView(LoginRequiredMixin, View):
     """Global AI Tutor Hub - ask questions across all subjects"""
     
@@ -434,7 +616,7 @@ class TutorHubView(LoginRequiredMixin, View):
             messages.error(request, 'Please enter a question.')
             return redirect('courses:tutor_hub')
         
-        if not request.user.deduct_credits(1):
+        if not request.user.deduct_credits(1, reference=str(module.id)):
             messages.error(request, 'Insufficient credits. You need 1 credit to ask a question.')
             return redirect('courses:tutor_hub')
         
@@ -459,16 +641,15 @@ Provide a clear, encouraging, and educational answer appropriate for the student
         result = call_ai_with_fallback(prompt, max_tokens=1500, subject=course.subject)
         
         if result.get('success'):
-            answer = bleach.clean(result.get('content', ''), tags=[], strip=True)
             context = {
                 'title': 'AI Tutor Response',
                 'question': question,
-                'answer': result.get('content', ''),
+                'answer': render_markdown(result.get('content', ''), 'tutor'),
                 'module': module,
                 'course': course,
             }
             return render(request, 'courses/tutor_response.html', context)
         else:
             messages.error(request, 'Sorry, I could not process your question. Please try again.')
-            request.user.add_credits(1)
+            request.user.add_credits(1, reason='refund', reference=str(module.id))
             return redirect('courses:tutor_hub')
@@ -0,0 +1,124 @@
+"""
+Alias index for matching legacy exam subject names to curriculum mappings.
+
+Legacy courses carry free-text subject names ("Maths ", "Lit in English",
+"Mathematic"). Names are normalised by folding case, turning "&" into "and"
+and punctuation into spaces, so most variants hit an exact key. Optionally a
+miss falls back to fuzzy matching:
+
+- the closest key within a bounded edit distance, scaled down for short
+  names so that "CRK" never becomes "IRK";
+- otherwise the keys sharing the name's first word, if they all lead to the
+  same subject ("Physics Practical" -> "Physics").
+
+A fuzzy match that could mean two different subjects is treated as no match.
+"""
+import re
+from types import MappingProxyType
+
+MAX_DISTANCE = 2
+# One edit allowed per this many characters of the name, up to MAX_DISTANCE
+CHARS_PER_EDIT = 4
+
+_SEPARATOR_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalise_subject_name(name):
+    """Case- and punctuation-folded form of a subject name"""
+    name = (name or '').casefold().replace('&', ' and ')
+    return _SEPARATOR_RE.sub(' ', name).strip()
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between a and b, or max_distance + 1 as soon as it
+    is known to be larger.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _target(mapping):
+    return (mapping.school_level_id, mapping.subject_id)
+
+
+class LegacyAliasIndex:
+    """
+    Normalised lookup over LegacyExamMapping rows, built once per reference
+    data snapshot. Lookups never query the database.
+    """
+
+    def __init__(self, mappings):
+        by_exam_type = {}
+        for mapping in mappings:
+            key = normalise_subject_name(mapping.subject_name)
+            # Two rows that normalise alike keep the first, as a query ordered by id would
+            by_exam_type.setdefault(mapping.exam_type, {}).setdefault(key, mapping)
+        self._keys = MappingProxyType({
+            exam_type: MappingProxyType(keys) for exam_type, keys in by_exam_type.items()
+        })
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def lookup(self, exam_type, subject_name, fuzzy=False, max_distance=MAX_DISTANCE):
+        """
+        Find the mapping for a legacy subject name.
+
+        Args:
+            exam_type: Legacy exam type (JAMB, SSCE or JSS)
+            subject_name: Subject name as the legacy course spelled it
+            fuzzy: Fall back to edit-distance and first-word matching
+            max_distance: Most edits a fuzzy match may need
+
+        Returns:
+            LegacyExamMapping from the reference data snapshot, or None
+        """
+        keys = self._keys.get(exam_type, {})
+        name = normalise_subject_name(subject_name)
+        if not name:
+            return None
+
+        mapping = keys.get(name)
+        if mapping is not None or not fuzzy:
+            return mapping
+        return self._closest(keys, name, max_distance) or self._first_word(keys, name)
+
+    @staticmethod
+    def _unique(candidates):
+        targets = {_target(mapping) for mapping in candidates}
+        return candidates[0] if len(targets) == 1 else None
+
+    def _closest(self, keys, name, max_distance):
+        bound = min(max_distance, len(name) // CHARS_PER_EDIT)
+        if bound == 0:
+            return None
+
+        best, candidates = bound + 1, []
+        for key, mapping in keys.items():
+            distance = edit_distance(name, key, bound)
+            if distance < best:
+                best, candidates = distance, [mapping]
+            elif distance == best and distance <= bound:
+                candidates.append(mapping)
+        return self._unique(candidates) if candidates else None
+
+    def _first_word(self, keys, name):
+        words = name.split()
+        if len(words) < 2:
+            return None
+        candidates = [mapping for key, mapping in keys.items() if key.split()[0] == words[0]]
+        return self._unique(candidates) if candidates else None
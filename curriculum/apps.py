@@ -5,3 +5,6 @@ class CurriculumConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'curriculum'
     verbose_name = 'Curriculum Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,24 @@
+"""
+Write the curriculum reference data to a snapshot file for
+seed_curriculum --from-snapshot.
+"""
+from django.core.management.base import BaseCommand
+
+from curriculum.snapshot import DEFAULT_SNAPSHOT_PATH, export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export curriculum reference data as a compact snapshot for fast seeding'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(DEFAULT_SNAPSHOT_PATH),
+            help=f'Snapshot file to write (default: {DEFAULT_SNAPSHOT_PATH.name} in curriculum/fixtures)',
+        )
+
+    def handle(self, *args, **options):
+        counts = export_snapshot(options['output'])
+        for label, count in counts.items():
+            self.stdout.write(f'  - {label}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(f"Wrote {sum(counts.values())} rows to {options['output']}"))
@@ -1,85 +1,126 @@
 """
 Phase 5.1: Migration script for existing user courses to new curriculum structure
+
+Subject names are matched through the in-memory legacy alias index (see
+curriculum.aliases), and courses are read and written in chunks: each chunk
+is one read plus one UPDATE per distinct target (level, term, curriculum),
+so a large backlog migrates in one pass without per-row queries.
 """
+from collections import Counter
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
+
 from courses.models import Course
-from curriculum.models import LegacyExamMapping, SchoolLevel, Term
-from core.services.curriculum import CurriculumService
+from curriculum.aliases import MAX_DISTANCE
+from curriculum.reference import get_reference_data
+
+CHUNK_SIZE = 1000
 
 
 class Command(BaseCommand):
     help = 'Migrate existing courses from legacy exam_type to new curriculum structure'
-
+    
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Show what would be migrated without making changes',
         )
-
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Courses read and updated per transaction (default: {CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--exact',
+            action='store_true',
+            help='Only accept names that match a mapping after case and punctuation folding',
+        )
+        parser.add_argument(
+            '--max-distance',
+            type=int,
+            default=MAX_DISTANCE,
+            help=f'Most spelling edits a fuzzy match may need (default: {MAX_DISTANCE})',
+        )
+    
     def handle(self, *args, **options):
         dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        fuzzy = not options['exact']
+        max_distance = options['max_distance']
         
         legacy_courses = Course.objects.filter(
             exam_type__isnull=False,
             school_level__isnull=True
-        ).select_related('user')
+        )
         
         total = legacy_courses.count()
         migrated = 0
-        failed = 0
+        unmatched = Counter()
         
         self.stdout.write(f"Found {total} legacy courses to migrate")
         
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
         
-        default_term = Term.objects.filter(order=1).first()
+        reference = get_reference_data()
+        default_term = next((term for term in reference.terms if term.order == 1), None)
         if not default_term:
             self.stdout.write(self.style.ERROR("No terms found. Run seed_curriculum first."))
             return
         
-        for course in legacy_courses:
-            try:
-                mapping = LegacyExamMapping.objects.filter(
-                    exam_type=course.exam_type,
-                    subject_name__iexact=course.subject
-                ).select_related('school_level', 'subject', 'curriculum').first()
+        aliases = reference.legacy_aliases
+        # Legacy names repeat heavily, so each distinct spelling is matched once
+        matches = {}
+        last_id = 0
+        while True:
+            # Keyset pagination: unmatched courses stay legacy, so offsets would shift
+            chunk = list(
+                legacy_courses.filter(id__gt=last_id).order_by('id').only('id', 'exam_type', 'subject')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            
+            # (school level, term, curriculum) -> course ids
+            targets = {}
+            for course in chunk:
+                key = (course.exam_type, course.subject)
+                if key not in matches:
+                    matches[key] = aliases.lookup(course.exam_type, course.subject, fuzzy=fuzzy, max_distance=max_distance)
+                mapping = matches[key]
+                if mapping is None:
+                    unmatched[key] += 1
+                    continue
                 
-                if not mapping:
-                    mapping = LegacyExamMapping.objects.filter(
-                        exam_type=course.exam_type,
-                        subject_name__icontains=course.subject.split()[0]
-                    ).select_related('school_level', 'subject', 'curriculum').first()
-                
-                if mapping:
-                    if not dry_run:
-                        with transaction.atomic():
-                            course.school_level = mapping.school_level
-                            course.term = default_term
-                            course.curriculum = mapping.curriculum
-                            course.save()
-                    
+                target = (mapping.school_level_id, default_term.id, mapping.curriculum_id)
+                targets.setdefault(target, []).append(course.id)
+                if options['verbosity'] >= 2:
                     self.stdout.write(
                         f"  {'[DRY]' if dry_run else '[OK]'} {course.exam_type} {course.subject} -> "
                         f"{mapping.school_level.name} {mapping.subject.name}"
                     )
-                    migrated += 1
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(f"  [SKIP] No mapping for {course.exam_type} {course.subject}")
-                    )
-                    failed += 1
-                    
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f"  [ERROR] {course.exam_type} {course.subject}: {str(e)}")
-                )
-                failed += 1
+            
+            if targets and not dry_run:
+                # Far cheaper than bulk_update's per-row CASE when rows share a few targets
+                with transaction.atomic():
+                    for (school_level_id, term_id, curriculum_id), ids in targets.items():
+                        Course.objects.filter(id__in=ids).update(
+                            school_level_id=school_level_id, term_id=term_id, curriculum_id=curriculum_id
+                        )
+            migrated += sum(len(ids) for ids in targets.values())
+        
+        for (exam_type, subject), count in unmatched.most_common():
+            self.stdout.write(
+                self.style.WARNING(f"  [SKIP] No mapping for {exam_type} {subject!r} ({count} course{'s' if count != 1 else ''})")
+            )
         
         self.stdout.write("")
-        self.stdout.write(self.style.SUCCESS(f"Migration complete: {migrated} migrated, {failed} failed/skipped"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Migration complete: {migrated} migrated, {sum(unmatched.values())} skipped"
+        ))
         
         if dry_run:
             self.stdout.write(self.style.WARNING("Run without --dry-run to apply changes"))
@@ -1,29 +1,67 @@
-from django.core.management.base import BaseCommand, CommandError
+"""
+Seed the curriculum reference data.
+
+By default the data is generated and written with batched bulk_create, one
+transaction per table. --from-snapshot restores a snapshot written by
+export_curriculum_snapshot instead, which is much faster on fresh databases.
+"""
+import time
+from pathlib import Path
+
+from django.core import serializers
 from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
 from curriculum.models import Subject, SchoolLevel, LegacyExamMapping
+from curriculum.snapshot import (
+    BATCH_SIZE, DEFAULT_SNAPSHOT_PATH, SnapshotError, bulk_insert,
+    finish_bulk_load, reset_sequences, restore_snapshot
+)
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / 'fixtures'
 
 
 class Command(BaseCommand):
     help = 'Seeds the curriculum database with Nigerian academic structure data'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-snapshot',
+            nargs='?',
+            const=str(DEFAULT_SNAPSHOT_PATH),
+            metavar='PATH',
+            help=f'Restore a curriculum snapshot instead of generating the data (default: {DEFAULT_SNAPSHOT_PATH.name})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows per INSERT statement (default: {BATCH_SIZE})',
+        )
+
     def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        
+        if options['from_snapshot']:
+            self._restore(options['from_snapshot'])
+            self._index_topics()
+            self.stdout.write(self.style.SUCCESS(f'Restored curriculum snapshot in {time.perf_counter() - started:.1f}s'))
+            return
+        
         self.stdout.write('Loading initial curriculum data...')
         
-        try:
-            call_command('loaddata', 'initial_data.json', verbosity=0)
-            self.stdout.write(self.style.SUCCESS('Loaded academic sessions, school levels, terms, and weeks'))
-        except Exception as e:
-            raise CommandError(f'Error loading initial data: {e}')
+        self._load_fixture('initial_data.json')
+        self.stdout.write(self.style.SUCCESS('Loaded academic sessions, school levels, terms, and weeks'))
         
-        try:
-            call_command('loaddata', 'subjects.json', verbosity=0)
-            self.stdout.write(self.style.SUCCESS('Loaded subjects'))
-        except Exception as e:
-            raise CommandError(f'Error loading subjects: {e}')
+        self._load_fixture('subjects.json')
+        self.stdout.write(self.style.SUCCESS('Loaded subjects'))
         
         self._assign_subjects_to_levels()
         mapping_count = self._create_legacy_mappings()
         curriculum_count, topic_count = self._create_curricula_and_topics()
+        finish_bulk_load()
+        self._index_topics()
         
         self._verify_counts(mapping_count, curriculum_count, topic_count)
         
@@ -37,6 +75,38 @@ class Command(BaseCommand):
         self.stdout.write(f'  - {mapping_count} legacy exam mappings for JAMB/SSCE/JSS compatibility')
         self.stdout.write(f'  - {curriculum_count} SubjectCurriculum entries')
         self.stdout.write(f'  - {topic_count} Topic entries (all weeks covered)')
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+    def _restore(self, path):
+        self.stdout.write(f'Restoring curriculum snapshot {path}...')
+        try:
+            added = restore_snapshot(path, self.batch_size)
+        except SnapshotError as e:
+            raise CommandError(str(e))
+        
+        for label, count in added.items():
+            self.stdout.write(f'  - {label}: {count} rows added')
+        self._verify_counts(0, 0, 0)
+
+    def _index_topics(self):
+        """Bulk inserts skip the search signal handlers, so index topics in one pass"""
+        call_command('rebuild_search_index', kind=['topic'], stdout=self.stdout)
+
+    def _load_fixture(self, name):
+        """Bulk insert a fixture's objects, model by model in file order"""
+        try:
+            with open(FIXTURES_DIR / name) as f:
+                objects = [deserialized.object for deserialized in serializers.deserialize('json', f)]
+        except (OSError, DeserializationError) as e:
+            raise CommandError(f'Error loading {name}: {e}')
+        
+        models = []
+        for obj in objects:
+            if type(obj) not in models:
+                models.append(type(obj))
+        for model in models:
+            bulk_insert(model, [obj for obj in objects if type(obj) is model], self.batch_size)
+        reset_sequences(models)
 
     def _verify_counts(self, mapping_count, curriculum_count, topic_count):
         from curriculum.models import SubjectCurriculum, Topic, Week
@@ -60,25 +130,28 @@ class Command(BaseCommand):
     def _assign_subjects_to_levels(self):
         self.stdout.write('Assigning subjects to school levels...')
         
-        junior_levels = SchoolLevel.objects.filter(level_type='JUNIOR')
-        senior_levels = SchoolLevel.objects.filter(level_type='SENIOR')
-        all_levels = SchoolLevel.objects.all()
+        levels = list(SchoolLevel.objects.all())
+        junior_levels = [level for level in levels if level.level_type == 'JUNIOR']
+        senior_levels = [level for level in levels if level.level_type == 'SENIOR']
+        subjects_by_code = {subject.code: subject for subject in Subject.objects.all()}
         
         all_level_subjects = ['ENG', 'MTH', 'CIV', 'AGR', 'CRS', 'IRS', 'YOR', 'IGB', 'HAU']
         junior_only_subjects = ['BSC', 'BTC', 'SST', 'BUS', 'ICT', 'FRE', 'ART', 'HEC', 'PHE']
         senior_only_subjects = ['PHY', 'CHE', 'BIO', 'ECO', 'GOV', 'LIT', 'HIS', 'GEO', 'COM', 'ACC', 'CSC', 'FMT', 'TDR']
         
-        for code in all_level_subjects:
-            subject = Subject.objects.get(code=code)
-            subject.school_levels.set(all_levels)
-        
-        for code in junior_only_subjects:
-            subject = Subject.objects.get(code=code)
-            subject.school_levels.set(junior_levels)
-        
-        for code in senior_only_subjects:
-            subject = Subject.objects.get(code=code)
-            subject.school_levels.set(senior_levels)
+        SubjectLevel = Subject.school_levels.through
+        assignments = []
+        for codes, subject_levels in [
+            (all_level_subjects, levels),
+            (junior_only_subjects, junior_levels),
+            (senior_only_subjects, senior_levels),
+        ]:
+            for code in codes:
+                assignments.extend(
+                    SubjectLevel(subject_id=subjects_by_code[code].id, schoollevel_id=level.id)
+                    for level in subject_levels
+                )
+        bulk_insert(SubjectLevel, assignments, self.batch_size)
         
         self.stdout.write(self.style.SUCCESS('Subject-level assignments complete'))
 
@@ -261,61 +334,35 @@ class Command(BaseCommand):
             ('Hausa Language', 'HAU'),
         ]
         
-        count = 0
-        for subject_name, code in jamb_subjects:
-            subject = Subject.objects.get(code=code)
-            _, created = LegacyExamMapping.objects.get_or_create(
-                exam_type='JAMB',
-                subject_name=subject_name,
-                defaults={
-                    'school_level': ss3,
-                    'subject': subject,
-                    'notes': 'JAMB UTME subject mapping'
-                }
+        subjects_by_code = {subject.code: subject for subject in Subject.objects.all()}
+        mappings = []
+        for exam_type, subjects, level, notes in [
+            ('JAMB', jamb_subjects, ss3, 'JAMB UTME subject mapping'),
+            ('SSCE', ssce_subjects, ss3, 'WAEC/NECO SSCE subject mapping'),
+            ('JSS', jss_subjects, js3, 'Junior Secondary School exam subject mapping'),
+        ]:
+            mappings.extend(
+                LegacyExamMapping(
+                    exam_type=exam_type,
+                    subject_name=subject_name,
+                    school_level=level,
+                    subject=subjects_by_code[code],
+                    notes=notes
+                )
+                for subject_name, code in subjects
             )
-            if created:
-                count += 1
-        
-        for subject_name, code in ssce_subjects:
-            subject = Subject.objects.get(code=code)
-            _, created = LegacyExamMapping.objects.get_or_create(
-                exam_type='SSCE',
-                subject_name=subject_name,
-                defaults={
-                    'school_level': ss3,
-                    'subject': subject,
-                    'notes': 'WAEC/NECO SSCE subject mapping'
-                }
-            )
-            if created:
-                count += 1
-        
-        for subject_name, code in jss_subjects:
-            subject = Subject.objects.get(code=code)
-            _, created = LegacyExamMapping.objects.get_or_create(
-                exam_type='JSS',
-                subject_name=subject_name,
-                defaults={
-                    'school_level': js3,
-                    'subject': subject,
-                    'notes': 'Junior Secondary School exam subject mapping'
-                }
-            )
-            if created:
-                count += 1
+        count = bulk_insert(LegacyExamMapping, mappings, self.batch_size)
         
         total = LegacyExamMapping.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Created {count} new legacy exam mappings (total: {total})'))
         return total
 
     def _create_curricula_and_topics(self):
-        from curriculum.models import SubjectCurriculum, Topic, Term, Week
+        from curriculum.models import SubjectCurriculum, Topic, Term
         
         self.stdout.write('Generating full curriculum and topic entries...')
         
-        terms = Term.objects.all()
-        curriculum_count = 0
-        topic_count = 0
+        terms = list(Term.objects.prefetch_related('weeks'))
         
         difficulty_by_week = {
             1: 'BASIC', 2: 'BASIC', 3: 'BASIC', 4: 'BASIC',
@@ -324,99 +371,97 @@ class Command(BaseCommand):
             11: 'ADVANCED', 12: 'ADVANCED', 13: 'ADVANCED', 14: 'ADVANCED'
         }
         
-        week_type_titles = {
-            'INSTRUCTIONAL': 'Core Concepts',
-            'REVISION': 'Comprehensive Revision',
-            'EXAM': 'Terminal Examination Preparation'
-        }
-        
-        for level in SchoolLevel.objects.all():
-            subjects = level.subjects.all()
-            for subject in subjects:
+        existing = set(SubjectCurriculum.objects.filter(version='2025').values_list(
+            'school_level_id', 'subject_id', 'term_id'
+        ))
+        curricula = []
+        for level in SchoolLevel.objects.prefetch_related('subjects'):
+            for subject in level.subjects.all():
                 for term in terms:
-                    curriculum, created = SubjectCurriculum.objects.get_or_create(
+                    if (level.id, subject.id, term.id) in existing:
+                        continue
+                    curricula.append(SubjectCurriculum(
                         school_level=level,
                         subject=subject,
                         term=term,
                         version='2025',
-                        defaults={
-                            'overview': f'{subject.name} curriculum for {level.name} {term.name}. This curriculum covers all key concepts appropriate for {level.get_level_type_display()} students.',
-                            'learning_objectives': [
-                                f'Master {level.name} level {subject.name} concepts',
-                                f'Apply {term.name} learning objectives',
-                                f'Develop critical thinking in {subject.name}',
-                                f'Prepare for {level.name} assessments',
-                                f'Build foundational knowledge for next level'
-                            ]
-                        }
-                    )
-                    if created:
-                        curriculum_count += 1
-                    
-                    all_weeks = term.weeks.all()
-                    for week in all_weeks:
-                        difficulty = difficulty_by_week.get(week.week_number, 'INTERMEDIATE')
-                        week_type_title = week_type_titles.get(week.week_type, 'Core Concepts')
-                        
-                        if week.week_type == 'REVISION':
-                            title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}: Revision'
-                            description = f'Comprehensive revision of all {subject.name} concepts covered in {term.name}. Consolidate learning and prepare for examinations.'
-                            learning_objectives = [
-                                f'Review all {term.name} concepts',
-                                'Identify and address knowledge gaps',
-                                'Practice exam-style questions',
-                                'Build confidence for terminal examinations'
-                            ]
-                            key_concepts = [
-                                f'{term.name} Key Topics Review',
-                                'Exam Techniques',
-                                'Time Management Strategies'
-                            ]
-                            duration = 90
-                        elif week.week_type == 'EXAM':
-                            title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}: Examination'
-                            description = f'Terminal examination period for {subject.name}. Focus on exam preparation and performance.'
-                            learning_objectives = [
-                                'Demonstrate mastery of term concepts',
-                                'Apply knowledge under exam conditions',
-                                'Show critical thinking and problem-solving'
-                            ]
-                            key_concepts = [
-                                'Examination Readiness',
-                                'Answer Presentation',
-                                'Self-Assessment'
-                            ]
-                            duration = 120
-                        else:
-                            title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}'
-                            description = f'Core {subject.name} concepts for Week {week.week_number} of {term.name}. Appropriate for {level.name} students.'
-                            learning_objectives = [
-                                f'Understand Week {week.week_number} key concepts',
-                                'Apply concepts through practice exercises',
-                                "Connect to previous week's learning"
-                            ]
-                            key_concepts = [
-                                f'{subject.name} Week {week.week_number} Concept 1',
-                                f'{subject.name} Week {week.week_number} Concept 2',
-                                f'{subject.name} Week {week.week_number} Concept 3'
-                            ]
-                            duration = 45 if difficulty == 'BASIC' else 60 if difficulty == 'INTERMEDIATE' else 75
-                        
-                        topic, t_created = Topic.objects.get_or_create(
-                            curriculum=curriculum,
-                            week=week,
-                            defaults={
-                                'title': title,
-                                'order': 1,
-                                'description': description,
-                                'learning_objectives': learning_objectives,
-                                'key_concepts': key_concepts,
-                                'difficulty_level': difficulty,
-                                'estimated_duration_minutes': duration
-                            }
-                        )
-                        if t_created:
-                            topic_count += 1
+                        overview=f'{subject.name} curriculum for {level.name} {term.name}. This curriculum covers all key concepts appropriate for {level.get_level_type_display()} students.',
+                        learning_objectives=[
+                            f'Master {level.name} level {subject.name} concepts',
+                            f'Apply {term.name} learning objectives',
+                            f'Develop critical thinking in {subject.name}',
+                            f'Prepare for {level.name} assessments',
+                            f'Build foundational knowledge for next level'
+                        ]
+                    ))
+        curriculum_count = bulk_insert(SubjectCurriculum, curricula, self.batch_size)
+        
+        weeks_by_term = {term.id: list(term.weeks.all()) for term in terms}
+        existing_topics = set(Topic.objects.values_list('curriculum_id', 'week_id'))
+        topics = []
+        for curriculum in SubjectCurriculum.objects.filter(version='2025').select_related('school_level', 'subject', 'term'):
+            level, subject, term = curriculum.school_level, curriculum.subject, curriculum.term
+            for week in weeks_by_term[term.id]:
+                if (curriculum.id, week.id) in existing_topics:
+                    continue
+                difficulty = difficulty_by_week.get(week.week_number, 'INTERMEDIATE')
+                
+                if week.week_type == 'REVISION':
+                    title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}: Revision'
+                    description = f'Comprehensive revision of all {subject.name} concepts covered in {term.name}. Consolidate learning and prepare for examinations.'
+                    learning_objectives = [
+                        f'Review all {term.name} concepts',
+                        'Identify and address knowledge gaps',
+                        'Practice exam-style questions',
+                        'Build confidence for terminal examinations'
+                    ]
+                    key_concepts = [
+                        f'{term.name} Key Topics Review',
+                        'Exam Techniques',
+                        'Time Management Strategies'
+                    ]
+                    duration = 90
+                elif week.week_type == 'EXAM':
+                    title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}: Examination'
+                    description = f'Terminal examination period for {subject.name}. Focus on exam preparation and performance.'
+                    learning_objectives = [
+                        'Demonstrate mastery of term concepts',
+                        'Apply knowledge under exam conditions',
+                        'Show critical thinking and problem-solving'
+                    ]
+                    key_concepts = [
+                        'Examination Readiness',
+                        'Answer Presentation',
+                        'Self-Assessment'
+                    ]
+                    duration = 120
+                else:
+                    title = f'{subject.name} - {level.name} - {term.name} - Week {week.week_number}'
+                    description = f'Core {subject.name} concepts for Week {week.week_number} of {term.name}. Appropriate for {level.name} students.'
+                    learning_objectives = [
+                        f'Understand Week {week.week_number} key concepts',
+                        'Apply concepts through practice exercises',
+                        "Connect to previous week's learning"
+                    ]
+                    key_concepts = [
+                        f'{subject.name} Week {week.week_number} Concept 1',
+                        f'{subject.name} Week {week.week_number} Concept 2',
+                        f'{subject.name} Week {week.week_number} Concept 3'
+                    ]
+                    duration = 45 if difficulty == 'BASIC' else 60 if difficulty == 'INTERMEDIATE' else 75
+                
+                topics.append(Topic(
+                    curriculum=curriculum,
+                    week=week,
+                    title=title,
+                    order=1,
+                    description=description,
+                    learning_objectives=learning_objectives,
+                    key_concepts=key_concepts,
+                    difficulty_level=difficulty,
+                    estimated_duration_minutes=duration
+                ))
+        topic_count = bulk_insert(Topic, topics, self.batch_size)
         
         self.stdout.write(self.style.SUCCESS(f'Created {curriculum_count} SubjectCurriculum entries'))
         self.stdout.write(self.style.SUCCESS(f'Created {topic_count} Topic entries (all weeks covered)'))
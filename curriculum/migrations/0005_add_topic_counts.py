@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def cumulative_counts(per_week):
+    """Cumulative counts list from a {week number: topic count} mapping"""
+    if not per_week:
+        return []
+    counts = [0]
+    for week_number in range(1, max(per_week) + 1):
+        counts.append(counts[-1] + per_week.get(week_number, 0))
+    return counts
+
+
+def populate_topic_counts(apps, schema_editor):
+    SubjectCurriculum = apps.get_model('curriculum', 'SubjectCurriculum')
+    Topic = apps.get_model('curriculum', 'Topic')
+
+    per_curriculum = {}
+    rows = Topic.objects.values_list('curriculum_id', 'week__week_number').annotate(n=Count('id')).order_by()
+    for curriculum_id, week_number, n in rows:
+        per_curriculum.setdefault(curriculum_id, {})[week_number] = n
+
+    curricula = list(SubjectCurriculum.objects.filter(id__in=per_curriculum).only('id'))
+    for curriculum in curricula:
+        curriculum.topic_counts = cumulative_counts(per_curriculum[curriculum.id])
+    SubjectCurriculum.objects.bulk_update(curricula, ['topic_counts'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curriculum', '0004_remove_legacyexammapping_curriculum_legacy_exam_subj_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subjectcurriculum',
+            name='topic_counts',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Cumulative topic counts: entry n is the number of topics in weeks 1 to n (kept in sync with Topic)'),
+        ),
+        migrations.RunPython(populate_topic_counts, migrations.RunPython.noop),
+    ]
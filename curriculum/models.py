@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count
 from django.conf import settings
 
 
@@ -96,6 +97,10 @@ class SubjectCurriculum(models.Model):
     version = models.CharField(max_length=50, default="2025")
     overview = models.TextField(blank=True, help_text="Text description of curriculum")
     learning_objectives = models.JSONField(default=list, blank=True, help_text="JSON array of objectives")
+    topic_counts = models.JSONField(
+        default=list, blank=True, editable=False,
+        help_text="Cumulative topic counts: entry n is the number of topics in weeks 1 to n (kept in sync with Topic)"
+    )
     last_updated = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -105,6 +110,65 @@ class SubjectCurriculum(models.Model):
     def __str__(self):
         return f"{self.subject.name} - {self.school_level.name} - {self.term.name}"
 
+    @property
+    def total_topics(self):
+        return self.topic_counts[-1] if self.topic_counts else 0
+
+    def topics_before_week(self, week_number):
+        """Number of topics scheduled in weeks before week_number"""
+        if week_number <= 1 or not self.topic_counts:
+            return 0
+        return self.topic_counts[min(week_number - 1, len(self.topic_counts) - 1)]
+
+    @property
+    def last_topic_week(self):
+        """Last week number that has any topics, or 0 if there are none"""
+        counts = self.topic_counts
+        for week_number in range(len(counts) - 1, 0, -1):
+            if counts[week_number] != counts[week_number - 1]:
+                return week_number
+        return 0
+
+    @staticmethod
+    def build_topic_counts(per_week):
+        """Cumulative counts list from a {week number: topic count} mapping"""
+        if not per_week:
+            return []
+        counts = [0]
+        for week_number in range(1, max(per_week) + 1):
+            counts.append(counts[-1] + per_week.get(week_number, 0))
+        return counts
+
+    @classmethod
+    def refresh_topic_counts(cls, curriculum_ids=None):
+        """
+        Recompute topic_counts from the Topic table with one grouped query.
+        
+        Args:
+            curriculum_ids: Restrict the refresh to these curricula (default: all)
+        
+        Returns:
+            Number of curricula whose counts changed
+        """
+        curricula = cls.objects.only('id', 'topic_counts')
+        rows = Topic.objects.values_list('curriculum_id', 'week__week_number').annotate(n=Count('id')).order_by()
+        if curriculum_ids is not None:
+            curricula = curricula.filter(id__in=curriculum_ids)
+            rows = rows.filter(curriculum_id__in=curriculum_ids)
+
+        per_curriculum = {}
+        for curriculum_id, week_number, n in rows:
+            per_curriculum.setdefault(curriculum_id, {})[week_number] = n
+
+        changed = []
+        for curriculum in curricula:
+            counts = cls.build_topic_counts(per_curriculum.get(curriculum.id, {}))
+            if counts != curriculum.topic_counts:
+                curriculum.topic_counts = counts
+                changed.append(curriculum)
+        cls.objects.bulk_update(changed, ['topic_counts'], batch_size=500)
+        return len(changed)
+
 
 class Topic(models.Model):
     DIFFICULTY_CHOICES = [
@@ -0,0 +1,260 @@
+"""
+Per-process snapshot of curriculum reference data.
+
+School levels, terms, weeks, subjects and curricula only change when an
+admin edits them, yet course creation looks them up several times per
+request. The snapshot loads them once into immutable tuples and mappings
+with O(1) lookups by id, name and (level, subject, term, version), plus
+the level x term x subject availability matrix the course form works from
+and the alias index for legacy exam subject names.
+
+Saves and deletes of the reference models drop this process's snapshot and
+bump a shared version number in the cache; other processes compare their
+snapshot against that version at most every AKILI_REFERENCE_DATA_CHECK_SECONDS
+and rebuild when it has moved. Instances in the snapshot are shared between
+requests and must be treated as read-only.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .aliases import LegacyAliasIndex
+
+VERSION_KEY = 'curriculum:reference_data:version'
+
+# Curriculum version students enrol on (CurriculumService's default)
+CURRICULUM_VERSION = '2025'
+AVAILABILITY_FORMAT = 1
+
+_lock = threading.Lock()
+_state = {'snapshot': None, 'checked_at': 0.0, 'pending': None}
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    version: int
+    levels: tuple
+    terms: tuple
+    subjects: tuple
+    levels_by_id: MappingProxyType
+    levels_by_name: MappingProxyType
+    terms_by_id: MappingProxyType
+    subjects_by_id: MappingProxyType
+    subjects_by_level: MappingProxyType
+    subject_ids_by_level: MappingProxyType
+    weeks_by_term: MappingProxyType
+    curricula_by_id: MappingProxyType
+    curricula_by_key: MappingProxyType
+    availability: MappingProxyType
+    availability_version: str
+    availability_json: bytes
+    legacy_aliases: LegacyAliasIndex
+
+
+def _availability(levels, terms, subjects_by_level, curricula_by_key):
+    """
+    Map (level id, term id) to {subject id: curriculum} for every subject a
+    level offers that has a current curriculum that term, in subject order.
+    """
+    availability = {}
+    for level in levels:
+        for term in terms:
+            offered = {}
+            for subject in subjects_by_level[level.id]:
+                curriculum = curricula_by_key.get((level.id, subject.id, term.id, CURRICULUM_VERSION))
+                if curriculum is not None:
+                    offered[subject.id] = curriculum
+            availability[(level.id, term.id)] = MappingProxyType(offered)
+    return availability
+
+
+def _availability_document(levels, terms, subjects, availability):
+    """
+    Serialise the availability matrix for the course form.
+
+    The version is a hash of the content, so every process derives the same
+    URL for the same data and a document can be cached forever.
+    """
+    offered_subject_ids = {subject_id for offered in availability.values() for subject_id in offered}
+    body = {
+        'format': AVAILABILITY_FORMAT,
+        'curriculum_version': CURRICULUM_VERSION,
+        'levels': [[level.id, level.name] for level in levels],
+        'terms': [[term.id, term.name] for term in terms],
+        'subjects': {str(subject.id): subject.name for subject in subjects if subject.id in offered_subject_ids},
+        # level id -> term id -> [[subject id, curriculum id], ...] in subject name order
+        'availability': {
+            str(level.id): {
+                str(term.id): [
+                    [subject_id, curriculum.id] for subject_id, curriculum in availability[(level.id, term.id)].items()
+                ]
+                for term in terms
+            }
+            for level in levels
+        },
+    }
+    version = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+    document = json.dumps({'version': version, **body}, separators=(',', ':')).encode()
+    return version, document
+
+
+def get_reference_version():
+    """Shared reference data version (starts at 1)"""
+    return cache.get(VERSION_KEY, 1)
+
+
+def bump_reference_version():
+    """Tell every process that its reference data snapshot is stale"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def build_reference_data(version=None):
+    """
+    Load all reference data from the database into a new snapshot.
+
+    Related objects (a curriculum's level, subject and term, a week's term)
+    point at the snapshot's own instances, so nothing is loaded twice and
+    following them never queries.
+    """
+    from .models import LegacyExamMapping, SchoolLevel, Subject, SubjectCurriculum, Term, Week
+
+    if version is None:
+        version = get_reference_version()
+
+    levels = tuple(SchoolLevel.objects.order_by('level_order'))
+    terms = tuple(Term.objects.order_by('order'))
+    subjects = tuple(Subject.objects.order_by('name'))
+    levels_by_id = {level.id: level for level in levels}
+    terms_by_id = {term.id: term for term in terms}
+    subjects_by_id = {subject.id: subject for subject in subjects}
+
+    subject_ids_by_level = {level.id: set() for level in levels}
+    for level_id, subject_id in Subject.school_levels.through.objects.values_list('schoollevel_id', 'subject_id'):
+        subject_ids_by_level[level_id].add(subject_id)
+    subjects_by_level = {
+        level_id: tuple(subject for subject in subjects if subject.id in subject_ids)
+        for level_id, subject_ids in subject_ids_by_level.items()
+    }
+
+    weeks_by_term = {term.id: [] for term in terms}
+    for week in Week.objects.order_by('week_number'):
+        week.term = terms_by_id[week.term_id]
+        weeks_by_term[week.term_id].append(week)
+
+    curricula_by_id = {}
+    curricula_by_key = {}
+    for curriculum in SubjectCurriculum.objects.all():
+        curriculum.school_level = levels_by_id[curriculum.school_level_id]
+        curriculum.subject = subjects_by_id[curriculum.subject_id]
+        curriculum.term = terms_by_id[curriculum.term_id]
+        curricula_by_id[curriculum.id] = curriculum
+        key = (curriculum.school_level_id, curriculum.subject_id, curriculum.term_id, curriculum.version)
+        curricula_by_key[key] = curriculum
+
+    legacy_mappings = list(LegacyExamMapping.objects.order_by('id'))
+    for mapping in legacy_mappings:
+        mapping.school_level = levels_by_id[mapping.school_level_id]
+        mapping.subject = subjects_by_id[mapping.subject_id]
+        mapping.curriculum = curricula_by_id.get(mapping.curriculum_id)
+
+    availability = _availability(levels, terms, subjects_by_level, curricula_by_key)
+    availability_version, availability_json = _availability_document(levels, terms, subjects, availability)
+
+    return ReferenceData(
+        version=version,
+        levels=levels,
+        terms=terms,
+        subjects=subjects,
+        levels_by_id=MappingProxyType(levels_by_id),
+        levels_by_name=MappingProxyType({level.name: level for level in levels}),
+        terms_by_id=MappingProxyType(terms_by_id),
+        subjects_by_id=MappingProxyType(subjects_by_id),
+        subjects_by_level=MappingProxyType(subjects_by_level),
+        subject_ids_by_level=MappingProxyType({
+            level_id: frozenset(subject_ids) for level_id, subject_ids in subject_ids_by_level.items()
+        }),
+        weeks_by_term=MappingProxyType({term_id: tuple(weeks) for term_id, weeks in weeks_by_term.items()}),
+        curricula_by_id=MappingProxyType(curricula_by_id),
+        curricula_by_key=MappingProxyType(curricula_by_key),
+        availability=MappingProxyType(availability),
+        availability_version=availability_version,
+        availability_json=availability_json,
+        legacy_aliases=LegacyAliasIndex(legacy_mappings),
+    )
+
+
+class _Commit:
+    """on_commit callback recording that a transaction committed"""
+    done = False
+
+    def __call__(self):
+        self.done = True
+
+
+def _is_settled():
+    """
+    Whether the snapshot can be trusted outside the transaction it was built
+    in. A snapshot built inside a transaction may include that transaction's
+    uncommitted writes: it is trusted on the same connection while the
+    transaction is open and everywhere once it commits, and dropped if the
+    transaction rolls back (which discards its on_commit callbacks).
+    """
+    pending = _state['pending']
+    if pending is None:
+        return True
+    connection, committed = pending
+    if committed.done:
+        _state['pending'] = None
+        return True
+    return connection is transaction.get_connection() and any(
+        func is committed for _, func, _ in connection.run_on_commit
+    )
+
+
+def get_reference_data():
+    """
+    This process's reference data snapshot, rebuilt if it is missing or
+    another process has changed the data since it was built.
+    """
+    snapshot = _state['snapshot']
+    now = time.monotonic()
+    interval = getattr(settings, 'AKILI_REFERENCE_DATA_CHECK_SECONDS', 5)
+    if snapshot is not None and now - _state['checked_at'] < interval and _is_settled():
+        return snapshot
+
+    with _lock:
+        version = get_reference_version()
+        snapshot = _state['snapshot']
+        if snapshot is None or snapshot.version != version or not _is_settled():
+            snapshot = build_reference_data(version)
+            _state['snapshot'] = snapshot
+            _state['pending'] = None
+            connection = transaction.get_connection()
+            if connection.in_atomic_block:
+                committed = _Commit()
+                transaction.on_commit(committed)
+                _state['pending'] = (connection, committed)
+        _state['checked_at'] = now
+    return snapshot
+
+
+def clear_local_reference_data():
+    """Drop this process's snapshot so the next lookup rebuilds it"""
+    with _lock:
+        _state['snapshot'] = None
+
+
+def invalidate_reference_data():
+    """Drop the snapshot here and mark it stale in every other process"""
+    clear_local_reference_data()
+    bump_reference_version()
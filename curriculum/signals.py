@@ -0,0 +1,67 @@
+"""
+Signal handlers that keep the reference data snapshot and the per-curriculum
+topic counts fresh.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import LegacyExamMapping, SchoolLevel, Subject, SubjectCurriculum, Term, Topic, Week
+from .reference import invalidate_reference_data
+
+REFERENCE_MODELS = (LegacyExamMapping, SchoolLevel, Subject, SubjectCurriculum, Term, Week)
+
+
+def reference_data_changed(sender, **kwargs):
+    invalidate_reference_data()
+    if transaction.get_connection().in_atomic_block:
+        # A rebuild before commit may have seen rows that are later rolled back
+        transaction.on_commit(invalidate_reference_data)
+
+
+for model in REFERENCE_MODELS:
+    post_save.connect(reference_data_changed, sender=model, dispatch_uid=f'reference_data_saved_{model.__name__}')
+    post_delete.connect(reference_data_changed, sender=model, dispatch_uid=f'reference_data_deleted_{model.__name__}')
+
+
+def subject_levels_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        reference_data_changed(sender)
+
+
+m2m_changed.connect(subject_levels_changed, sender=Subject.school_levels.through, dispatch_uid='reference_data_subject_levels')
+
+
+def _refresh_topic_counts(curriculum_ids, topic=None):
+    if SubjectCurriculum.refresh_topic_counts(curriculum_ids):
+        # Snapshot curricula carry their topic counts
+        reference_data_changed(SubjectCurriculum)
+        # So does the curriculum instance the topic was saved with
+        if topic is not None and Topic.curriculum.is_cached(topic):
+            topic.curriculum.refresh_from_db(fields=['topic_counts'])
+
+
+@receiver(pre_save, sender=Topic)
+def topic_about_to_save(sender, instance, raw=False, **kwargs):
+    instance._previous_curriculum_id = None
+    if instance.pk and not raw:
+        instance._previous_curriculum_id = Topic.objects.filter(pk=instance.pk).values_list(
+            'curriculum_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Topic)
+def topic_saved(sender, instance, **kwargs):
+    _refresh_topic_counts({instance.curriculum_id, instance._previous_curriculum_id} - {None}, instance)
+
+
+@receiver(post_delete, sender=Topic)
+def topic_deleted(sender, instance, **kwargs):
+    _refresh_topic_counts([instance.curriculum_id], instance)
+
+
+@receiver(post_save, sender=Week)
+def week_saved(sender, instance, created, **kwargs):
+    if not created:
+        # A renumbered week moves its topics within every curriculum using it
+        _refresh_topic_counts(set(instance.topics.values_list('curriculum_id', flat=True)))
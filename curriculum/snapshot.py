@@ -0,0 +1,155 @@
+"""
+Bulk loading of curriculum reference data, and a compact versioned snapshot
+format for restoring it.
+
+A snapshot is gzipped JSON holding, per table, the column names once and the
+rows as lists, with primary keys kept so foreign keys line up:
+
+    {"format": 1, "curriculum_version": "2025", "created_at": "...",
+     "tables": {"curriculum.topic": {"fields": ["id", ...], "rows": [[...], ...]}, ...}}
+
+Tables are restored with batched bulk_create, one transaction per table, so
+a fresh database is seeded in seconds instead of row by row.
+"""
+import gzip
+import json
+from pathlib import Path
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_PATH = Path(__file__).resolve().parent / 'fixtures' / 'curriculum_snapshot.json.gz'
+BATCH_SIZE = 1000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_models():
+    """Reference data models in dependency order"""
+    from .models import (
+        AcademicSession, LegacyExamMapping, SchoolLevel, Subject,
+        SubjectCurriculum, Term, Topic, Week
+    )
+    return [
+        AcademicSession, SchoolLevel, Term, Week, Subject, Subject.school_levels.through,
+        SubjectCurriculum, Topic, LegacyExamMapping,
+    ]
+
+
+def bulk_insert(model, objects, batch_size=BATCH_SIZE):
+    """
+    Insert objects in batches inside one transaction, skipping rows that
+    clash with existing unique values.
+
+    Returns:
+        Number of rows actually added
+    """
+    with transaction.atomic():
+        before = model.objects.count()
+        model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+        return model.objects.count() - before
+
+
+def reset_sequences(models):
+    """Move primary key sequences past explicitly inserted ids (a no-op on SQLite)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def finish_bulk_load():
+    """
+    bulk_create sends no signals, so bring derived data up to date: topic
+    counts and every process's reference data snapshot.
+    """
+    from .models import SubjectCurriculum
+    from .reference import invalidate_reference_data
+
+    SubjectCurriculum.refresh_topic_counts()
+    invalidate_reference_data()
+
+
+def _fields(model):
+    return {field.attname: field for field in model._meta.concrete_fields}
+
+
+def export_snapshot(path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Write the current reference data to a snapshot file.
+
+    Returns:
+        Dict of table label to row count
+    """
+    from .reference import CURRICULUM_VERSION
+
+    tables = {}
+    for model in snapshot_models():
+        names = list(_fields(model))
+        rows = model.objects.order_by('pk').values_list(*names)
+        tables[model._meta.label_lower] = {'fields': names, 'rows': [list(row) for row in rows]}
+
+    document = {
+        'format': SNAPSHOT_FORMAT,
+        'curriculum_version': CURRICULUM_VERSION,
+        'created_at': timezone.now(),
+        'tables': tables,
+    }
+    data = json.dumps(document, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    with gzip.open(path, 'wb', compresslevel=9) as f:
+        f.write(data)
+    return {label: len(table['rows']) for label, table in tables.items()}
+
+
+def read_snapshot(path=DEFAULT_SNAPSHOT_PATH):
+    """Load and check a snapshot file"""
+    try:
+        with gzip.open(path, 'rb') as f:
+            document = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f'Could not read snapshot {path}: {e}')
+
+    if document.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError(
+            f"Snapshot {path} has format {document.get('format')}, this version reads format {SNAPSHOT_FORMAT}"
+        )
+    return document
+
+
+def restore_snapshot(path=DEFAULT_SNAPSHOT_PATH, batch_size=BATCH_SIZE):
+    """
+    Load a snapshot into the database. Rows whose primary key or unique
+    values already exist are left untouched, so restoring is idempotent.
+
+    Returns:
+        Dict of table label to number of rows added
+    """
+    document = read_snapshot(path)
+    models = snapshot_models()
+    added = {}
+    for model in models:
+        table = document['tables'].get(model._meta.label_lower)
+        if table is None:
+            raise SnapshotError(f'Snapshot {path} has no {model._meta.label_lower} table')
+
+        fields = _fields(model)
+        unknown = set(table['fields']) - set(fields)
+        if unknown:
+            raise SnapshotError(f"{model._meta.label_lower} has no field(s) {', '.join(sorted(unknown))}")
+
+        columns = [fields[name] for name in table['fields']]
+        objects = [
+            model(**{field.attname: field.to_python(value) for field, value in zip(columns, row)})
+            for row in table['rows']
+        ]
+        added[model._meta.label_lower] = bulk_insert(model, objects, batch_size)
+
+    reset_sequences(models)
+    finish_bulk_load()
+    return added
@@ -1,10 +1,11 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from curriculum.models import (
     AcademicSession, SchoolLevel, Subject, Term, Week,
     SubjectCurriculum, Topic, StudentProgramme, SubjectEnrolment
 )
 from core.services.curriculum import CurriculumService
+from curriculum.reference import bump_reference_version, clear_local_reference_data
 from datetime import date
 
 
@@ -90,8 +91,8 @@ class CurriculumServiceTestCase(TestCase):
     
     def test_get_school_levels(self):
         levels = CurriculumService.get_school_levels()
-        self.assertEqual(levels.count(), 2)
-        self.assertEqual(levels.first().name, 'JS1')
+        self.assertEqual(len(levels), 2)
+        self.assertEqual(levels[0].name, 'JS1')
     
     def test_get_school_level_by_name(self):
         level = CurriculumService.get_school_level_by_name('JS1')
@@ -108,20 +109,20 @@ class CurriculumServiceTestCase(TestCase):
     
     def test_get_subjects_for_level(self):
         subjects = CurriculumService.get_subjects_for_level(self.js1)
-        self.assertEqual(subjects.count(), 2)
+        self.assertEqual(len(subjects), 2)
         self.assertIn(self.math, subjects)
     
     def test_get_subjects_for_level_by_id(self):
         subjects = CurriculumService.get_subjects_for_level_by_id(self.js1.id)
-        self.assertEqual(subjects.count(), 2)
+        self.assertEqual(len(subjects), 2)
         
         empty = CurriculumService.get_subjects_for_level_by_id(99999)
-        self.assertEqual(empty.count(), 0)
+        self.assertEqual(len(empty), 0)
     
     def test_get_terms(self):
         terms = CurriculumService.get_terms()
-        self.assertEqual(terms.count(), 1)
-        self.assertEqual(terms.first().name, 'First Term')
+        self.assertEqual(len(terms), 1)
+        self.assertEqual(terms[0].name, 'First Term')
     
     def test_get_curriculum(self):
         curriculum = CurriculumService.get_curriculum(
@@ -142,7 +143,7 @@ class CurriculumServiceTestCase(TestCase):
     
     def test_get_weeks_for_term(self):
         weeks = CurriculumService.get_weeks_for_term(self.first_term)
-        self.assertEqual(weeks.count(), 14)
+        self.assertEqual(len(weeks), 14)
     
     def test_get_active_session(self):
         session = CurriculumService.get_active_session()
@@ -198,3 +199,112 @@ class CurriculumServiceTestCase(TestCase):
         week3 = Week.objects.get(term=self.first_term, week_number=3)
         previous = CurriculumService.get_previous_topics(self.curriculum, week3, limit=5)
         self.assertEqual(len(previous), 2)
+
+
+@override_settings(AKILI_REFERENCE_DATA_CHECK_SECONDS=60)
+class ReferenceDataSnapshotTestCase(TestCase):
+    """The in-process reference data snapshot behind CurriculumService lookups"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.js1 = SchoolLevel.objects.create(name='JS1', level_order=1, level_type='JUNIOR')
+        cls.math = Subject.objects.create(name='Mathematics', code='MTH')
+        cls.math.school_levels.add(cls.js1)
+        cls.term = Term.objects.create(name='First Term', order=1)
+        Week.objects.create(term=cls.term, week_number=1)
+        cls.curriculum = SubjectCurriculum.objects.create(
+            school_level=cls.js1, subject=cls.math, term=cls.term, version='2025'
+        )
+    
+    def setUp(self):
+        clear_local_reference_data()
+    
+    def test_lookups_do_not_query_once_loaded(self):
+        CurriculumService.get_school_levels()
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(CurriculumService.get_school_level_by_id(self.js1.id), self.js1)
+            self.assertEqual(CurriculumService.get_term_by_id(self.term.id), self.term)
+            self.assertEqual(CurriculumService.get_subject_by_id(self.math.id), self.math)
+            self.assertTrue(CurriculumService.is_subject_offered(self.js1.id, self.math.id))
+            curriculum = CurriculumService.get_curriculum(self.js1, self.math, self.term)
+            self.assertEqual(curriculum, self.curriculum)
+            self.assertEqual(curriculum.subject.name, 'Mathematics')
+            self.assertEqual(CurriculumService.get_weeks_for_term(self.term)[0].term, self.term)
+    
+    def test_saving_reference_data_rebuilds_snapshot(self):
+        self.assertEqual(len(CurriculumService.get_school_levels()), 1)
+        
+        SchoolLevel.objects.create(name='JS2', level_order=2, level_type='JUNIOR')
+        self.assertEqual([level.name for level in CurriculumService.get_school_levels()], ['JS1', 'JS2'])
+        
+        self.math.school_levels.clear()
+        self.assertFalse(CurriculumService.is_subject_offered(self.js1.id, self.math.id))
+        
+        self.curriculum.delete()
+        self.assertIsNone(CurriculumService.get_curriculum(self.js1, self.math, self.term))
+    
+    def test_version_bump_from_another_process_is_picked_up(self):
+        CurriculumService.get_school_levels()
+        # Simulate another process writing directly: no signal fires here
+        SchoolLevel.objects.filter(pk=self.js1.pk).update(name='JSS1')
+        self.assertEqual(CurriculumService.get_school_levels()[0].name, 'JS1')
+        
+        bump_reference_version()
+        with override_settings(AKILI_REFERENCE_DATA_CHECK_SECONDS=0):
+            self.assertEqual(CurriculumService.get_school_levels()[0].name, 'JSS1')
+
+
+class TopicCountsTestCase(TestCase):
+    """Denormalised per-curriculum topic counts behind progress calculations"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='counts@example.com', password='testpass123')
+        cls.js1 = SchoolLevel.objects.create(name='JS1', level_order=1, level_type='JUNIOR')
+        cls.math = Subject.objects.create(name='Mathematics', code='MTH')
+        cls.term = Term.objects.create(name='First Term', order=1)
+        cls.weeks = {n: Week.objects.create(term=cls.term, week_number=n) for n in range(1, 7)}
+        cls.curriculum = SubjectCurriculum.objects.create(
+            school_level=cls.js1, subject=cls.math, term=cls.term, version='2025'
+        )
+        for week_number, order, title in [(1, 1, 'Numbers'), (1, 2, 'Place Value'), (2, 1, 'Fractions'), (4, 1, 'Ratios')]:
+            Topic.objects.create(curriculum=cls.curriculum, week=cls.weeks[week_number], title=title, order=order)
+    
+    def _enrolment(self, week_number):
+        curriculum = SubjectCurriculum.objects.get(pk=self.curriculum.pk)
+        return SubjectEnrolment(curriculum=curriculum, current_week=self.weeks[week_number])
+    
+    def test_counts_follow_topic_changes(self):
+        self.assertEqual(self.curriculum.topic_counts, [0, 2, 3, 3, 4])
+        
+        topic = Topic.objects.create(curriculum=self.curriculum, week=self.weeks[6], title='Angles', order=1)
+        self.assertEqual(self.curriculum.topic_counts, [0, 2, 3, 3, 4, 4, 5])
+        
+        topic.delete()
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.topic_counts, [0, 2, 3, 3, 4])
+    
+    def test_progress_and_weeks_remaining_use_counts(self):
+        enrolment = self._enrolment(3)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(CurriculumService.calculate_progress(enrolment), 75.0)
+            self.assertEqual(CurriculumService.calculate_weeks_remaining(enrolment), 2)
+        self.assertEqual(CurriculumService.calculate_progress(self._enrolment(1)), 0.0)
+        self.assertEqual(CurriculumService.calculate_progress(self._enrolment(6)), 100.0)
+        self.assertEqual(CurriculumService.calculate_weeks_remaining(self._enrolment(6)), 0)
+    
+    def test_previous_topics_newest_first(self):
+        previous = CurriculumService.get_previous_topics(self.curriculum, self.weeks[3], limit=2)
+        self.assertEqual([topic.title for topic in previous], ['Fractions', 'Place Value'])
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(CurriculumService.get_previous_topics(self.curriculum, self.weeks[1]), [])
+    
+    def test_refresh_repairs_drift(self):
+        SubjectCurriculum.objects.filter(pk=self.curriculum.pk).update(topic_counts=[])
+        
+        self.assertEqual(SubjectCurriculum.refresh_topic_counts(), 1)
+        self.curriculum.refresh_from_db()
+        self.assertEqual(self.curriculum.topic_counts, [0, 2, 3, 3, 4])
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.services.curriculum import CurriculumService
+from courses.models import Course
+from curriculum.aliases import edit_distance, normalise_subject_name
+from curriculum.models import LegacyExamMapping, SchoolLevel, Subject, SubjectCurriculum, Term
+
+
+class LegacyAliasTestCase(TestCase):
+    """Matching legacy exam subject names and migrating legacy courses"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.ss3 = SchoolLevel.objects.create(name='SS3', level_order=6, level_type='SENIOR')
+        cls.term = Term.objects.create(name='First Term', order=1, total_weeks=14, instructional_weeks=12, exam_weeks=2)
+        
+        cls.subjects = {}
+        for code, name in [('MTH', 'Mathematics'), ('LIT', 'Literature in English'), ('CRS', 'CRS'), ('IRS', 'IRS'), ('ENG', 'English')]:
+            cls.subjects[code] = Subject.objects.create(name=name, code=code)
+        cls.maths_curriculum = SubjectCurriculum.objects.create(
+            school_level=cls.ss3, subject=cls.subjects['MTH'], term=cls.term
+        )
+        
+        for subject_name, code in [
+            ('Mathematics', 'MTH'), ('Maths', 'MTH'), ('Lit-in-English', 'LIT'), ('CRK', 'CRS'), ('IRK', 'IRS'),
+            ('English Language', 'ENG'), ('English Studies', 'ENG'), ('Physical & Health Education', 'ENG'),
+        ]:
+            LegacyExamMapping.objects.create(
+                exam_type='JAMB', subject_name=subject_name, school_level=cls.ss3, subject=cls.subjects[code],
+                curriculum=cls.maths_curriculum if code == 'MTH' else None
+            )
+        cls.user = get_user_model().objects.create_user(email='legacy@example.com', password='testpass123')
+    
+    def lookup(self, name, fuzzy=False):
+        mapping = CurriculumService.get_legacy_mapping('JAMB', name, fuzzy=fuzzy)
+        return mapping.subject.code if mapping else None
+    
+    def test_normalise_and_edit_distance(self):
+        self.assertEqual(normalise_subject_name('  Lit-in-English '), 'lit in english')
+        self.assertEqual(normalise_subject_name('Physical&Health  Education'), 'physical and health education')
+        self.assertEqual(edit_distance('mathematic', 'mathematics', 2), 1)
+        self.assertEqual(edit_distance('maths', 'mathematics', 2), 3)
+    
+    def test_exact_lookup_folds_case_and_punctuation(self):
+        self.assertEqual(self.lookup('Maths '), 'MTH')
+        self.assertEqual(self.lookup('lit in english'), 'LIT')
+        self.assertEqual(self.lookup('Physical and Health Education'), 'ENG')
+        self.assertIsNone(self.lookup('Mathematic'))
+        self.assertIsNone(CurriculumService.get_legacy_mapping('SSCE', 'Maths'))
+    
+    def test_fuzzy_lookup_is_bounded_and_unambiguous(self):
+        self.assertEqual(self.lookup('Mathematic', fuzzy=True), 'MTH')
+        self.assertEqual(self.lookup('Englsh Language', fuzzy=True), 'ENG')
+        self.assertEqual(self.lookup('English Lang', fuzzy=True), 'ENG')
+        # Short names get no edits: CRK must not turn into IRK
+        self.assertIsNone(self.lookup('ERK', fuzzy=True))
+        self.assertIsNone(self.lookup('Chemistry', fuzzy=True))
+    
+    def test_mapping_changes_refresh_the_index(self):
+        self.assertIsNone(self.lookup('Further Maths'))
+        LegacyExamMapping.objects.create(
+            exam_type='JAMB', subject_name='Further Maths', school_level=self.ss3, subject=self.subjects['MTH']
+        )
+        self.assertEqual(self.lookup('further  maths'), 'MTH')
+    
+    def test_migrate_legacy_courses_in_chunks(self):
+        names = ['Maths', 'Mathematic', 'Lit in English', 'Chemistry', 'maths']
+        courses = [Course.objects.create(user=self.user, exam_type='JAMB', subject=name) for name in names]
+        
+        CurriculumService.get_school_levels()
+        with self.assertNumQueries(14):
+            # A count, three chunks of a read plus one UPDATE per target in a savepoint, and a final empty read
+            call_command('migrate_legacy_courses', chunk_size=2, exact=True, stdout=StringIO())
+        
+        migrated = {course.subject: course for course in Course.objects.filter(school_level=self.ss3)}
+        self.assertEqual(set(migrated), {'Maths', 'Lit in English', 'maths'})
+        self.assertEqual(migrated['Maths'].term, self.term)
+        self.assertEqual(migrated['Maths'].curriculum, self.maths_curriculum)
+        
+        out = StringIO()
+        call_command('migrate_legacy_courses', stdout=out)
+        self.assertIn("No mapping for JAMB 'Chemistry' (1 course)", out.getvalue())
+        self.assertIn('1 migrated, 1 skipped', out.getvalue())
+        courses[1].refresh_from_db()
+        self.assertEqual(courses[1].school_level, self.ss3)
+    
+    def test_dry_run_changes_nothing(self):
+        Course.objects.create(user=self.user, exam_type='JAMB', subject='Maths')
+        
+        call_command('migrate_legacy_courses', dry_run=True, stdout=StringIO())
+        self.assertFalse(Course.objects.filter(school_level__isnull=False).exists())
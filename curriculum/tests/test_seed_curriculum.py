@@ -0,0 +1,65 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.services.curriculum import CurriculumService
+from curriculum.models import LegacyExamMapping, SchoolLevel, Subject, SubjectCurriculum, Topic
+from curriculum.snapshot import export_snapshot
+
+
+class SeedCurriculumTestCase(TestCase):
+    """Bulk seeding and snapshot restore of curriculum reference data"""
+    
+    def setUp(self):
+        handle, self.snapshot_path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, self.snapshot_path)
+    
+    def _counts(self):
+        return (
+            SchoolLevel.objects.count(),
+            Subject.school_levels.through.objects.count(),
+            SubjectCurriculum.objects.count(),
+            Topic.objects.count(),
+            LegacyExamMapping.objects.count(),
+        )
+    
+    def test_seed_is_idempotent_and_fills_derived_data(self):
+        call_command('seed_curriculum', stdout=StringIO())
+        counts = self._counts()
+        self.assertEqual(counts[2], 360)
+        
+        call_command('seed_curriculum', stdout=StringIO())
+        self.assertEqual(self._counts(), counts)
+        
+        curriculum = SubjectCurriculum.objects.first()
+        self.assertEqual(curriculum.total_topics, curriculum.topics.count())
+        self.assertEqual(len(CurriculumService.get_school_levels()), 6)
+    
+    def test_restore_from_snapshot(self):
+        call_command('seed_curriculum', stdout=StringIO())
+        counts = self._counts()
+        export_snapshot(self.snapshot_path)
+        
+        for model in (LegacyExamMapping, Topic, SubjectCurriculum, Subject, SchoolLevel):
+            model.objects.all().delete()
+        self.assertEqual(len(CurriculumService.get_school_levels()), 0)
+        
+        call_command('seed_curriculum', from_snapshot=self.snapshot_path, stdout=StringIO())
+        self.assertEqual(self._counts(), counts)
+        self.assertEqual(len(CurriculumService.get_school_levels()), 6)
+        curriculum = SubjectCurriculum.objects.first()
+        self.assertEqual(curriculum.total_topics, curriculum.topics.count())
+    
+    def test_restore_rejects_unknown_format(self):
+        with gzip.open(self.snapshot_path, 'wb') as f:
+            f.write(json.dumps({'format': 99, 'tables': {}}).encode())
+        
+        with self.assertRaisesMessage(CommandError, 'format 99'):
+            call_command('seed_curriculum', from_snapshot=self.snapshot_path, stdout=StringIO())
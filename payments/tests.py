@@ -1,8 +1,12 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from payments.models import Payment
+from users.models import CreditLedgerEntry
 from decimal import Decimal
+import hashlib
+import hmac
+import json
 
 
 class PaymentModelTestCase(TestCase):
@@ -138,3 +142,33 @@ class PaymentIntegrationTestCase(TestCase):
         
         self.user.add_credits(50)
         self.assertEqual(self.user.tutor_credits, initial_credits + 50)
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_webhook')
+class PaystackWebhookTestCase(TestCase):
+    """Tests for crediting payments from the Paystack webhook"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='webhook@example.com', password='testpass123')
+        Payment.objects.create(user=cls.user, reference='PAY_HOOK', amount=Decimal('1000.00'))
+    
+    def post_event(self):
+        payload = json.dumps({'event': 'charge.success', 'data': {'reference': 'PAY_HOOK', 'amount': 100000}}).encode()
+        signature = hmac.new(b'sk_test_webhook', payload, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('payments:paystack_webhook'), payload,
+            content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature
+        )
+    
+    def test_repeated_event_credits_once(self):
+        initial_credits = self.user.tutor_credits
+        
+        self.assertEqual(self.post_event().status_code, 200)
+        self.assertEqual(self.post_event().status_code, 200)
+        
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tutor_credits, initial_credits + 120)
+        self.assertTrue(Payment.objects.get(reference='PAY_HOOK').verified)
+        entry = CreditLedgerEntry.objects.get(user=self.user)
+        self.assertEqual((entry.reason, entry.amount, entry.reference), ('purchase', 120, 'PAY_HOOK'))
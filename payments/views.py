@@ -15,6 +15,42 @@ from .models import Payment
 
 logger = logging.getLogger(__name__)
 
+
+def _credits_for_amount(amount_kobo):
+    """Credits bought for an amount in kobo: a package tier, else 1 credit per ₦10"""
+    # Credit tiers from settings (in kobo to avoid float precision issues)
+    CREDIT_TIERS_KOBO = getattr(settings, 'AKILI_CREDIT_TIERS', {
+        200000: 300,  # Premium: ₦2,000 = 300 credits
+        100000: 120,  # Standard: ₦1,000 = 120 credits
+        50000: 50,    # Starter: ₦500 = 50 credits
+    })
+    
+    # Find exact match first, then fallback for custom amounts (1000 kobo = 1 credit)
+    credits_to_add = CREDIT_TIERS_KOBO.get(amount_kobo)
+    if credits_to_add is None:
+        credits_to_add = amount_kobo // 1000
+    return credits_to_add
+
+
+def _apply_payment(payment, amount_kobo):
+    """
+    Mark a payment verified and credit its user, exactly once.
+    
+    The verified flag is claimed with a conditional UPDATE, so the browser
+    callback and the webhook racing on the same payment cannot both credit it.
+    
+    Returns:
+        Credits added, or None if the payment had already been processed
+    """
+    credits_to_add = None
+    with transaction.atomic():
+        if Payment.objects.filter(pk=payment.pk, verified=False).update(verified=True):
+            credits_to_add = _credits_for_amount(amount_kobo)
+            payment.user.add_credits(credits_to_add, reason='purchase', reference=payment.reference)
+    # Verified either way: by this call or by the one it raced with
+    payment.verified = True
+    return credits_to_add
+
 @login_required
 def initialize_payment(request):
     """
@@ -114,35 +150,13 @@ def verify_payment(request):
         # 2. Retrieve local record
         payment = Payment.objects.get(reference=reference)
         
-        # 3. Check status and prevent double-crediting
+        # 3. Check status, then mark verified and credit the user (at most once)
+        # Payment.amount stores Naira, convert to kobo integer for precision
+        credits_to_add = None
         if data.get("data", {}).get("status") == "success" and not payment.verified:
-            # FIXED: Use atomic transaction to ensure payment and credit update happen together
-            with transaction.atomic():
-                payment.verified = True
-                payment.save()
-                
-                # 4. Calculate Credits - FIXED: Use kobo (integer) for precision
-                # Payment.amount stores Naira as float, convert to kobo integer
-                amount_kobo = round(payment.amount * 100)
-                
-                # Credit tiers from settings (in kobo to avoid float precision issues)
-                CREDIT_TIERS_KOBO = getattr(settings, 'AKILI_CREDIT_TIERS', {
-                    200000: 300,  # Premium: ₦2,000 = 300 credits
-                    100000: 120,  # Standard: ₦1,000 = 120 credits
-                    50000: 50,    # Starter: ₦500 = 50 credits
-                })
-                
-                # Find exact match first, then fallback to range-based
-                credits_to_add = CREDIT_TIERS_KOBO.get(amount_kobo)
-                if credits_to_add is None:
-                    # Fallback for custom amounts (1000 kobo = 1 credit)
-                    credits_to_add = amount_kobo // 1000
-                
-                # 5. Update User Balance
-                user = payment.user
-                user.tutor_credits += credits_to_add
-                user.save()
-            
+            credits_to_add = _apply_payment(payment, round(payment.amount * 100))
+        
+        if credits_to_add is not None:
             messages.success(request, f"Payment verified successfully! {credits_to_add} credits added to your account.")
             
         elif payment.verified:
@@ -203,29 +217,11 @@ def paystack_webhook(request):
             reference = data.get('reference')
             if reference:
                 try:
-                    payment = Payment.objects.get(reference=reference)
+                    payment = Payment.objects.select_related('user').get(reference=reference)
                     if not payment.verified:
-                        with transaction.atomic():
-                            payment.verified = True
-                            payment.save()
-                            
-                            amount_kobo = data.get('amount', 0)
-                            
-                            CREDIT_TIERS_KOBO = getattr(settings, 'AKILI_CREDIT_TIERS', {
-                                200000: 300,
-                                100000: 120,
-                                50000: 50,
-                            })
-                            
-                            credits_to_add = CREDIT_TIERS_KOBO.get(amount_kobo)
-                            if credits_to_add is None:
-                                credits_to_add = amount_kobo // 1000
-                            
-                            user = payment.user
-                            user.tutor_credits += credits_to_add
-                            user.save()
-                            
-                            logger.info(f"Webhook: Added {credits_to_add} credits to user {user.id} for payment {reference}")
+                        credits_to_add = _apply_payment(payment, data.get('amount', 0))
+                        if credits_to_add is not None:
+                            logger.info(f"Webhook: Added {credits_to_add} credits to user {payment.user_id} for payment {reference}")
                 except Payment.DoesNotExist:
                     logger.warning(f"Webhook: Payment not found for reference {reference}")
         
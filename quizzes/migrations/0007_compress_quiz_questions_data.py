@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:00
+
+import core.fields
+from django.db import migrations, models
+
+from core.fields import compress_existing_rows, set_external_storage
+
+
+def compress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'quizzes', 'QuizAttempt', 'questions_data', 'questions_data_compressed')
+
+
+def decompress_rows(apps, schema_editor):
+    compress_existing_rows(apps, 'quizzes', 'QuizAttempt', 'questions_data_compressed', 'questions_data')
+
+
+def use_external_storage(apps, schema_editor):
+    set_external_storage(schema_editor, 'quiz_attempts', 'questions_data')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_remove_quizattempt_quizzes_user_module_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='questions_data_compressed',
+            field=core.fields.CompressedJSONField(dictionary='questions', null=True),
+        ),
+        # Nullable so the column can be re-added empty when reversing
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='questions_data',
+            field=models.JSONField(default=list, null=True),
+        ),
+        migrations.RunPython(compress_rows, decompress_rows),
+        migrations.RemoveField(
+            model_name='quizattempt',
+            name='questions_data',
+        ),
+        migrations.RenameField(
+            model_name='quizattempt',
+            old_name='questions_data_compressed',
+            new_name='questions_data',
+        ),
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='questions_data',
+            field=core.fields.CompressedJSONField(default=list, dictionary='questions'),
+        ),
+        migrations.RunPython(use_external_storage, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.conf import settings
+from core.fields import CompressedJSONField
 from courses.models import Module
 
 class QuizAttempt(models.Model):
@@ -20,7 +21,7 @@ class QuizAttempt(models.Model):
     )
     score = models.IntegerField(default=0)
     total_questions = models.IntegerField(default=10)
-    questions_data = models.JSONField(default=list)
+    questions_data = CompressedJSONField(default=list, dictionary='questions')
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_retake = models.BooleanField(default=False)
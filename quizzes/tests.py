@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -217,3 +218,45 @@ class QuizHistoryTestCase(TestCase):
         attempts = QuizAttempt.objects.filter(user=self.user)
         self.assertEqual(attempts.count(), 2)
         self.assertEqual(attempts.first().score, 8)
+
+
+class QuizGenerationTestCase(TestCase):
+    """Tests for tolerant quiz generation with top-up requests"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(email='quizgen@example.com', password='testpass123')
+        cls.course = Course.objects.create(user=cls.user, subject='Biology', exam_type='WAEC')
+        cls.module = Module.objects.create(course=cls.course, title='Cells', order=1, syllabus_topic='Cells')
+    
+    @patch('quizzes.utils.call_ai_with_fallback')
+    def test_malformed_question_is_topped_up(self, mock_ai):
+        from quizzes.utils import generate_quiz_and_save
+        
+        good = '{"question_text": "Q%d", "choices": ["a", "b", "c", "d"], "correct_index": "B",}'
+        mock_ai.side_effect = [
+            {'success': True, 'tier': 'Groq', 'content': '{"questions": [%s, %s, {"question_text": "bad"}]}' % (good % 1, good % 2)},
+            {'success': True, 'tier': 'Groq', 'content': '{"questions": [%s]}' % (good % 3)},
+        ]
+        
+        success, attempt_id = generate_quiz_and_save(self.module, self.user, num_questions=3)
+        
+        self.assertTrue(success)
+        attempt = QuizAttempt.objects.get(pk=attempt_id)
+        self.assertEqual([q['question_text'] for q in attempt.questions_data], ['Q1', 'Q2', 'Q3'])
+        self.assertTrue(all(q['correct_index'] == 1 for q in attempt.questions_data))
+        self.assertIn('EXACTLY 1 multiple-choice', mock_ai.call_args_list[1].args[0])
+        self.assertIn('- Q2', mock_ai.call_args_list[1].args[0])
+    
+    @patch('quizzes.utils.call_ai_with_fallback')
+    def test_unavailable_ai_fails_once(self, mock_ai):
+        from quizzes.utils import generate_quiz_and_save
+        
+        mock_ai.return_value = {'success': False, 'tier': 'Circuit Breaker', 'content': 'busy'}
+        
+        success, message = generate_quiz_and_save(self.module, self.user)
+        
+        self.assertFalse(success)
+        self.assertIn('unavailable', message)
+        self.assertEqual(mock_ai.call_count, 1)
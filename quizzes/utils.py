@@ -1,7 +1,7 @@
 from django.db import transaction
-import json
 import logging
 from core.utils.ai_fallback import call_ai_with_fallback 
+from core.utils.structured_output import QUIZ_QUESTION_SCHEMA, collect_items
 from users.models import CustomUser 
 from courses.models import Module, Course
 from .models import QuizAttempt
@@ -20,7 +20,8 @@ def generate_quiz_and_save(module: Module, user: CustomUser, num_questions=5) ->
         context_info = f"{course.exam_type} curriculum"
         curriculum_ref = f"{course.exam_type} curriculum"
 
-    prompt = f"""You are an expert Nigerian education assessor. Generate a quiz of EXACTLY {num_questions} multiple-choice questions for "{course_subject}" ({context_info}), topic: "{module.title}".
+    def build_prompt(count, accepted):
+        prompt = f"""You are an expert Nigerian education assessor. Generate a quiz of EXACTLY {count} multiple-choice questions for "{course_subject}" ({context_info}), topic: "{module.title}".
 
 CRITICAL REQUIREMENTS - FOLLOW EXACTLY:
 
@@ -53,62 +54,33 @@ Example:
   ]
 }}
 
-Generate {num_questions} questions now with perfect JSON:"""
+Generate {count} questions now with perfect JSON:"""
+        if accepted:
+            asked = "\n".join(f"- {q['question_text']}" for q in accepted)
+            prompt += f"\n\nDo NOT repeat any of these existing questions:\n{asked}"
+        return prompt
 
-    result = call_ai_with_fallback(prompt, max_tokens=3000, is_json=True, subject=course_subject) 
+    failures = []
 
-    if not result['success']:
-        logger.error(f"AI Quiz Generation FAILED. Tier: {result.get('tier')}. Error: {result.get('content')[:100]}...")
-        return False, "AI service is unavailable or returned an unrecoverable error."
+    def request(count, accepted):
+        result = call_ai_with_fallback(build_prompt(count, accepted), max_tokens=3000, is_json=True, subject=course_subject)
+        if not result['success']:
+            logger.error(f"AI Quiz Generation FAILED. Tier: {result.get('tier')}. Error: {result.get('content')[:100]}...")
+            failures.append(result)
+            return None
+        logger.debug(f"AI Quiz Response (Tier: {result.get('tier')}): {result['content'][:500]}...")
+        return result['content']
 
-    response_text = result['content']
+    question_list = collect_items(request, QUIZ_QUESTION_SCHEMA, 'questions', num_questions)
 
-    logger.debug(f"AI Quiz Response (Tier: {result.get('tier')}): {response_text[:500]}...")
-
-    try:
-        cleaned_text = response_text.strip()
-
-        if cleaned_text.startswith('```'):
-            lines = cleaned_text.split('\n')
-            if len(lines) > 1:
-                cleaned_text = '\n'.join(lines[1:])
-            else:
-                cleaned_text = cleaned_text[3:]
-            
-            if cleaned_text.endswith('```'):
-                cleaned_text = cleaned_text.rsplit('```', 1)[0]
-            
-            cleaned_text = cleaned_text.strip()
-
-        parsed_data = json.loads(cleaned_text)
-
-        if not isinstance(parsed_data, dict):
-            if isinstance(parsed_data, list):
-                parsed_data = {"questions": parsed_data}
-            else:
-                raise ValueError(f"AI response is not a dictionary or list. Got: {type(parsed_data)}")
-
-        if 'questions' not in parsed_data:
-            raise ValueError("AI response missing 'questions' key.")
-
-        question_list = parsed_data['questions']
-
-        if not isinstance(question_list, list) or len(question_list) == 0:
-            raise ValueError("AI response 'questions' is empty or not a list.")
-
-        for i, q in enumerate(question_list):
-            if not isinstance(q, dict):
-                raise ValueError(f"Question {i} is not a dictionary.")
-            if 'question_text' not in q or 'choices' not in q or 'correct_index' not in q:
-                raise ValueError(f"Question {i} missing required fields.")
-
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON Parsing FAILED for Quiz generation: {e}. Response: {response_text[:500]}")
-        return False, "AI generated invalid JSON. Please try again."
-    except ValueError as e:
-        logger.error(f"JSON Validation FAILED: {e}. Response: {response_text[:500]}")
+    if not question_list:
+        if failures:
+            return False, "AI service is unavailable or returned an unrecoverable error."
         return False, "AI response format is invalid. Please try again."
 
+    if len(question_list) < num_questions:
+        logger.warning(f"Quiz for module {module.id} generated with {len(question_list)}/{num_questions} questions")
+
     with transaction.atomic():
 
         quiz_attempt = QuizAttempt.objects.create(
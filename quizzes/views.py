@@ -5,11 +5,13 @@ from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
 import logging
+from django.db import transaction
 from django.db.models import Sum
 
 from courses.models import Module
 from .utils import generate_quiz_and_save
 from .models import QuizAttempt
+from users.stats import adjust_user_stats
 
 logger = logging.getLogger(__name__)
 
@@ -112,7 +114,12 @@ def quiz_detail_view(request, quiz_id):
         # Set passed status based on 60% threshold
         quiz_attempt.passed = quiz_attempt.is_passing
 
-        quiz_attempt.save()
+        with transaction.atomic():
+            # A concurrent submission of the same attempt may have completed it first
+            if not QuizAttempt.objects.filter(pk=quiz_attempt.pk, completed_at__isnull=True).update(completed_at=quiz_attempt.completed_at):
+                return redirect('quizzes:quiz_detail', quiz_id=quiz_attempt.id)
+            quiz_attempt.save()
+            adjust_user_stats([request.user.pk], 'completed_quizzes', 1)
 
         # Update grades in the assessments system
         try:
@@ -1,6 +1,10 @@
 (function() {
   'use strict';
 
+  var script = document.currentScript;
+  var availabilityUrl = script && script.dataset.availabilityUrl;
+  var subjectsUrl = (script && script.dataset.subjectsUrl) || '/courses/api/subjects/';
+
   function initCourseForm() {
     var schoolLevelSelect = document.getElementById('id_school_level');
     var termSelect = document.getElementById('id_term');
@@ -16,6 +20,10 @@
     termSelect.classList.add('input-field');
     subjectSelect.classList.add('input-field');
 
+    // Level x term x subject availability, loaded once; null until it arrives
+    var matrix = null;
+    var matrixFailed = !availabilityUrl;
+
     function updateButtonState() {
       if (schoolLevelSelect.value && termSelect.value && subjectSelect.value) {
         createButton.disabled = false;
@@ -24,50 +32,95 @@
       }
     }
 
-    function fetchSubjects() {
-      var levelId = schoolLevelSelect.value;
-      
-      subjectSelect.innerHTML = '<option value="">Select a subject</option>';
-      createButton.disabled = true;
-
-      if (!levelId) {
-        return;
-      }
-
-      if (subjectLoading) {
+    function showStatus(text) {
+      if (!subjectLoading) return;
+      if (text) {
+        subjectLoading.textContent = text;
         subjectLoading.classList.remove('hidden');
-        subjectLoading.textContent = 'Loading subjects...';
+      } else {
+        subjectLoading.classList.add('hidden');
       }
+    }
+
+    function setSubjects(subjects, selected) {
+      subjectSelect.innerHTML = '<option value="">Select a subject</option>';
+      subjects.forEach(function(subject) {
+        var option = new Option(subject.name, subject.id);
+        option.selected = String(subject.id) === selected;
+        subjectSelect.add(option);
+      });
+    }
 
-      fetch('/courses/api/subjects/?school_level=' + levelId)
+    // Older path: one request per level change, used only if the matrix cannot load
+    function fetchSubjects(selected) {
+      var levelId = schoolLevelSelect.value;
+      showStatus('Loading subjects...');
+
+      fetch(subjectsUrl + '?school_level=' + levelId)
         .then(function(response) { return response.json(); })
         .then(function(data) {
-          data.subjects.forEach(function(subject) {
-            var option = new Option(subject.name, subject.id);
-            subjectSelect.add(option);
-          });
-          if (subjectLoading) {
-            subjectLoading.classList.add('hidden');
-          }
+          setSubjects(data.subjects, selected);
+          showStatus('');
           updateButtonState();
         })
         .catch(function(error) {
           console.error('Error fetching subjects:', error);
-          if (subjectLoading) {
-            subjectLoading.textContent = 'Failed to load subjects.';
-          }
+          showStatus('Failed to load subjects.');
         });
     }
 
-    schoolLevelSelect.addEventListener('change', fetchSubjects);
+    function updateSubjects(selected) {
+      var levelId = schoolLevelSelect.value;
+      var termId = termSelect.value;
 
-    termSelect.addEventListener('change', function() {
-      subjectSelect.innerHTML = '<option value="">Select a subject</option>';
+      setSubjects([], '');
       createButton.disabled = true;
-      fetchSubjects();
-    });
 
+      if (!levelId) {
+        showStatus('');
+        return;
+      }
+      if (matrixFailed) {
+        fetchSubjects(selected);
+        return;
+      }
+      if (!matrix) {
+        showStatus('Loading subjects...');
+        return;
+      }
+      if (!termId) {
+        showStatus('Select a term to see available subjects.');
+        return;
+      }
+
+      var offered = (matrix.availability[levelId] || {})[termId] || [];
+      setSubjects(offered.map(function(pair) {
+        return { id: pair[0], name: matrix.subjects[pair[0]] };
+      }), selected);
+      showStatus(offered.length ? '' : 'No subjects are available for this class level and term yet.');
+      updateButtonState();
+    }
+
+    schoolLevelSelect.addEventListener('change', function() { updateSubjects(''); });
+    termSelect.addEventListener('change', function() { updateSubjects(''); });
     subjectSelect.addEventListener('change', updateButtonState);
+
+    if (availabilityUrl) {
+      fetch(availabilityUrl, { credentials: 'same-origin' })
+        .then(function(response) {
+          if (!response.ok) throw new Error('Availability request failed (' + response.status + ')');
+          return response.json();
+        })
+        .then(function(data) { matrix = data; })
+        .catch(function(error) {
+          console.error('Error loading subject availability:', error);
+          matrixFailed = true;
+        })
+        .then(function() {
+          // Keep a subject chosen before a failed submit
+          if (schoolLevelSelect.value) updateSubjects(subjectSelect.value);
+        });
+    }
   }
 
   if (document.readyState === 'loading') {
@@ -0,0 +1,62 @@
+(function() {
+  'use strict';
+
+  // Keeps unread notification badges current from the server-sent event stream
+  // (assessments.notifications). Elements opt in with data attributes:
+  //   data-unread-count   text is replaced by the unread count
+  //   data-unread-show    hidden while there is nothing unread
+  //   data-unread-empty   hidden while there is something unread
+  //   data-unread-plural  hidden when the count is exactly one
+  // Each new notification is also dispatched on document as 'akili:notification'.
+
+  if (!('EventSource' in window)) return;
+  // Users saving data keep the counts rendered with each page
+  if (navigator.connection && navigator.connection.saveData) return;
+
+  var script = document.currentScript;
+  var streamUrl = script && script.dataset.stream;
+  if (!streamUrl) return;
+
+  var source = null;
+
+  function each(selector, callback) {
+    var elements = document.querySelectorAll(selector);
+    for (var i = 0; i < elements.length; i++) callback(elements[i]);
+  }
+
+  function render(count) {
+    each('[data-unread-count]', function(element) { element.textContent = count; });
+    each('[data-unread-show]', function(element) { element.hidden = count === 0; });
+    each('[data-unread-empty]', function(element) { element.hidden = count !== 0; });
+    each('[data-unread-plural]', function(element) { element.hidden = count === 1; });
+  }
+
+  function open() {
+    if (source) return;
+    source = new EventSource(streamUrl);
+    source.addEventListener('unread', function(event) {
+      render(JSON.parse(event.data).count);
+    });
+    source.addEventListener('notification', function(event) {
+      document.dispatchEvent(new CustomEvent('akili:notification', {detail: JSON.parse(event.data)}));
+    });
+  }
+
+  function close() {
+    if (!source) return;
+    source.close();
+    source = null;
+  }
+
+  // Background tabs give their stream back to the server; the badge catches up on return
+  document.addEventListener('visibilitychange', function() {
+    if (document.hidden) {
+      close();
+    } else {
+      open();
+    }
+  });
+  window.addEventListener('pagehide', close);
+
+  if (!document.hidden) open();
+})();
@@ -0,0 +1,111 @@
+(function() {
+  'use strict';
+
+  // Keep in sync with MANIFEST_CACHE in pwa/serviceworker.js
+  var MANIFEST_CACHE = 'akili-offline-manifests-v1';
+
+  if (!('serviceWorker' in navigator)) return;
+
+  var script = document.currentScript;
+  var serviceWorkerUrl = script && script.dataset.serviceWorker;
+  if (!serviceWorkerUrl) return;
+
+  function post(message) {
+    navigator.serviceWorker.ready.then(function(registration) {
+      registration.active.postMessage(message);
+    });
+  }
+
+  function absolute(url) {
+    return new URL(url, window.location.origin).href;
+  }
+
+  function setButtonState(button, state, detail) {
+    var label = button.querySelector('[data-offline-label]') || button;
+    var labels = {
+      idle: 'Download for offline',
+      working: 'Downloading...',
+      ready: 'Available offline',
+      failed: 'Download failed - retry'
+    };
+    label.textContent = labels[state] + (detail ? ' (' + detail + ')' : '');
+    button.dataset.offlineState = state;
+    button.disabled = state === 'working';
+  }
+
+  function findButton(manifestUrl) {
+    var buttons = document.querySelectorAll('[data-offline-manifest]');
+    for (var i = 0; i < buttons.length; i++) {
+      if (absolute(buttons[i].dataset.offlineManifest) === manifestUrl) return buttons[i];
+    }
+    return null;
+  }
+
+  function initDownloadButtons() {
+    var buttons = document.querySelectorAll('[data-offline-manifest]');
+    if (!buttons.length || !window.caches) return;
+
+    caches.open(MANIFEST_CACHE).then(function(cache) {
+      Array.prototype.forEach.call(buttons, function(button) {
+        var manifestUrl = absolute(button.dataset.offlineManifest);
+        button.classList.remove('hidden');
+        cache.match(manifestUrl).then(function(stored) {
+          setButtonState(button, stored ? 'ready' : 'idle');
+        });
+
+        button.addEventListener('click', function() {
+          if (button.dataset.offlineState === 'ready') {
+            if (window.confirm('Remove this course from offline storage?')) {
+              post({ type: 'REMOVE_COURSE', manifestUrl: manifestUrl });
+            }
+            return;
+          }
+          setButtonState(button, 'working');
+          post({ type: 'SYNC_COURSE', manifestUrl: manifestUrl });
+        });
+      });
+    });
+  }
+
+  function quizzes(count) {
+    return count + ' ' + (count === 1 ? 'quiz' : 'quizzes');
+  }
+
+  navigator.serviceWorker.addEventListener('message', function(event) {
+    var data = event.data || {};
+    var button = data.manifestUrl ? findButton(data.manifestUrl) : null;
+
+    if (data.type === 'COURSE_SYNCED' && button) {
+      setButtonState(button, 'ready');
+    } else if (data.type === 'COURSE_SYNC_FAILED' && button) {
+      setButtonState(button, 'failed');
+    } else if (data.type === 'COURSE_REMOVED' && button) {
+      setButtonState(button, 'idle');
+    } else if (data.type === 'QUIZ_ANSWERS_SUBMITTED') {
+      window.alert('You are back online: ' + quizzes(data.count) + ' answered offline have been submitted.');
+    } else if (data.type === 'QUIZ_ANSWERS_NEED_LOGIN') {
+      window.alert(quizzes(data.count) + ' answered offline could not be submitted yet. Log in again and they will be sent.');
+    } else if (data.type === 'QUIZ_ANSWERS_REJECTED') {
+      window.alert(quizzes(data.count) + ' answered offline could not be submitted: the quiz was already completed or is no longer available.');
+    }
+  });
+
+  // Replay queued quiz answers and refresh downloaded courses whenever we are online
+  function syncOfflineData() {
+    if (navigator.onLine) post({ type: 'SYNC_ALL' });
+  }
+
+  window.addEventListener('online', syncOfflineData);
+
+  window.addEventListener('load', function() {
+    navigator.serviceWorker.register(serviceWorkerUrl)
+      .then(function() { return navigator.serviceWorker.ready; })
+      .then(function() {
+        initDownloadButtons();
+        syncOfflineData();
+      })
+      .catch(function(err) {
+        console.log('Service worker registration failed', err);
+      });
+  });
+})();
@@ -0,0 +1,149 @@
+(function() {
+  'use strict';
+
+  var script = document.currentScript;
+  var searchUrl = (script && script.dataset.searchUrl) || '/courses/search/';
+  var MIN_LENGTH = 2;
+  var DELAY_MS = 150;
+
+  function initTutorSearch() {
+    var input = document.getElementById('topic-search');
+    var list = document.getElementById('topic-search-results');
+    var moduleSelect = document.getElementById('module_id');
+    var question = document.getElementById('question');
+
+    if (!input || !list) {
+      return;
+    }
+
+    var timer = null;
+    var latest = 0;
+    var results = [];
+    var active = -1;
+
+    function hide() {
+      list.classList.add('hidden');
+      list.innerHTML = '';
+      results = [];
+      active = -1;
+    }
+
+    function hasModuleOption(moduleId) {
+      return moduleSelect && moduleSelect.querySelector('option[value="' + moduleId + '"]');
+    }
+
+    function choose(result) {
+      if (result.module_id && hasModuleOption(result.module_id)) {
+        moduleSelect.value = String(result.module_id);
+        moduleSelect.dispatchEvent(new Event('change'));
+        if (question) question.focus();
+      } else if (result.url) {
+        window.location.href = result.url;
+        return;
+      } else if (question && !question.value) {
+        // A curriculum topic the student has no module for yet: ask about it by name
+        question.value = 'Explain ' + result.title + ' in simple terms.';
+        question.focus();
+      }
+      input.value = result.title;
+      hide();
+    }
+
+    function highlight(index) {
+      var items = list.children;
+      for (var i = 0; i < items.length; i++) {
+        items[i].classList.toggle('bg-primary-50', i === index);
+        items[i].setAttribute('aria-selected', i === index ? 'true' : 'false');
+      }
+      active = index;
+    }
+
+    function render(data) {
+      results = data.results;
+      list.innerHTML = '';
+      active = -1;
+
+      if (!results.length) {
+        var empty = document.createElement('li');
+        empty.className = 'px-4 py-3 text-sm text-gray-500 dark:text-gray-400';
+        empty.textContent = 'No matching topics.';
+        list.appendChild(empty);
+      }
+
+      results.forEach(function(result, index) {
+        var item = document.createElement('li');
+        item.setAttribute('role', 'option');
+        item.className = 'px-4 py-2 cursor-pointer hover:bg-primary-50 dark:hover:bg-gray-700';
+
+        var title = document.createElement('p');
+        title.className = 'text-sm font-medium text-gray-900 dark:text-gray-100';
+        title.textContent = result.title;
+        var subtitle = document.createElement('p');
+        subtitle.className = 'text-xs text-gray-500 dark:text-gray-400';
+        subtitle.textContent = result.subtitle;
+
+        item.appendChild(title);
+        item.appendChild(subtitle);
+        item.addEventListener('mousedown', function(event) {
+          event.preventDefault();
+          choose(results[index]);
+        });
+        list.appendChild(item);
+      });
+      list.classList.remove('hidden');
+    }
+
+    function runSearch() {
+      var query = input.value.trim();
+      if (query.length < MIN_LENGTH) {
+        hide();
+        return;
+      }
+
+      // Responses can arrive out of order; only the newest one is shown
+      var requestId = ++latest;
+      fetch(searchUrl + '?q=' + encodeURIComponent(query), { credentials: 'same-origin' })
+        .then(function(response) {
+          if (!response.ok) throw new Error('Search failed (' + response.status + ')');
+          return response.json();
+        })
+        .then(function(data) {
+          if (requestId === latest) render(data);
+        })
+        .catch(function(error) {
+          console.error('Error searching topics:', error);
+        });
+    }
+
+    input.addEventListener('input', function() {
+      clearTimeout(timer);
+      timer = setTimeout(runSearch, DELAY_MS);
+    });
+
+    input.addEventListener('keydown', function(event) {
+      if (!results.length) return;
+      if (event.key === 'ArrowDown') {
+        event.preventDefault();
+        highlight(Math.min(active + 1, results.length - 1));
+      } else if (event.key === 'ArrowUp') {
+        event.preventDefault();
+        highlight(Math.max(active - 1, 0));
+      } else if (event.key === 'Enter' && active >= 0) {
+        event.preventDefault();
+        choose(results[active]);
+      } else if (event.key === 'Escape') {
+        hide();
+      }
+    });
+
+    input.addEventListener('blur', function() {
+      setTimeout(hide, 100);
+    });
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initTutorSearch);
+  } else {
+    initTutorSearch();
+  }
+})();
@@ -1,10 +1,19 @@
-const CACHE_NAME = 'akili-v3';
-const STATIC_CACHE = 'akili-static-v3';
-const DYNAMIC_CACHE = 'akili-dynamic-v3';
+// Only public assets are cached up front; personalised pages are never cached
+// implicitly, only as part of a course the user chose to download
+const STATIC_CACHE = 'akili-static-v5';
+// Downloaded courses: pages and assets, and the bundle manifest they were synced against
+const OFFLINE_CACHE = 'akili-offline-v1';
+const MANIFEST_CACHE = 'akili-offline-manifests-v1';
+
+const QUEUE_DB = 'akili-offline';
+const QUEUE_STORE = 'quiz-answers';
+const QUEUE_SYNC_TAG = 'akili-quiz-answers';
+
+const QUIZ_PATH = /^\/quizzes\/\d+\/$/;
+const LOGOUT_PATH = '/logout/';
+const LOGIN_PATH = '/login/';
 
 const STATIC_ASSETS = [
-  '/',
-  '/dashboard/',
   '/static/css/styles.css',
   '/static/js/main.js',
   '/static/js/dark-mode.js',
@@ -13,7 +22,25 @@ const STATIC_ASSETS = [
   'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap'
 ];
 
-const OFFLINE_PAGE = '/';
+const OFFLINE_PAGE = `<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Offline - Akili</title></head>
+<body style="font-family: sans-serif; max-width: 32rem; margin: 3rem auto; padding: 0 1rem; text-align: center;">
+<h1>You're offline</h1>
+<p>This page hasn't been downloaded. Courses you downloaded for offline
+study are still available from their pages.</p>
+<p><a href="javascript:history.back()">Go back</a></p>
+</body></html>`;
+
+const QUEUED_ANSWERS_PAGE = `<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Answers saved - Akili</title></head>
+<body style="font-family: sans-serif; max-width: 32rem; margin: 3rem auto; padding: 0 1rem; text-align: center;">
+<h1>Answers saved</h1>
+<p>You're offline, so your quiz answers have been saved on this device.
+They will be submitted and marked automatically when you reconnect.</p>
+<p><a href="javascript:history.back()">Back to your course</a></p>
+</body></html>`;
 
 self.addEventListener('install', event => {
   event.waitUntil(
@@ -27,10 +54,12 @@ self.addEventListener('install', event => {
 });
 
 self.addEventListener('activate', event => {
+  // Also drops the dynamic page cache earlier versions filled with personalised pages
+  const current = [STATIC_CACHE, OFFLINE_CACHE, MANIFEST_CACHE];
   event.waitUntil(
     caches.keys().then(keys => {
       return Promise.all(
-        keys.filter(key => key !== STATIC_CACHE && key !== DYNAMIC_CACHE)
+        keys.filter(key => !current.includes(key))
             .map(key => caches.delete(key))
       );
     }).then(() => self.clients.claim())
@@ -40,44 +69,278 @@ self.addEventListener('activate', event => {
 self.addEventListener('fetch', event => {
   const { request } = event;
   const url = new URL(request.url);
-  
+
+  if (request.method === 'POST' && url.origin === location.origin && QUIZ_PATH.test(url.pathname)) {
+    event.respondWith(submitQuizAnswers(request));
+    return;
+  }
+
   if (request.method !== 'GET') return;
-  
-  if (url.origin === location.origin && (
-      url.pathname.includes('/static/') || 
-      url.pathname.includes('/pwa/')
-  )) {
-    event.respondWith(
-      caches.match(request).then(cached => cached || fetch(request))
-    );
+
+  // Live notification streams never end, so they must not be cached
+  if (request.headers.get('Accept') === 'text/event-stream') return;
+
+  if (url.origin === location.origin && url.pathname === LOGOUT_PATH) {
+    event.waitUntil(clearOfflineData());
     return;
   }
-  
+
+  // Downloaded course pages and assets are served without touching the network
   event.respondWith(
-    fetch(request)
-      .then(response => {
-        if (response && response.status === 200 && response.type === 'basic') {
-          const responseClone = response.clone();
-          caches.open(DYNAMIC_CACHE).then(cache => {
-            cache.put(request, responseClone);
-          });
-        }
-        return response;
-      })
-      .catch(() => {
-        return caches.match(request).then(cached => {
-          if (cached) return cached;
-          if (request.headers.get('accept').includes('text/html')) {
-            return caches.match(OFFLINE_PAGE);
-          }
-          return new Response('Offline', { status: 503 });
-        });
-      })
+    caches.open(OFFLINE_CACHE)
+      .then(cache => cache.match(request, { ignoreVary: true }))
+      .then(downloaded => downloaded || fromNetwork(request, url))
   );
 });
 
+function fromNetwork(request, url) {
+  if (url.origin === location.origin && (
+      url.pathname.includes('/static/') ||
+      url.pathname.includes('/pwa/')
+  )) {
+    return caches.match(request).then(cached => cached || fetch(request));
+  }
+
+  return fetch(request).catch(() => {
+    if (request.mode === 'navigate' || (request.headers.get('accept') || '').includes('text/html')) {
+      return new Response(OFFLINE_PAGE, {
+        status: 503,
+        headers: { 'Content-Type': 'text/html; charset=utf-8' }
+      });
+    }
+    return new Response('Offline', { status: 503 });
+  });
+}
+
+// --- Course downloads -------------------------------------------------------
+
+async function cachePage(cache, url) {
+  const response = await fetch(url, { credentials: 'same-origin' });
+  if (!response.ok || response.redirected) {
+    throw new Error(`Could not download ${url} (${response.status})`);
+  }
+  await cache.put(url, response);
+}
+
+/**
+ * Bring a downloaded course up to date with its bundle manifest.
+ * Only resources whose hash changed are fetched again; resources that left
+ * the manifest are dropped. The manifest is stored last, so an interrupted
+ * sync is simply retried from the previous manifest next time.
+ */
+async function syncCourse(manifestUrl) {
+  const manifests = await caches.open(MANIFEST_CACHE);
+  const stored = await manifests.match(manifestUrl);
+  const previous = stored ? await stored.json() : null;
+
+  const response = await fetch(manifestUrl, {
+    credentials: 'same-origin',
+    cache: 'no-store',
+    headers: previous ? { 'If-None-Match': `"${previous.version}"` } : {}
+  });
+  if (response.status === 304) {
+    return { version: previous.version, fetched: 0, removed: 0 };
+  }
+  if (!response.ok || response.redirected) {
+    throw new Error(`Manifest request failed (${response.status})`);
+  }
+  const manifest = await response.clone().json();
+
+  const pages = await caches.open(OFFLINE_CACHE);
+  const known = new Map((previous ? previous.resources : []).map(resource => [resource.url, resource.hash]));
+  const wanted = new Set(manifest.resources.map(resource => resource.url));
+  const removed = [...known.keys()].filter(url => !wanted.has(url));
+  const changed = [];
+  for (const resource of manifest.resources) {
+    if (known.get(resource.url) !== resource.hash || !(await pages.match(resource.url))) {
+      changed.push(resource.url);
+    }
+  }
+  const missingAssets = [];
+  for (const asset of manifest.assets) {
+    if (!(await pages.match(asset))) missingAssets.push(asset);
+  }
+
+  await Promise.all(removed.map(url => pages.delete(url)));
+  await Promise.all(changed.map(url => cachePage(pages, url)).concat(missingAssets.map(asset => pages.add(asset))));
+  await manifests.put(manifestUrl, response);
+  return { version: manifest.version, fetched: changed.length + missingAssets.length, removed: removed.length };
+}
+
+async function removeCourse(manifestUrl) {
+  const manifests = await caches.open(MANIFEST_CACHE);
+  const stored = await manifests.match(manifestUrl);
+  if (!stored) return;
+  const manifest = await stored.json();
+  const pages = await caches.open(OFFLINE_CACHE);
+  await Promise.all(manifest.resources.map(resource => pages.delete(resource.url)));
+  await manifests.delete(manifestUrl);
+}
+
+async function syncAllCourses() {
+  const manifests = await caches.open(MANIFEST_CACHE);
+  const requests = await manifests.keys();
+  for (const request of requests) {
+    try {
+      await syncCourse(request.url);
+    } catch (err) {
+      console.log('Offline course sync failed', request.url, err);
+    }
+  }
+}
+
+async function clearOfflineData() {
+  await Promise.all([OFFLINE_CACHE, MANIFEST_CACHE].map(name => caches.delete(name)));
+  const items = await queuedAnswers();
+  await Promise.all(items.map(item => dequeue(item.id)));
+}
+
+// --- Offline quiz answers ---------------------------------------------------
+
+function openQueue() {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open(QUEUE_DB, 1);
+    open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+    open.onsuccess = () => resolve(open.result);
+    open.onerror = () => reject(open.error);
+  });
+}
+
+function queueTransaction(mode, action) {
+  return openQueue().then(db => new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, mode);
+    const request = action(tx.objectStore(QUEUE_STORE));
+    tx.oncomplete = () => resolve(request.result);
+    tx.onerror = () => reject(tx.error);
+  }));
+}
+
+const enqueue = item => queueTransaction('readwrite', store => store.add(item));
+const queuedAnswers = () => queueTransaction('readonly', store => store.getAll());
+const dequeue = id => queueTransaction('readwrite', store => store.delete(id));
+
+// A submitted quiz now shows its results, so the cached form must go
+function forgetQuizPage(url) {
+  return caches.open(OFFLINE_CACHE).then(cache => cache.delete(url));
+}
+
+async function submitQuizAnswers(request) {
+  const queued = {
+    url: request.url,
+    body: await request.clone().text(),
+    contentType: request.headers.get('Content-Type'),
+    queuedAt: Date.now()
+  };
+  try {
+    const response = await fetch(request);
+    await forgetQuizPage(request.url);
+    return response;
+  } catch (err) {
+    await enqueue(queued);
+    if (self.registration.sync) {
+      self.registration.sync.register(QUEUE_SYNC_TAG).catch(() => {});
+    }
+    return new Response(QUEUED_ANSWERS_PAGE, {
+      status: 202,
+      headers: { 'Content-Type': 'text/html; charset=utf-8' }
+    });
+  }
+}
+
+function postAnswers(item, body) {
+  return fetch(item.url, {
+    method: 'POST',
+    body: body,
+    credentials: 'same-origin',
+    headers: { 'Content-Type': item.contentType || 'application/x-www-form-urlencoded' }
+  });
+}
+
+// Logging in rotates the CSRF secret, so the token saved with the answers may
+// be stale; take the current one from the quiz page
+async function withFreshCsrfToken(item) {
+  if ((item.contentType || '').indexOf('application/x-www-form-urlencoded') !== 0) return null;
+  const page = await fetch(item.url, { credentials: 'same-origin' });
+  if (!page.ok || page.redirected) return null;
+  const match = (await page.text()).match(/name="csrfmiddlewaretoken" value="([^"]+)"/);
+  if (!match) return null;
+  const params = new URLSearchParams(item.body);
+  params.set('csrfmiddlewaretoken', match[1]);
+  return params.toString();
+}
+
+/**
+ * What a replayed submission's response means for the queued answers:
+ * 'submitted' - marked: the quiz redirected to its own results page
+ * 'login'     - the session or CSRF token is no longer valid; keep until the user logs in
+ * 'retry'     - the server is struggling or rate limiting; keep and stop for now
+ * 'rejected'  - refused for good (quiz gone, already completed elsewhere)
+ */
+function replayOutcome(item, response) {
+  if (response.status >= 500 || response.status === 429) return 'retry';
+  if (response.status === 401 || response.status === 403) return 'login';
+  const landed = new URL(response.url).pathname;
+  if (response.redirected && landed === LOGIN_PATH) return 'login';
+  if (response.ok && response.redirected && landed === new URL(item.url).pathname) return 'submitted';
+  return 'rejected';
+}
+
+async function replayQueuedAnswers() {
+  const items = await queuedAnswers();
+  const counts = { submitted: 0, login: 0, rejected: 0 };
+  for (const item of items) {
+    let outcome;
+    try {
+      let response = await postAnswers(item, item.body);
+      if (response.status === 403) {
+        const body = await withFreshCsrfToken(item);
+        if (body) response = await postAnswers(item, body);
+      }
+      outcome = replayOutcome(item, response);
+    } catch (err) {
+      break;  // Still offline; keep the rest queued
+    }
+    if (outcome === 'retry') break;
+    counts[outcome]++;
+    if (outcome === 'login') continue;
+    await dequeue(item.id);
+    await forgetQuizPage(item.url);
+  }
+
+  const messages = [
+    ['QUIZ_ANSWERS_SUBMITTED', counts.submitted],
+    ['QUIZ_ANSWERS_NEED_LOGIN', counts.login],
+    ['QUIZ_ANSWERS_REJECTED', counts.rejected]
+  ].filter(([, count]) => count);
+  if (messages.length) {
+    const clients = await self.clients.matchAll({ type: 'window' });
+    messages.forEach(([type, count]) => clients.forEach(client => client.postMessage({ type: type, count: count })));
+  }
+}
+
+self.addEventListener('sync', event => {
+  if (event.tag === QUEUE_SYNC_TAG) {
+    event.waitUntil(replayQueuedAnswers());
+  }
+});
+
 self.addEventListener('message', event => {
-  if (event.data && event.data.type === 'SKIP_WAITING') {
+  const data = event.data || {};
+  const reply = message => event.source && event.source.postMessage(message);
+
+  if (data.type === 'SKIP_WAITING') {
     self.skipWaiting();
+  } else if (data.type === 'SYNC_COURSE') {
+    event.waitUntil(
+      syncCourse(data.manifestUrl)
+        .then(result => reply(Object.assign({ type: 'COURSE_SYNCED', manifestUrl: data.manifestUrl }, result)))
+        .catch(err => reply({ type: 'COURSE_SYNC_FAILED', manifestUrl: data.manifestUrl, error: err.message }))
+    );
+  } else if (data.type === 'REMOVE_COURSE') {
+    event.waitUntil(
+      removeCourse(data.manifestUrl).then(() => reply({ type: 'COURSE_REMOVED', manifestUrl: data.manifestUrl }))
+    );
+  } else if (data.type === 'SYNC_ALL') {
+    event.waitUntil(replayQueuedAnswers().then(syncAllCourses));
   }
 });
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CreditLedgerEntry, CustomUser
 
 
 @admin.register(CustomUser)
@@ -42,3 +42,22 @@ class CustomUserAdmin(UserAdmin):
     
     # This line is corrected to include 'last_daily_reset'
     readonly_fields = ['username', 'last_login', 'date_joined', 'last_daily_reset']
+
+
+@admin.register(CreditLedgerEntry)
+class CreditLedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only: the ledger is append-only and written by the credit methods"""
+    list_display = ['user', 'amount', 'reason', 'reference', 'entry_count', 'created_at']
+    list_filter = ['reason']
+    search_fields = ['user__email', 'reference']
+    ordering = ['-created_at']
+    list_select_related = ['user']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,70 @@
+"""
+Fold old credit ledger entries into one entry per user and reason.
+
+Entries older than the retention period (AKILI_CREDIT_LEDGER_RETENTION_DAYS,
+or --days) are replaced by a single entry holding their total and how many
+entries it stands for, dated at the cutoff. Per-reason totals are kept while
+the table stays proportional to recent activity. Run it periodically, e.g.
+weekly from cron.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from users.models import CreditLedgerEntry
+
+
+class Command(BaseCommand):
+    help = 'Compact credit ledger entries older than the retention period'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'AKILI_CREDIT_LEDGER_RETENTION_DAYS', 90),
+            help='Keep entries from the last N days as they are',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Users compacted per transaction',
+        )
+    
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = CreditLedgerEntry.objects.filter(created_at__lt=cutoff)
+        
+        # Only users with at least two old entries for some reason have anything to fold
+        user_ids = sorted(set(
+            old.values('user_id', 'reason').annotate(n=Count('id')).filter(n__gt=1).values_list('user_id', flat=True)
+        ))
+        
+        removed = created = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            entries = old.filter(user_id__in=user_ids[start:start + batch_size])
+            with transaction.atomic():
+                totals = entries.values('user_id', 'reason').annotate(
+                    total=Sum('amount'), count=Sum('entry_count')
+                ).order_by()
+                summaries = [
+                    CreditLedgerEntry(
+                        user_id=row['user_id'],
+                        reason=row['reason'],
+                        amount=row['total'],
+                        entry_count=row['count'],
+                        created_at=cutoff,
+                    )
+                    for row in totals
+                ]
+                removed += entries.delete()[0]
+                created += len(CreditLedgerEntry.objects.bulk_create(summaries))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {removed} ledger entries into {created} for {len(user_ids)} users (cutoff {cutoff:%Y-%m-%d})'
+        ))
@@ -0,0 +1,46 @@
+"""
+Recount per-user counters (see users.stats) from their source tables.
+
+Runs nightly after the daily credit reset (see render.yaml) to repair drift
+from writes that bypass the counters, and with --missing-only on deploy to
+create rows for users who predate them.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from users.stats import RECONCILE_BATCH_SIZE, reconcile_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount unread notification, completed quiz/exam and referral counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only reconcile the user with this email',
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only create counter rows for users who have none yet',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help=f'Users counted and written per transaction (default: {RECONCILE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            User = get_user_model()
+            try:
+                user_ids = [User.objects.get(email=options['user']).pk]
+            except User.DoesNotExist:
+                raise CommandError(f"No user found with email {options['user']}")
+
+        written = reconcile_user_stats(
+            user_ids, missing_only=options['missing_only'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created or corrected {written} user stats rows'))
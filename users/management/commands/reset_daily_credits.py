@@ -0,0 +1,32 @@
+"""
+Top up every user's daily free credits for the new day.
+
+Scheduled just after midnight WAT (see render.yaml), so the first page view
+of the day no longer writes to the user row; users the run misses are still
+topped up lazily on their next request.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import DAILY_RESET_BATCH_SIZE, CustomUser, credit_day
+
+
+class Command(BaseCommand):
+    help = "Reset daily credits for all users who have not been reset today"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DAILY_RESET_BATCH_SIZE,
+            help='Users per UPDATE, by primary key range',
+        )
+    
+    def handle(self, *args, **options):
+        today = credit_day()
+        started = time.perf_counter()
+        reset = CustomUser.objects.reset_daily_credits(today, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Reset daily credits for {reset} users for {today:%Y-%m-%d} in {time.perf_counter() - started:.2f}s'
+        ))
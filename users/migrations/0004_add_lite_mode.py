@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_remove_customuser_users_email_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='lite_mode',
+            field=models.CharField(choices=[('auto', 'Automatic (on slow connections or with Data Saver)'), ('on', 'Always'), ('off', 'Never')], default='auto', max_length=4),
+        ),
+    ]
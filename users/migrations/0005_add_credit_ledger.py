@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_add_lite_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(help_text='Signed change in credits (for referrals, in the daily credit limit)')),
+                ('reason', models.CharField(choices=[('course', 'Course generation'), ('tutor', 'Tutor question'), ('refund', 'Refund'), ('purchase', 'Purchase'), ('referral', 'Referral')], max_length=10)),
+                ('reference', models.CharField(blank=True, help_text='Payment reference, module or course id', max_length=100)),
+                ('entry_count', models.PositiveIntegerField(default=1, help_text='Original entries folded into this one by compaction')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'credit_ledger',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='credit_ledger_user_idx')],
+            },
+        ),
+    ]
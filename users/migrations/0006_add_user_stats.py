@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_add_credit_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_notifications', models.PositiveIntegerField(default=0)),
+                ('completed_quizzes', models.PositiveIntegerField(default=0)),
+                ('completed_exams', models.PositiveIntegerField(default=0)),
+                ('referrals', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'User stats',
+                'verbose_name_plural': 'User stats',
+                'db_table': 'user_stats',
+            },
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager # <-- NEW IMPORT
+from django.utils import timezone
 import uuid
 
+DAILY_RESET_BATCH_SIZE = 5000
+
+
+def credit_day():
+    """The day credit allowances belong to, in the site's time zone (WAT)"""
+    return timezone.localdate()
+
 
 class CustomUserManager(BaseUserManager):
     """
@@ -39,6 +49,29 @@ class CustomUserManager(BaseUserManager):
         # The CustomUserManager handles the missing username and calls create_user
         return self.create_user(email, password, **extra_fields)
 
+    def reset_daily_credits(self, today=None, batch_size=DAILY_RESET_BATCH_SIZE):
+        """
+        Top up every user not yet reset today to their daily allowance,
+        keeping purchased credits above it: set-based UPDATEs over primary
+        key ranges, each its own short transaction.
+
+        Returns:
+            Number of users reset
+        """
+        today = today or credit_day()
+        pending = self.filter(last_daily_reset__lt=today)
+        bounds = pending.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+        if bounds['low'] is None:
+            return 0
+
+        reset = 0
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            reset += pending.filter(pk__gte=start, pk__lt=start + batch_size).update(
+                tutor_credits=Greatest(F('tutor_credits'), F('daily_credit_limit')),
+                last_daily_reset=today,
+            )
+        return reset
+
 
 class CustomUser(AbstractUser):
     """
@@ -61,6 +94,14 @@ class CustomUser(AbstractUser):
     # Referral System
     referred_by = models.CharField(max_length=150, blank=True, null=True)
     
+    # Low-bandwidth pages: 'auto' follows the browser's Save-Data / connection hints
+    LITE_MODE_CHOICES = [
+        ('auto', 'Automatic (on slow connections or with Data Saver)'),
+        ('on', 'Always'),
+        ('off', 'Never'),
+    ]
+    lite_mode = models.CharField(max_length=4, choices=LITE_MODE_CHOICES, default='auto')
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
     
@@ -95,43 +136,128 @@ class CustomUser(AbstractUser):
             base_url = f"https://{base_url}"
         return f"{base_url}/join/{self.username}"
     
+    def needs_daily_reset(self):
+        """Whether today's allowance is still due; an in-memory check, no query"""
+        return self.last_daily_reset < credit_day()
+    
     def reset_daily_credits(self):
         """
         Add daily free credits if a new day has started.
-        FIXED: Uses max(existing, daily_limit) to ensure paid users keep their purchased credits
+        Uses max(existing, daily_limit) so paid users keep their purchased credits
         while free users still get their daily allowance topped up.
+        
+        The nightly reset_daily_credits command normally does this for
+        everyone at once; this is the fallback for users it has not reached.
+        The top-up is one guarded UPDATE of the two credit columns, so
+        concurrent requests on a new day top up exactly once.
         """
-        from datetime import date
-        today = date.today()
+        today = credit_day()
         
         if self.last_daily_reset < today:
-            # FIXED: Use max() to preserve purchased credits while topping up free users
-            # If user has more than daily limit (purchased), keep their balance
-            # If user has less than daily limit, top up to daily limit
-            self.tutor_credits = max(self.tutor_credits, self.daily_credit_limit)
-            self.last_daily_reset = today
-            self.save()
-    
-    def deduct_credits(self, amount):
+            CustomUser.objects.filter(pk=self.pk, last_daily_reset__lt=today).update(
+                tutor_credits=Greatest(F('tutor_credits'), F('daily_credit_limit')),
+                last_daily_reset=today,
+            )
+            self.refresh_from_db(fields=['tutor_credits', 'daily_credit_limit', 'last_daily_reset'])
+    
+    def _change_credits(self, amount, reason, reference):
+        """
+        Apply a signed credit change as one conditional UPDATE and record it
+        in the ledger. Spending only succeeds if the balance covers it, which
+        the database checks, so concurrent requests cannot overspend.
+        
+        Returns:
+            True if the balance changed
+        """
+        users = CustomUser.objects.filter(pk=self.pk)
+        if amount < 0:
+            users = users.filter(tutor_credits__gte=-amount)
+        
+        with transaction.atomic():
+            changed = users.update(tutor_credits=F('tutor_credits') + amount)
+            if changed:
+                CreditLedgerEntry.objects.create(user_id=self.pk, amount=amount, reason=reason, reference=reference)
+        self.refresh_from_db(fields=['tutor_credits'])
+        return bool(changed)
+    
+    def deduct_credits(self, amount, reason='tutor', reference=''):
         """Deduct credits and return True if successful"""
         self.reset_daily_credits()
-        
-        if self.tutor_credits >= amount:
-            self.tutor_credits -= amount
-            self.save()
-            return True
-        return False
-    
-    def add_credits(self, amount):
-        """Add purchased credits (don't reset)"""
-        self.tutor_credits += amount
-        self.save()
-    
-    def increase_daily_limit(self, amount):
-        """Increase daily credit limit (from referrals)"""
-        new_limit = min(
-            self.daily_credit_limit + amount,
-            settings.AKILI_MAX_REFERRAL_CREDITS # Assuming this constant is defined in settings
-        )
-        self.daily_credit_limit = new_limit
-        self.save()
\ No newline at end of file
+        return self._change_credits(-amount, reason, reference)
+    
+    def add_credits(self, amount, reason='purchase', reference=''):
+        """Add purchased or refunded credits (don't reset)"""
+        self._change_credits(amount, reason, reference)
+    
+    def increase_daily_limit(self, amount, reference=''):
+        """Increase daily credit limit (from referrals), capped at AKILI_MAX_REFERRAL_CREDITS"""
+        previous_limit = self.daily_credit_limit
+        with transaction.atomic():
+            CustomUser.objects.filter(pk=self.pk).update(
+                daily_credit_limit=Least(F('daily_credit_limit') + amount, settings.AKILI_MAX_REFERRAL_CREDITS)
+            )
+            self.refresh_from_db(fields=['daily_credit_limit'])
+            if self.daily_credit_limit > previous_limit:
+                CreditLedgerEntry.objects.create(
+                    user_id=self.pk,
+                    amount=self.daily_credit_limit - previous_limit,
+                    reason='referral',
+                    reference=reference,
+                )
+
+
+class UserStats(models.Model):
+    """
+    Per-user counters shown on every page and the dashboard, kept in step by
+    users.stats instead of being counted on each request.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    unread_notifications = models.PositiveIntegerField(default=0)
+    completed_quizzes = models.PositiveIntegerField(default=0)
+    completed_exams = models.PositiveIntegerField(default=0)
+    referrals = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'user_stats'
+        verbose_name = 'User stats'
+        verbose_name_plural = 'User stats'
+    
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+
+class CreditLedgerEntry(models.Model):
+    """
+    Append-only record of credit changes; entries are never edited.
+    
+    compact_credit_ledger folds entries older than the retention period into
+    one entry per user and reason. Daily allowance top-ups are not recorded.
+    """
+    REASON_CHOICES = [
+        ('course', 'Course generation'),
+        ('tutor', 'Tutor question'),
+        ('refund', 'Refund'),
+        ('purchase', 'Purchase'),
+        ('referral', 'Referral'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='credit_ledger')
+    amount = models.IntegerField(help_text="Signed change in credits (for referrals, in the daily credit limit)")
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True, help_text="Payment reference, module or course id")
+    entry_count = models.PositiveIntegerField(default=1, help_text="Original entries folded into this one by compaction")
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    
+    class Meta:
+        db_table = 'credit_ledger'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='credit_ledger_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.amount:+d} ({self.reason})"
\ No newline at end of file
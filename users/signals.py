@@ -0,0 +1,14 @@
+"""
+Signal handlers that give new users their counters row (see users.stats).
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, UserStats
+
+
+@receiver(post_save, sender=CustomUser)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    # A new user has nothing to count yet, so an all-zero row is exact
+    if created and not raw:
+        UserStats.objects.create(user=instance)
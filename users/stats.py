@@ -0,0 +1,144 @@
+"""
+Per-user counters: unread notifications, completed quizzes and exams, and
+referrals.
+
+The layout shows the unread count on every page and the dashboard and
+profile show the others, which used to cost a COUNT query each per render.
+They are kept in one UserStats row per user instead, loaded with the user
+(see users.backends). Code that changes what a counter counts calls
+adjust_user_stats in the same transaction. New users get an all-zero row
+(see users.signals); a row missing for an older user is created by
+counting, so it is correct from the start. reconcile_user_stats recounts
+from the source tables to repair drift from paths that bypass this (admin
+edits, cascading deletes).
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+COUNTERS = ('unread_notifications', 'completed_quizzes', 'completed_exams', 'referrals')
+RECONCILE_BATCH_SIZE = 1000
+
+
+def count_user_stats(users):
+    """
+    Count every counter from its source table.
+
+    Args:
+        users: Iterable of (user id, username) pairs
+
+    Returns:
+        Dict of user id to dict of counter values
+    """
+    from assessments.models import CourseExam, Notification
+    from quizzes.models import QuizAttempt
+
+    from .models import CustomUser
+
+    users = list(users)
+    ids = [user_id for user_id, _ in users]
+
+    def per_user(queryset, field='user_id'):
+        return dict(queryset.values(field).annotate(n=Count('pk')).order_by().values_list(field, 'n'))
+
+    unread = per_user(Notification.objects.filter(user_id__in=ids, is_read=False))
+    quizzes = per_user(QuizAttempt.objects.filter(user_id__in=ids, completed_at__isnull=False))
+    exams = per_user(CourseExam.objects.filter(user_id__in=ids, completed_at__isnull=False))
+    referrals = per_user(
+        CustomUser.objects.filter(referred_by__in=[username for _, username in users if username]),
+        'referred_by'
+    )
+    return {
+        user_id: {
+            'unread_notifications': unread.get(user_id, 0),
+            'completed_quizzes': quizzes.get(user_id, 0),
+            'completed_exams': exams.get(user_id, 0),
+            'referrals': referrals.get(username, 0) if username else 0,
+        }
+        for user_id, username in users
+    }
+
+
+def reconcile_user_stats(user_ids=None, missing_only=False, batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Recount counters and write the rows that are missing or wrong.
+
+    Args:
+        user_ids: Users to reconcile (default: everyone)
+        missing_only: Only create rows for users who have none
+        batch_size: Users counted and written per transaction
+
+    Returns:
+        Number of rows created or corrected
+    """
+    from .models import CustomUser, UserStats
+
+    users = CustomUser.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    if missing_only:
+        users = users.filter(stats__isnull=True)
+
+    written = 0
+    last_id = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_id).values_list('pk', 'username')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        with transaction.atomic():
+            counts = count_user_stats(batch)
+            existing = {
+                row['user_id']: row
+                for row in UserStats.objects.filter(user_id__in=counts).values('user_id', *COUNTERS)
+            }
+            rows = [
+                UserStats(user_id=user_id, **values)
+                for user_id, values in counts.items()
+                if existing.get(user_id) != {'user_id': user_id, **values}
+            ]
+            UserStats.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['user'], update_fields=COUNTERS
+            )
+        written += len(rows)
+    return written
+
+
+def get_user_stats(user):
+    """
+    The user's counters, creating the row by counting if it does not exist.
+    Loaded with the user by the authentication backend, so usually free.
+    """
+    from .models import UserStats
+
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile_user_stats([user.pk])
+        stats = UserStats.objects.get(pk=user.pk)
+        user.stats = stats
+        return stats
+
+
+def adjust_user_stats(user_ids, counter, delta):
+    """
+    Add delta to one counter for each user, in the caller's transaction.
+
+    Users without a row are skipped: their row is counted from scratch when
+    first needed, which already includes the change being recorded.
+
+    Args:
+        user_ids: User ids, each changed by delta
+        counter: Name of the counter (one of COUNTERS)
+        delta: Signed amount; counters never go below zero
+    """
+    from .models import UserStats
+
+    if counter not in COUNTERS:
+        raise ValueError(f'Unknown user stats counter: {counter}')
+    if not delta:
+        return
+    UserStats.objects.filter(user_id__in=list(user_ids)).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
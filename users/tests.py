@@ -1,8 +1,16 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
 from datetime import date, timedelta
 from django.conf import settings
+from io import StringIO
+from core.context_processors import credits_processor
+from users.models import CreditLedgerEntry, UserStats, credit_day
+from users.stats import get_user_stats
 
 
 class CustomUserModelTestCase(TestCase):
@@ -150,6 +158,206 @@ class CustomUserModelTestCase(TestCase):
         self.assertLessEqual(user.daily_credit_limit, settings.AKILI_MAX_REFERRAL_CREDITS)
 
 
+class CreditLedgerTestCase(TestCase):
+    """Tests for atomic credit changes and the credit ledger"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ledger@example.com', password='testpass123')
+    
+    def test_deduction_is_one_conditional_update(self):
+        with self.assertNumQueries(5):
+            # The UPDATE and the ledger INSERT in a savepoint, then a narrow re-read of the balance
+            self.assertTrue(self.user.deduct_credits(4, reason='course'))
+        
+        self.assertEqual(self.user.tutor_credits, settings.AKILI_DAILY_FREE_CREDITS - 4)
+        entry = CreditLedgerEntry.objects.get(user=self.user)
+        self.assertEqual((entry.amount, entry.reason), (-4, 'course'))
+    
+    def test_stale_balance_cannot_overspend(self):
+        other_request = get_user_model().objects.get(pk=self.user.pk)
+        self.assertTrue(self.user.deduct_credits(settings.AKILI_DAILY_FREE_CREDITS))
+        
+        # The second copy still believes it has the full allowance
+        self.assertFalse(other_request.deduct_credits(1))
+        self.assertEqual(other_request.tutor_credits, 0)
+        self.assertEqual(CreditLedgerEntry.objects.filter(user=self.user).count(), 1)
+    
+    def test_refunds_and_referrals_are_recorded(self):
+        self.user.deduct_credits(1, reference='7')
+        self.user.add_credits(1, reason='refund', reference='7')
+        self.user.increase_daily_limit(1000, reference='friend')
+        
+        self.assertEqual(
+            list(CreditLedgerEntry.objects.filter(user=self.user).order_by('id').values_list('reason', 'amount')),
+            [('tutor', -1), ('refund', 1), ('referral', settings.AKILI_MAX_REFERRAL_CREDITS - settings.AKILI_DAILY_FREE_CREDITS)]
+        )
+        self.assertEqual(self.user.daily_credit_limit, settings.AKILI_MAX_REFERRAL_CREDITS)
+    
+    def test_daily_reset_happens_once(self):
+        get_user_model().objects.filter(pk=self.user.pk).update(tutor_credits=1, last_daily_reset=date.today() - timedelta(days=1))
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        self.user.refresh_from_db()
+        
+        self.user.reset_daily_credits()
+        self.user.deduct_credits(3)
+        stale.reset_daily_credits()
+        self.assertEqual(stale.tutor_credits, settings.AKILI_DAILY_FREE_CREDITS - 3)
+    
+    def test_compaction_folds_old_entries(self):
+        long_ago = timezone.now() - timedelta(days=200)
+        CreditLedgerEntry.objects.bulk_create([
+            CreditLedgerEntry(user=self.user, amount=-1, reason='tutor', created_at=long_ago),
+            CreditLedgerEntry(user=self.user, amount=-1, reason='tutor', created_at=long_ago),
+            CreditLedgerEntry(user=self.user, amount=120, reason='purchase', reference='PAY_1', created_at=long_ago),
+        ])
+        self.user.deduct_credits(1)
+        
+        call_command('compact_credit_ledger', days=90, stdout=StringIO())
+        
+        rows = CreditLedgerEntry.objects.filter(user=self.user).order_by('created_at', 'reason')
+        self.assertEqual(
+            [(row.reason, row.amount, row.entry_count) for row in rows],
+            [('purchase', 120, 1), ('tutor', -2, 2), ('tutor', -1, 1)]
+        )
+
+
+class DailyCreditResetTestCase(TestCase):
+    """Tests for the nightly set-based daily credit reset"""
+    
+    def setUp(self):
+        User = get_user_model()
+        yesterday = credit_day() - timedelta(days=1)
+        self.users = [User.objects.create_user(email=f'reset{i}@example.com', password='testpass123') for i in range(5)]
+        User.objects.filter(pk__in=[user.pk for user in self.users[:4]]).update(tutor_credits=1, last_daily_reset=yesterday)
+        User.objects.filter(pk=self.users[0].pk).update(tutor_credits=100)
+        User.objects.filter(pk=self.users[4].pk).update(tutor_credits=3)
+    
+    def balances(self):
+        return list(get_user_model().objects.filter(pk__in=[user.pk for user in self.users]).order_by('pk').values_list('tutor_credits', flat=True))
+    
+    def test_command_resets_eligible_users_in_batches(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reset_daily_credits', batch_size=2, stdout=out)
+        
+        self.assertIn('Reset daily credits for 4 users', out.getvalue())
+        # Four stale users, two primary key ranges of two
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 2)
+        # Purchased credits are kept; the user already reset today is left alone
+        limit = settings.AKILI_DAILY_FREE_CREDITS
+        self.assertEqual(self.balances(), [100, limit, limit, limit, 3])
+        
+        call_command('reset_daily_credits', stdout=out)
+        self.assertIn('Reset daily credits for 0 users', out.getvalue())
+    
+    def test_page_view_only_writes_for_users_the_run_missed(self):
+        request = RequestFactory().get('/')
+        
+        request.user = get_user_model().objects.get(pk=self.users[4].pk)
+        with CaptureQueriesContext(connection) as queries:
+            context = credits_processor(request)
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+        self.assertEqual(context['user_credits'], 3)
+        
+        request.user = get_user_model().objects.get(pk=self.users[1].pk)
+        self.assertTrue(request.user.needs_daily_reset())
+        self.assertEqual(credits_processor(request)['user_credits'], settings.AKILI_DAILY_FREE_CREDITS)
+
+
+class UserStatsTestCase(TestCase):
+    """Tests for the per-user counters kept in UserStats"""
+    
+    def setUp(self):
+        from assessments.models import Notification
+        from courses.models import Course, Module
+        from quizzes.models import QuizAttempt
+        
+        self.User = get_user_model()
+        self.user = self.User.objects.create_user(email='stats@example.com', password='testpass123')
+        self.notifications = Notification.objects.bulk_create([
+            Notification(user=self.user, notification_type='GENERAL', title=f'Note {i}', message='Hello')
+            for i in range(3)
+        ])
+        module = Module.objects.create(
+            course=Course.objects.create(user=self.user, subject='Mathematics', exam_type='JAMB'),
+            title='Algebra', order=1
+        )
+        self.attempt = QuizAttempt.objects.create(
+            user=self.user, module=module,
+            questions_data=[{'question': '1 + 1?', 'options': ['1', '2'], 'correct_index': 1}]
+        )
+        # The fixtures bypassed the counters, as data from before them did
+        UserStats.objects.filter(user=self.user).delete()
+        self.user = self.User.objects.get(pk=self.user.pk)
+    
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+    
+    def test_new_users_start_with_a_row(self):
+        user = self.User.objects.create_user(email='fresh@example.com', password='testpass123')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_stats(user).unread_notifications, 0)
+    
+    def test_missing_row_is_created_by_counting(self):
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+        stats = get_user_stats(self.user)
+        self.assertEqual(stats.unread_notifications, 3)
+        self.assertEqual(stats.completed_quizzes, 0)
+    
+    def test_page_renders_read_counters_with_the_user(self):
+        get_user_stats(self.user)
+        self.client.login(email='stats@example.com', password='testpass123')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        counts = [q['sql'] for q in queries if 'COUNT(' in q['sql'] and 'notifications' in q['sql']]
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['unread_notifications'], 3)
+    
+    def test_writers_keep_counters_in_step(self):
+        get_user_stats(self.user)
+        self.client.login(email='stats@example.com', password='testpass123')
+        
+        self.client.get(reverse('assessments:mark_notification_read', args=[self.notifications[0].pk]))
+        self.client.get(reverse('assessments:mark_notification_read', args=[self.notifications[0].pk]))
+        self.assertEqual(self.stats().unread_notifications, 2)
+        self.client.get(reverse('assessments:mark_all_read'))
+        self.assertEqual(self.stats().unread_notifications, 0)
+        
+        url = reverse('quizzes:quiz_detail', args=[self.attempt.pk])
+        self.client.post(url, {'q_0': '1'})
+        self.client.post(url, {'q_0': '1'})
+        self.assertEqual(self.stats().completed_quizzes, 1)
+        
+        self.client.logout()
+        self.client.post(reverse('signup') + f'?ref={self.user.username}', {
+            'first_name': 'Referred',
+            'last_name': 'User',
+            'email': 'referred@example.com',
+            'password1': 'ComplexPass123!',
+            'password2': 'ComplexPass123!',
+            'agree_to_terms': True
+        })
+        self.assertEqual(self.stats().referrals, 1)
+    
+    def test_reconcile_command_repairs_drift(self):
+        get_user_stats(self.user)
+        UserStats.objects.filter(user=self.user).update(unread_notifications=40, referrals=2)
+        other = self.User.objects.create_user(email='other@example.com', password='testpass123')
+        UserStats.objects.filter(user=other).delete()
+        
+        out = StringIO()
+        call_command('reconcile_user_stats', missing_only=True, stdout=out)
+        self.assertIn('Created or corrected 1 user stats rows', out.getvalue())
+        self.assertEqual(self.stats().unread_notifications, 40)
+        
+        call_command('reconcile_user_stats', batch_size=1, stdout=out)
+        self.assertIn('Created or corrected 1 user stats rows', out.getvalue())
+        self.assertEqual((self.stats().unread_notifications, self.stats().referrals), (3, 0))
+        self.assertTrue(UserStats.objects.filter(user=other).exists())
+
+
 class UserAuthViewsTestCase(TestCase):
     """Tests for user authentication views"""
     
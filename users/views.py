@@ -11,6 +11,7 @@ from django.contrib.auth import logout as auth_logout
 from django.conf import settings
 from .models import CustomUser
 from .forms import SignupForm, LoginForm
+from .stats import adjust_user_stats, get_user_stats
 
 
 @ensure_csrf_cookie
@@ -44,19 +45,21 @@ def signup_view(request):
                 except CustomUser.DoesNotExist:
                     pass
 
-            # Save user and any M2M relationships
-            user.save()
-            form.save_m2m()
-
-            # Award referral bonus after user is saved
-            if referred_by and user.referred_by:
-                try:
-                    referrer = CustomUser.objects.get(username=referred_by)
-                    referrer.increase_daily_limit(2)
-                except CustomUser.DoesNotExist:
-                    pass
-
-            login(request, user)
+            with transaction.atomic():
+                # Save user and any M2M relationships
+                user.save()
+                form.save_m2m()
+
+                # Award referral bonus after user is saved
+                if referred_by and user.referred_by:
+                    try:
+                        referrer = CustomUser.objects.get(username=referred_by)
+                        referrer.increase_daily_limit(2, reference=user.username)
+                        adjust_user_stats([referrer.pk], 'referrals', 1)
+                    except CustomUser.DoesNotExist:
+                        pass
+
+            login(request, user, backend='users.backends.StatsModelBackend')
             messages.success(request, 'Welcome to Akili!')
             return redirect('dashboard')
     else:
@@ -114,14 +117,7 @@ class ProfileView(LoginRequiredMixin, View):
     def get(self, request):
         max_referral_credits = settings.AKILI_MAX_REFERRAL_CREDITS
 
-        username = request.user.username
-        if username:
-            referral_count = CustomUser.objects.filter(
-                referred_by__isnull=False,
-                referred_by=username
-            ).exclude(referred_by='').count()
-        else:
-            referral_count = 0
+        referral_count = get_user_stats(request.user).referrals
         bonus_credits_earned = referral_count * settings.AKILI_CREDITS_PER_REFERRAL
 
         context = {
@@ -134,6 +130,14 @@ class ProfileView(LoginRequiredMixin, View):
 
         return render(request, 'profiles/profile.html', context)
 
+    def post(self, request):
+        lite_mode = request.POST.get('lite_mode')
+        if lite_mode in dict(CustomUser.LITE_MODE_CHOICES):
+            request.user.lite_mode = lite_mode
+            request.user.save(update_fields=['lite_mode'])
+            messages.success(request, 'Your data saving preference has been updated.')
+        return redirect(reverse('profiles:my_profile'))
+
 
 class DeleteAccountView(LoginRequiredMixin, View):
     """Handles the permanent deletion of a user's account and associated data."""
@@ -159,6 +163,11 @@ class DeleteAccountView(LoginRequiredMixin, View):
         
         with transaction.atomic():
             auth_logout(request)
+            if user.referred_by:
+                adjust_user_stats(
+                    CustomUser.objects.filter(username=user.referred_by).values_list('pk', flat=True),
+                    'referrals', -1
+                )
             user.delete()
 
         messages.success(request, "Your account has been successfully deleted.")